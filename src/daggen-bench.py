@@ -0,0 +1,357 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+
+# -------------------------------------------------------------------------------
+# Randomized Multi-DAG Task Generator
+# Xiaotian Dai
+# Real-Time Systems Group
+# University of York, UK
+# -------------------------------------------------------------------------------
+
+# Benchmark suite of the generators and samplers: times every case of a
+# parameter grid, writes the results to a JSON baseline and compares a run
+# against a baseline to flag regressions.
+
+import os, sys, logging, getopt, time, json
+import platform
+import random
+import shutil
+import tempfile
+import subprocess
+import importlib
+from functools import partial
+import numpy as np
+
+from rnddag import DAG
+from generator import uunifast_discard, uunifast_discard_np, drs_gen, drs_gen_batch
+from generator import gen_period, gen_period_np, gen_execution_times, gen_execution_times_np
+
+
+def print_usage_info():
+    logging.info("[Usage] python3 daggen-bench.py [--output results.json] [--compare baseline.json] "
+                 "[--threshold 0.25] [--filter name] [--quick] [--list]")
+
+
+################################################################################
+# benchmark cases
+################################################################################
+def _gen_rnd(engine, connect_mode, parallelism, layer_num_min, layer_num_max):
+    d = DAG(engine=engine)
+    d.gen_rnd(parallelism=parallelism, layer_num_min=layer_num_min,
+              layer_num_max=layer_num_max, connect_prob=0.5, connect_mode=connect_mode)
+
+
+def _gen_rnd_legacy(parallelism, layer_num_min, layer_num_max, engine="networkx"):
+    d = DAG(engine=engine)
+    d.parallelism = parallelism
+    d.layer_num_min = layer_num_min
+    d.layer_num_max = layer_num_max
+    d.gen_rnd_legacy()
+
+
+def _gen_nfj(depth):
+    d = DAG()
+    d.depth = depth
+    d.gen_nfj()
+
+
+def _cli_main(folder, util_algorithm, set_number):
+    # the multi-DAG loop of daggen-cli.py, without saving
+    config = {
+        "misc": {"multi-DAG_on": True, "cores": 4, "print_DAG": False, "save_to_file": False,
+                 "dummy_source_and_sink": False, "rnd_seed": 1234, "util_algorithm": util_algorithm},
+        "multi-DAG": {"set_number": set_number, "task_number_per_set": 5, "utilization": 0.8,
+                      "periods": [1000, 2000, 5000, 10000, 20000, 50000]},
+        "dag_config": {"parallelism": 5, "layer_num_min": 3, "layer_num_max": 8, "connect_prob": 0.5},
+    }
+    config_path = os.path.join(folder, "cli.json")
+    with open(config_path, "w") as f:
+        json.dump(config, f)
+    importlib.import_module("daggen-cli").main(config_path=config_path, data_path=os.path.join(folder, "cli"))
+
+
+def _sampler_case(sampler, seeded, n, u, ulimit):
+    # 100 vectors per call
+    if seeded:
+        return partial(sampler, n, u, 100, ulimit, rng=np.random.default_rng(0))
+    return partial(sampler, n, u, 100, ulimit)
+
+
+def _save(d, folder, fmt):
+    d.save(basefolder=folder, formats=[fmt])
+
+
+def _startup(module):
+    # a fresh interpreter, to include the import time of all dependencies
+    code = "import importlib; importlib.import_module({!r})".format(module) if module else "pass"
+    subprocess.run([sys.executable, "-c", code], cwd=os.path.dirname(os.path.abspath(__file__)), check=True)
+
+
+def _has_module(name):
+    try:
+        __import__(name)
+    except ImportError:
+        return False
+    return True
+
+
+def benchmark_grid(folder):
+    """ Yields (name, params, fn) for every case of the grid; fn() runs one
+    call of the benchmarked function. Output files go to folder.
+    """
+    # DAG generators
+    for engine in ("networkx", "array"):
+        for connect_mode in ("pairwise", "bernoulli"):
+            for parallelism in (4, 16, 64):
+                for layer_num_min, layer_num_max in ((3, 6), (8, 12)):
+                    params = {"engine": engine, "connect_mode": connect_mode, "parallelism": parallelism,
+                              "layer_num_min": layer_num_min, "layer_num_max": layer_num_max}
+                    yield "gen_rnd", params, partial(_gen_rnd, **params)
+
+    for parallelism in (4, 16):
+        for layer_num_min, layer_num_max in ((3, 6), (8, 12)):
+            params = {"parallelism": parallelism, "layer_num_min": layer_num_min, "layer_num_max": layer_num_max}
+            yield "gen_rnd_legacy", params, partial(_gen_rnd_legacy, **params)
+
+    # wide DAGs on the array engine
+    for parallelism in (8, 64, 512):
+        for connect_mode in ("pairwise", "bernoulli"):
+            params = {"engine": "array", "connect_mode": connect_mode, "parallelism": parallelism,
+                      "layer_num_min": 5, "layer_num_max": 12}
+            yield "gen_rnd", params, partial(_gen_rnd, **params)
+        params = {"engine": "array", "parallelism": parallelism, "layer_num_min": 5, "layer_num_max": 12}
+        yield "gen_rnd_legacy", params, partial(_gen_rnd_legacy, **params)
+
+    for depth in (3, 5, 7):
+        yield "gen_nfj", {"depth": depth}, partial(_gen_nfj, depth)
+
+    # utilization samplers: 100 vectors per call, task utilization <= 1 on
+    # the cores grid (the NumPy samplers draw from a fixed seed)
+    samplers = [("uunifast_discard", uunifast_discard, False), ("uunifast_discard_np", uunifast_discard_np, True)]
+    if _has_module("drs"):
+        samplers += [("drs_gen", drs_gen, False), ("drs_gen_batch", drs_gen_batch, True)]
+    for name, sampler, seeded in samplers:
+        case = partial(_sampler_case, sampler, seeded)
+        for cores in (4, 16):
+            for n in (cores * 2, cores * 4):
+                for ratio in (0.25, 0.5, 0.75):
+                    params = {"n": n, "cores": cores, "u_cores": ratio}
+                    yield name, params, case(n, ratio * cores, 1)
+
+        # few tasks close to their limit, and limits other than 1
+        for n, u, ulimit in ((5, 3.5, 1), (10, 6.0, 1), (20, 4.0, 4), (8, 2.0, 0.5)):
+            yield name, {"n": n, "u": u, "ulimit": ulimit}, case(n, u, ulimit)
+
+    # periods: 100 tasks per call
+    population = [1000, 2000, 5000, 10000, 20000, 50000]
+    yield "gen_period", {"n": 100}, partial(gen_period, population, 100)
+    yield "gen_period_np", {"n": 100}, partial(gen_period_np, 100, population=population,
+                                               rng=np.random.default_rng(0))
+
+    # execution times
+    for n in (10, 100, 1000):
+        yield "gen_execution_times", {"n": n}, partial(gen_execution_times, n, 100 * n, True)
+        yield "gen_execution_times_np", {"n": n}, partial(gen_execution_times_np, n, 100 * n, True,
+                                                          rng=np.random.default_rng(0))
+
+    # DAG.save, on one DAG per size
+    formats = ["gpickle", "gml", "json", "binary"]
+    if _has_module("pygraphviz"):
+        formats.append("png")
+    for parallelism in (4, 16):
+        random.seed(0)
+        d = DAG(W=1000)
+        d.gen_rnd(parallelism=parallelism)
+        d.set_execution_times(gen_execution_times(d.get_number_of_nodes(), 1000, True))
+        for fmt in formats:
+            yield "save", {"format": fmt, "parallelism": parallelism}, partial(_save, d, folder, fmt)
+
+    # the multi-DAG loop of the CLI; the time per set should not grow with set_number
+    util_algorithms = ["uunifast_discard"] + (["drs"] if _has_module("drs") else [])
+    for util_algorithm in util_algorithms:
+        for set_number in (100, 400):
+            params = {"util_algorithm": util_algorithm, "set_number": set_number}
+            yield "cli", params, partial(_cli_main, folder, **params)
+
+    # interpreter startup with the imports of a module ("" is the bare interpreter)
+    for module in ("", "generator", "rnddag", "daggen-cli"):
+        yield "startup", {"module": module}, partial(_startup, module)
+
+
+def case_name(name, params):
+    return "{}[{}]".format(name, ",".join("{}={}".format(k, v) for k, v in params.items()))
+
+
+################################################################################
+# timing
+################################################################################
+def time_case(fn, min_time=0.2, repeat=5):
+    """ Function: time one benchmark case
+    Inputs:
+        fn: the function to time
+        min_time (float): minimum duration of one repetition (s)
+        repeat (int): number of repetitions
+    Returns:
+        {"number", "repeat", "median", "min"} times per call in seconds
+    """
+    # calibrate the calls per repetition
+    number = 1
+    while True:
+        t0 = time.perf_counter()
+        for _ in range(number):
+            fn()
+        t = time.perf_counter() - t0
+        if t >= min_time or number >= 1 << 20:
+            break
+        number = number * 2 if t <= 0 else max(number * 2, int(number * min_time / t))
+
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        for _ in range(number):
+            fn()
+        times.append((time.perf_counter() - t0) / number)
+
+    return {"number": number, "repeat": repeat,
+            "median": float(np.median(times)), "min": float(min(times))}
+
+
+def run(name_filter=None, quick=False):
+    """ Run every case whose name contains name_filter.
+    Returns the results {"meta": {...}, "results": {case: timing}}.
+    """
+    folder = tempfile.mkdtemp()
+    results = {}
+    try:
+        for name, params, fn in benchmark_grid(folder):
+            case = case_name(name, params)
+            if name_filter and name_filter not in case:
+                continue
+            # the same random stream for every run of a case
+            random.seed(1234)
+            if quick:
+                results[case] = time_case(fn, min_time=0.02, repeat=3)
+            else:
+                results[case] = time_case(fn)
+            print("{:<100s} {:>12s}".format(case, format_time(results[case]["median"])))
+    finally:
+        shutil.rmtree(folder, ignore_errors=True)
+
+    meta = {
+        "date": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "machine": platform.machine(),
+        "processor": platform.processor(),
+        "quick": quick,
+    }
+    return {"meta": meta, "results": results}
+
+
+def format_time(t):
+    if t < 1e-3:
+        return "{:.1f} us".format(t * 1e6)
+    if t < 1:
+        return "{:.2f} ms".format(t * 1e3)
+    return "{:.3f} s".format(t)
+
+
+################################################################################
+# baseline comparison
+################################################################################
+def compare(results, baseline, threshold=0.25):
+    """ Function: compare results against a baseline
+    Inputs:
+        results, baseline (dict): outputs of run()
+        threshold (float): relative slow-down flagged as a regression
+    Returns:
+        rows (list): (case, baseline median, median, ratio, flag) of every
+            case in both, flag is "regression", "improvement" or ""
+    """
+    rows = []
+    for case, r in results["results"].items():
+        b = baseline["results"].get(case)
+        if b is None:
+            continue
+        ratio = r["median"] / b["median"] if b["median"] > 0 else float("inf")
+        flag = ""
+        if ratio > 1 + threshold:
+            flag = "regression"
+        elif ratio < 1 / (1 + threshold):
+            flag = "improvement"
+        rows.append((case, b["median"], r["median"], ratio, flag))
+    return rows
+
+
+def print_comparison(rows):
+    print("")
+    print("{:<100s} {:>12s} {:>12s} {:>8s}".format("case", "baseline", "now", "ratio"))
+    for case, b, r, ratio, flag in rows:
+        print("{:<100s} {:>12s} {:>12s} {:>7.2f}x {}".format(case, format_time(b), format_time(r), ratio, flag))
+
+    n_reg = sum(1 for row in rows if row[4] == "regression")
+    n_imp = sum(1 for row in rows if row[4] == "improvement")
+    print("")
+    print("{} cases compared, {} regressions, {} improvements".format(len(rows), n_reg, n_imp))
+
+
+def main(output=None, baseline=None, threshold=0.25, name_filter=None, quick=False):
+    """ Run the benchmarks, save them to output and compare them against
+    the baseline file. Returns the number of regressions.
+    """
+    results = run(name_filter=name_filter, quick=quick)
+
+    if output is not None:
+        with open(output, "w") as f:
+            json.dump(results, f, indent=2)
+
+    if baseline is None:
+        return 0
+
+    with open(baseline, "r") as f:
+        rows = compare(results, json.load(f), threshold=threshold)
+    print_comparison(rows)
+    return sum(1 for row in rows if row[4] == "regression")
+
+
+if __name__ == "__main__":
+    ############################################################################
+    # Parse cmd arguments
+    ############################################################################
+    output = None
+    baseline = None
+    threshold = 0.25
+    name_filter = None
+    quick = False
+
+    try:
+        short_flags = "ho:c:t:f:ql"
+        long_flags = ["help", "output=", "compare=", "threshold=", "filter=", "quick", "list"]
+        opts, args = getopt.getopt(sys.argv[1:], short_flags, long_flags)
+    except getopt.GetoptError as err:
+        logging.error(err)
+        print_usage_info()
+        sys.exit(2)
+
+    for opt, arg in opts:
+        if opt in ("-h", "--help"):
+            print_usage_info()
+            sys.exit()
+        elif opt in ("-o", "--output"):
+            output = arg
+        elif opt in ("-c", "--compare"):
+            baseline = arg
+        elif opt in ("-t", "--threshold"):
+            threshold = float(arg)
+        elif opt in ("-f", "--filter"):
+            name_filter = arg
+        elif opt in ("-q", "--quick"):
+            quick = True
+        elif opt in ("-l", "--list"):
+            for name, params, _ in benchmark_grid(tempfile.gettempdir()):
+                print(case_name(name, params))
+            sys.exit()
+
+    n_regressions = main(output=output, baseline=baseline, threshold=threshold,
+                         name_filter=name_filter, quick=quick)
+    sys.exit(1 if n_regressions > 0 else 0)
@@ -9,13 +9,26 @@
 # -------------------------------------------------------------------------------
 
 import os, sys, logging, getopt, time, json
-import networkx as nx
+import io
+import gzip
+import hashlib
+import shutil
+import tempfile
+import cProfile
+import bisect
+import copy
+import numpy as np
 import random
-from tqdm import tqdm
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
 
-from rnddag import DAG, DAGTaskset
-from generator import uunifast_discard, drs_gen
-from generator import gen_period, gen_execution_times
+from rnddag import DAG, DAGTaskset, PNGRenderer
+from profiler import StageProfiler
+from generator import uunifast_discard, uunifast_discard_np, drs_gen, drs_gen_batch
+from generator import gen_period, gen_period_np, gen_period_bounded
+from generator import gen_execution_times, gen_execution_times_np
+from utility import DATASET_MAGIC, DATASET_VERSION, DATASET_HEADER_DTYPE, DATASET_TASK_DTYPE
 
 
 def parse_configuration(config_path):
@@ -29,15 +42,676 @@ def parse_configuration(config_path):
 
 
 def print_usage_info():
-    logging.info("[Usage] python3 daggen-cli.py --config config_file")
+    logging.info("[Usage] python3 daggen-cli.py --config config_file [--workers N] [--stream file.jsonl[.gz|.zst]|-] [--dataset file.bin] "
+                 "[--profile] [--profile-output profile.json] [--trace trace.json] [--cprofile file.prof] [--resume]")
 
 
-def main(config_path=None, data_path=None):
+class TasksetStreamWriter:
+    """ Streaming output sink: appends every generated taskset as one JSON
+    line to a single file. Paths ending with .gz or .zst are compressed
+    (zstd needs the zstandard package), "-" writes to stdout so the stream
+    can be piped to another process. The output is flushed every
+    flush_every records, so memory stays flat. With append=True, records
+    are added to an existing (uncompressed) file.
+    """
+    def __init__(self, path, flush_every=100, append=False):
+        self.path = path
+        self.flush_every = max(1, flush_every)
+        self.records = 0
+        self.bytes = 0              # uncompressed bytes of the complete records
+        self._raw = None
+
+        if path == "-":
+            self._f = sys.stdout
+        elif path.endswith(".gz"):
+            self._f = gzip.open(path, "wt", encoding="utf-8")
+        elif path.endswith(".zst"):
+            try:
+                import zstandard
+            except ImportError:
+                raise ImportError("zstd compression needs the zstandard package")
+            self._raw = open(path, "wb")
+            writer = zstandard.ZstdCompressor().stream_writer(self._raw)
+            self._f = io.TextIOWrapper(writer, encoding="utf-8")
+        else:
+            self._f = open(path, "a" if append else "w", encoding="utf-8")
+            if append:
+                self.bytes = os.path.getsize(path)
+
+    def write(self, record):
+        line = json.dumps(record, separators=(",", ":")) + "\n"
+        self._f.write(line)
+        self.bytes = self.bytes + len(line)
+        self.records = self.records + 1
+        if self.records % self.flush_every == 0:
+            self._f.flush()
+
+    def flush(self):
+        self._f.flush()
+
+    def close(self):
+        if self._f is sys.stdout:
+            self._f.flush()
+        else:
+            self._f.close()
+        if self._raw is not None:
+            self._raw.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class TasksetDatasetWriter:
+    """ Binary dataset sink: writes every generated taskset into a single
+    file that utility.load_dataset() memory-maps (see utility.py for the
+    layout). Node and edge arrays are spooled to temporary files next to
+    the output and concatenated behind the task table on close.
+    """
+    def __init__(self, path):
+        self.path = path
+        self.tasks = []
+        self.n_nodes = 0
+        self.n_edges = 0
+
+        folder = os.path.dirname(os.path.abspath(path))
+        self._nodes = tempfile.TemporaryFile(dir=folder)
+        self._edges = tempfile.TemporaryFile(dir=folder)
+
+    def write(self, record, arrays):
+        """ Append the tasks of a taskset record; arrays holds the DAG of
+        every task as returned by DAG.to_arrays() (see want_arrays).
+        """
+        for index, (task, a) in enumerate(zip(record["tasks"], arrays)):
+            n, m = len(a["C"]), len(a["src"])
+            edges = np.empty((m, 2), dtype="<i4")
+            edges[:, 0] = a["src"]
+            edges[:, 1] = a["dst"]
+
+            self.tasks.append((record["set"], index, task["U"], task["T"], task["W"],
+                               task["L"] if task["L"] is not None else np.nan,
+                               self.n_nodes, n, self.n_edges, m))
+            self._nodes.write(np.asarray(a["C"], dtype="<f8").tobytes())
+            self._edges.write(edges.tobytes())
+            self.n_nodes = self.n_nodes + n
+            self.n_edges = self.n_edges + m
+
+    def close(self):
+        tasks = np.array(self.tasks, dtype=DATASET_TASK_DTYPE)
+
+        header = np.zeros(1, dtype=DATASET_HEADER_DTYPE)
+        header["magic"] = DATASET_MAGIC
+        header["version"] = DATASET_VERSION
+        header["n_tasks"] = len(tasks)
+        header["n_nodes"] = self.n_nodes
+        header["n_edges"] = self.n_edges
+        header["task_offset"] = DATASET_HEADER_DTYPE.itemsize
+        header["node_offset"] = header["task_offset"] + tasks.nbytes
+        header["edge_offset"] = header["node_offset"] + self.n_nodes * 8
+
+        with open(self.path, "wb") as f:
+            f.write(header.tobytes())
+            f.write(tasks.tobytes())
+            for spool in (self._nodes, self._edges):
+                spool.seek(0)
+                shutil.copyfileobj(spool, f)
+                spool.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class RunManifest:
+    """ Manifest of a run: the hash of the configuration, the seed scheme and
+    the indices of the completed sets, kept in manifest.json of the run
+    folder. A restarted run skips the completed sets; as every set is seeded
+    from its own index (see taskset_seed), the remaining sets come out as in
+    an uninterrupted run. The file is replaced atomically (temporary file
+    and os.replace), so a crash leaves the last complete version behind and
+    only repeats the sets finished after it.
+    """
+    VERSION = 1
+    SEED_SCHEME = "sha256(rnd_seed:set_index)[:8]"
+
+    def __init__(self, path, config, resume=False):
+        self.path = path
+        self.config_hash = config_hash(config)
+        self.rnd_seed = config["misc"]["rnd_seed"]
+        self.stream_output = config["misc"].get("stream_output")
+        self.stream_bytes = 0       # size of the stream holding exactly the completed sets
+        self.completed = []         # sorted, disjoint [start, end) ranges
+
+        if resume and os.path.exists(path):
+            with open(path, "r") as f:
+                m = json.load(f)
+            if m["config_hash"] != self.config_hash or m["seed_scheme"] != self.SEED_SCHEME:
+                raise ValueError("{} was written for another configuration, "
+                                 "use another data folder or remove it".format(path))
+            if m.get("stream_output") != self.stream_output:
+                raise ValueError("the stream output must be the one of the resumed run: {}".format(
+                                 m.get("stream_output")))
+            self.completed = m["completed"]
+            self.stream_bytes = m.get("stream_bytes", 0)
+
+    def is_done(self, set_index):
+        k = bisect.bisect_right(self.completed, [set_index, float("inf")]) - 1
+        return k >= 0 and self.completed[k][0] <= set_index < self.completed[k][1]
+
+    def pending(self, n_set):
+        """ The indices below n_set of the sets still to generate. """
+        return [i for i in range(n_set) if not self.is_done(i)]
+
+    def add(self, set_index):
+        ranges = self.completed
+        if ranges and ranges[-1][1] == set_index:
+            ranges[-1][1] = set_index + 1
+            return
+        if self.is_done(set_index):
+            return
+        ranges.append([set_index, set_index + 1])
+        ranges.sort()
+        merged = [ranges[0]]
+        for start, end in ranges[1:]:
+            if start <= merged[-1][1]:
+                merged[-1][1] = max(merged[-1][1], end)
+            else:
+                merged.append([start, end])
+        self.completed = merged
+
+    def n_completed(self):
+        return sum(end - start for start, end in self.completed)
+
+    def save(self):
+        """ Atomically replace the manifest file. """
+        manifest = {
+            "version": self.VERSION,
+            "config_hash": self.config_hash,
+            "seed_scheme": self.SEED_SCHEME,
+            "rnd_seed": self.rnd_seed,
+            "completed": self.completed,
+            "stream_output": self.stream_output,
+            "stream_bytes": self.stream_bytes,
+        }
+
+        folder = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(folder, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=folder, prefix=".manifest-", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w") as f:
+                json.dump(manifest, f)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.path)
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+
+
+# keys that do not change the generated sets
+MANIFEST_IGNORED_KEYS = {
+    "misc": ("print_DAG", "profile", "profile_trace", "render_workers", "stream_output",
+             "stream_flush_every", "dataset_output"),
+    "single-DAG": ("set_number",),
+    "multi-DAG": ("set_number",),
+}
+
+
+def config_hash(config):
+    """ Hash of the parts of the configuration that define the sets. The set
+    number is left out, so a finished run can be extended with more sets.
+    """
+    config = copy.deepcopy(config)
+    for section, keys in MANIFEST_IGNORED_KEYS.items():
+        for key in keys:
+            config.get(section, {}).pop(key, None)
+    return hashlib.sha256(json.dumps(config, sort_keys=True).encode()).hexdigest()
+
+
+def run_folder(config, data_path):
+    """ The folder of the output of a run. Swept fields other than the cores
+    and the utilization are added to the folder name of a sweep point.
+    """
+    if config["misc"]["multi-DAG_on"]:
+        name = "data-multi-m{}-u{:.1f}".format(config["misc"]["cores"], config["multi-DAG"]["utilization"])
+        for key, value in config.get("sweep_point", {}).items():
+            if key not in ("cores", "utilization"):
+                name = name + "-{}{}".format(key, value)
+        return os.path.join(data_path, name)
+    return data_path
+
+
+# fields that take a list or a range {"start", "stop", "step"} of values, in
+# the order of expansion; all keys of dag_config follow
+SWEEP_FIELDS = (("misc", "cores"), ("multi-DAG", "utilization"), ("multi-DAG", "task_number_per_set"))
+
+
+def sweep_values(spec, point):
+    """ The values of a swept field: a list, or a range with an inclusive
+    stop. A string start or stop names a field of the point, e.g.
+    {"start": 0.1, "stop": "cores", "step": 0.1}.
+    """
+    if isinstance(spec, list):
+        return spec
+
+    start, stop, step = spec["start"], spec["stop"], spec.get("step", 1)
+    if isinstance(start, str):
+        start = point["misc"][start] if start in point["misc"] else point["multi-DAG"][start]
+    if isinstance(stop, str):
+        stop = point["misc"][stop] if stop in point["misc"] else point["multi-DAG"][stop]
+    if step <= 0:
+        raise ValueError("the step of a range must be positive")
+
+    n = int((stop - start) / step + 1e-9) + 1
+    if all(isinstance(x, int) for x in (start, step)):
+        return [start + k * step for k in range(n)]
+    return [round(start + k * step, 10) for k in range(n)]
+
+
+def is_swept(value):
+    return isinstance(value, list) or (isinstance(value, dict) and {"start", "stop"} <= set(value))
+
+
+def expand_sweep(config):
+    """ Function: expand a parameter sweep
+    Inputs:
+        config (dict): configuration where misc.cores, multi-DAG.utilization,
+            multi-DAG.task_number_per_set and the dag_config fields may be
+            lists or ranges (multi-DAG.periods is always a list)
+    Returns:
+        points (list): one configuration per point of the Cartesian product,
+            with the swept values in point["sweep_point"]; [config] if no
+            field is swept
+    """
+    fields = [(section, key) for section, key in SWEEP_FIELDS if is_swept(config[section].get(key))]
+    fields += [("dag_config", key) for key in config["dag_config"]
+               if key != "targets" and is_swept(config["dag_config"][key])]
+    if not fields:
+        return [config]
+    if not config["misc"]["multi-DAG_on"]:
+        raise ValueError("parameter sweeps need multi-DAG_on")
+
+    points = [config]
+    for section, key in fields:
+        expanded = []
+        for point in points:
+            for value in sweep_values(point[section][key], point):
+                q = copy.deepcopy(point)
+                q[section][key] = value
+                q["sweep_point"] = dict(point.get("sweep_point", {}), **{key: value})
+                expanded.append(q)
+        points = expanded
+
+    folders = set(run_folder(point, "") for point in points)
+    if len(folders) < len(points):
+        raise ValueError("sweep points share an output folder, use a utilization step of at least 0.1")
+    return points
+
+
+def run_job(gen, points, data_path, item, renderer=None, candidates=None):
+    """ Generate the set of item = (point, set_index) with gen, passing the
+    period candidates of the point (see job_candidates) if there are any.
+    """
+    point, set_index = item
+    if candidates is None or candidates[point] is None:
+        return gen(points[point], data_path, set_index, renderer=renderer)
+    return gen(points[point], data_path, set_index, renderer=renderer, candidates=candidates[point])
+
+
+def want_records(config):
+    """ Whether the jobs need to return taskset records for an output sink
+    (or for the caller, with misc.return_records as set by daggen-serve).
+    """
+    misc = config["misc"]
+    return bool(misc.get("stream_output") or misc.get("dataset_output") or misc.get("return_records"))
+
+
+def want_arrays(config):
+    """ Whether the records also carry the DAGs as arrays (DAG.to_arrays(),
+    under "arrays") for the binary dataset sink (or for the caller, with
+    misc.return_arrays as set by daggen-serve). The arrays are not streamed.
+    """
+    misc = config["misc"]
+    return bool(misc.get("dataset_output") or misc.get("return_arrays"))
+
+
+def taskset_seed(rnd_seed, set_index):
+    """ Derive the random seed of a single set from the global seed and the
+    set index, so each set is reproducible no matter how the sets are
+    scheduled over the workers.
+    """
+    key = "{}:{}".format(rnd_seed, set_index).encode()
+    return int.from_bytes(hashlib.sha256(key).digest()[:8], "little")
+
+
+def job_profiler(config):
+    """ The stage profiler of one job, enabled by misc.profile. """
+    return StageProfiler(enabled=config["misc"].get("profile", False),
+                         trace=config["misc"].get("profile_trace", False))
+
+
+def count_dag(profiler, G):
+    profiler.count("dags")
+    profiler.count("nodes", G.get_number_of_nodes())
+    profiler.count("edges", G.get_number_of_edges())
+
+
+def count_bytes(profiler, paths):
+    # images rendered in the background may not exist yet
+    if profiler.enabled:
+        profiler.count("bytes_written", sum(os.path.getsize(p) for p in paths if os.path.exists(p)))
+
+
+def gen_dag(G, config, stats, profiler):
+    """ Generate the graph and the execution times of the DAG G (with its
+    workload G.W) as set in dag_config. With dag_config.targets, the DAG is
+    generated to meet the targets and its acceptance statistics are added
+    to stats. The stages are timed by profiler.
+    """
+    dag_config = config["dag_config"]
+    dummy = config["misc"]["dummy_source_and_sink"]
+    targets = dag_config.get("targets")
+
+    if targets:
+        with profiler.stage("gen_rnd_target"):
+            result = G.gen_rnd_target(L_T=targets.get("L_T"),
+                                      W_L=targets.get("W_L"),
+                                      width=targets.get("width"),
+                                      parallelism=dag_config["parallelism"],
+                                      layer_num_min=dag_config["layer_num_min"],
+                                      layer_num_max=dag_config["layer_num_max"],
+                                      connect_prob=dag_config["connect_prob"],
+                                      connect_mode=dag_config.get("connect_mode", "pairwise"),
+                                      round_c=True, dummy=dummy,
+                                      max_tries=targets.get("max_tries", 100))
+        stats["dags"] += 1
+        stats["tries"] += result["tries"]
+        stats["adjusted"] += int(result["adjusted"])
+        return
+
+    with profiler.stage("gen_rnd"):
+        G.gen_rnd(parallelism=dag_config["parallelism"],
+                  layer_num_min=dag_config["layer_num_min"],
+                  layer_num_max=dag_config["layer_num_max"],
+                  connect_prob=dag_config["connect_prob"],
+                  connect_mode=dag_config.get("connect_mode", "pairwise"))
+
+    # generate sub-DAG execution times
+    n_nodes = G.get_number_of_nodes()
+    exec_algo = config["misc"].get("exec_time_algorithm", "uniform")
+    with profiler.stage("gen_execution_times"):
+        if exec_algo == "dirichlet":
+            # seeded from the random module, so the set seed covers it
+            rng = np.random.default_rng(random.getrandbits(64))
+            c_ = gen_execution_times_np(n_nodes, G.W, round_c=True, dummy=dummy, rng=rng,
+                                        alpha=config["misc"].get("exec_time_alpha", 1.0))
+        else:
+            c_ = gen_execution_times(n_nodes, G.W, round_c=True, dummy=dummy)
+
+    # set execution times on nodes and edges
+    with profiler.stage("set_execution_times"):
+        G.set_execution_times(c_)
+
+
+def gen_single_dag(config, data_path, i, renderer=None):
+    """ Generate (and optionally save) the i-th DAG in single-DAG mode.
+    Returns (record, stats, profiler): the DAG as a record if an output sink
+    is set (else None), the generation statistics and the stage timings.
+    """
+    random.seed(taskset_seed(config["misc"]["rnd_seed"], i))
+    stats = Counter()
+    profiler = job_profiler(config)
+
+    dag_config = config["dag_config"]
+    w = config["single-DAG"]["workload"]
+
+    # large-graph mode: stream the DAG to disk layer by layer
+    if dag_config.get("large_graph", False):
+        G = DAG(i=i, U=-1, T=-1, W=w)
+        with profiler.stage("gen_rnd_large"):
+            meta = G.gen_rnd_large(basefolder=data_path,
+                                   parallelism=dag_config["parallelism"],
+                                   layer_num_min=dag_config["layer_num_min"],
+                                   layer_num_max=dag_config["layer_num_max"],
+                                   connect_prob=dag_config["connect_prob"],
+                                   fmt=dag_config.get("large_graph_format", "bin"))
+        profiler.count("dags")
+        profiler.count("nodes", meta["nodes"])
+        profiler.count("edges", meta["edges"])
+        return None, stats, profiler
+
+    # create a new DAG
+    G = DAG(i=i, U=-1, T=-1, W=w, engine=dag_config.get("engine", "networkx"))
+    gen_dag(G, config, stats, profiler)
+    count_dag(profiler, G)
+
+    # print internal data
+    if config["misc"]["print_DAG"]:
+        G.print_data()
+
+    # save graph
+    if config["misc"]["save_to_file"]:
+        with profiler.stage("save"):
+            paths = G.save(basefolder=data_path, formats=config["misc"].get("output_formats"), renderer=renderer)
+        count_bytes(profiler, paths)
+
+    # stream record
+    if want_records(config):
+        with profiler.stage("record"):
+            record = {"set": i, "tasks": [G.to_dict()]}
+            if want_arrays(config):
+                record["arrays"] = [G.to_arrays()]
+        return record, stats, profiler
+    return None, stats, profiler
+
+
+def period_candidates(multi_config):
+    """ Period candidates and their weights (None: equal) for
+    gen_period_bounded, from periods / period_mode of the multi-DAG config.
+    """
+    periods = multi_config["periods"]
+    mode = multi_config.get("period_mode")
+
+    if mode == "uniform" or (mode is None and len(periods) == 2):
+        return list(range(periods[0], periods[1] + 1)), None
+
+    if mode == "loguniform":
+        # every multiple of the granularity, weighted by the log-uniform
+        # probability of its interval [c, c + g)
+        g = multi_config.get("period_granularity", 1)
+        c = np.arange(-(-periods[0] // g) * g, periods[1] + 1, g)
+        return c, np.log1p(g / c)
+
+    if mode == "harmonic":
+        c = [periods[0]]
+        while c[-1] * 2 <= periods[1]:
+            c.append(c[-1] * 2)
+        return c, None
+
+    return periods, None
+
+
+def job_candidates(config):
+    """ The period candidates of a configuration (period_candidates) if its
+    tasksets draw bounded-hyperperiod periods, else None. Computed once per
+    run (or sweep point) and passed to every gen_multi_dag_taskset job.
+    """
+    if config["misc"]["multi-DAG_on"] and config["multi-DAG"].get("max_hyperperiod") is not None:
+        return period_candidates(config["multi-DAG"])
+    return None
+
+
+def gen_multi_dag_taskset(config, data_path, set_index, renderer=None, candidates=None):
+    """ Generate (and optionally save) the taskset set_index in multi-DAG mode.
+    candidates are the period candidates of the config (job_candidates),
+    computed here if not given.
+    Returns (record, stats, profiler): the taskset as a record if an output
+    sink is set (else None), the generation statistics and the stage timings.
+    """
+    seed = taskset_seed(config["misc"]["rnd_seed"], set_index)
+    stats = Counter()
+    profiler = job_profiler(config)
+    random.seed(seed)
+    rng = np.random.default_rng(seed)
+
+    util_algo = config["misc"].get("util_algorithm", "uunifast_discard")
+    dag_config = config["dag_config"]
+
+    # total utilization
+    u_total = config["multi-DAG"]["utilization"]
+
+    # task number
+    n = config["multi-DAG"]["task_number_per_set"]
+
+    # number of cores
+    cores = config["misc"]["cores"]
+
+    # Load DAG period set (in us)
+    period_set = config["multi-DAG"]["periods"]
+    period_set = [(x) for x in period_set]
+
+    logging.info(">>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>")
+    # create a new taskset
+    Gamma = DAGTaskset()
+    set_folder = os.path.join(run_folder(config, data_path), str(set_index))
+
+    U_p = []
+
+    # DAG taskset utilization (only the vector of this taskset is drawn)
+    with profiler.stage("utilization"):
+        if util_algo == "drs":
+            U = drs_gen(n, u=u_total, nsets=1, ulimit=cores)[0]
+        elif util_algo == "drs_batch":
+            U = drs_gen_batch(n, u=u_total, nsets=1, ulimit=cores, rng=rng)[0].tolist()
+        elif util_algo == "uunifast_discard_np":
+            U = uunifast_discard_np(n, u=u_total, nsets=1, ulimit=cores, rng=rng)[0].tolist()
+        else:
+            U = uunifast_discard(n, u=u_total, nsets=1, ulimit=cores)[0]
+
+    # generate periods
+    period_mode = config["multi-DAG"].get("period_mode")
+    max_hyperperiod = config["multi-DAG"].get("max_hyperperiod")
+    with profiler.stage("periods"):
+        if max_hyperperiod is not None:
+            if candidates is None:
+                candidates = period_candidates(config["multi-DAG"])
+            population, weights = candidates
+            periods, _ = gen_period_bounded(population, n, max_hyperperiod, weights=weights)
+        elif period_mode is None:
+            periods = gen_period(period_set, n)
+        elif period_mode == "choice":
+            periods = gen_period_np(n, mode="choice", population=period_set, rng=rng)[0].tolist()
+        else:
+            periods = gen_period_np(n, mode=period_mode, low=period_set[0], high=period_set[1],
+                                    granularity=config["multi-DAG"].get("period_granularity", 1),
+                                    rng=rng)[0].tolist()
+    logging.info(periods)
+
+    for i in range(n):
+        # calculate workload (in us)
+        w = U[i] * periods[i]
+
+        # create a new DAG
+        G = DAG(i=i, U=U[i], T=periods[i], W=w, engine=dag_config.get("engine", "networkx"))
+
+        # generate nodes in the DAG and their execution times
+        # G.gen_nfj()
+        gen_dag(G, config, stats, profiler)
+        count_dag(profiler, G)
+
+        # calculate actual workload and utilization
+        u_p = G.W / periods[i]
+        U_p.append(u_p)
+
+        # print internal data
+        if config["misc"]["print_DAG"]:
+            G.print_data()
+            logging.info("")
+
+        # save the graph
+        if config["misc"]["save_to_file"]:
+            with profiler.stage("save"):
+                paths = G.save(basefolder=set_folder, formats=config["misc"].get("output_formats"),
+                               renderer=renderer)
+            count_bytes(profiler, paths)
+
+        # (optional) plot the graph
+        # G.plot()
+
+        Gamma.add(G)
+
+    # save the taskset as a unit
+    if config["misc"]["save_to_file"] and "json" in config["misc"].get("output_formats", []):
+        with profiler.stage("save"):
+            Gamma.dump(os.path.join(set_folder, "taskset.json"))
+        count_bytes(profiler, [os.path.join(set_folder, "taskset.json")])
+
+    logging.info("Total U:", sum(U_p), U_p)
+    logging.info("<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<")
+    logging.info("")
+
+    # stream record
+    if want_records(config):
+        with profiler.stage("record"):
+            # the taskset.json content, so both report the same util
+            record = {"set": set_index}
+            record.update(Gamma.to_dict())
+            if "sweep_point" in config:
+                record["point"] = config["sweep_point"]
+            if want_arrays(config):
+                record["arrays"] = [tau.to_arrays() for tau in Gamma.tasks]
+        return record, stats, profiler
+    return None, stats, profiler
+
+
+def run_sets(job, sets, workers=1):
+    """ Run job(set_index) for every set index of sets and yield the results
+    in that order. With workers > 1 the sets are spread over a process pool.
+    """
+    from tqdm import tqdm
+
+    if workers <= 1:
+        for set_index in tqdm(sets):
+            yield job(set_index)
+    else:
+        chunksize = max(1, len(sets) // (workers * 4))
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = executor.map(job, sets, chunksize=chunksize)
+            for result in tqdm(results, total=len(sets)):
+                yield result
+
+
+def main(config_path=None, data_path=None, workers=1, stream_output=None, dataset_output=None,
+         profile=False, profile_output=None, trace_output=None, cprofile_output=None, resume=False):
     """Main entry point for DAG generation.
 
     Args:
         config_path: Path to config JSON file. Defaults to config.json in project root.
         data_path: Path to output data directory. Defaults to data/ in project root.
+        workers: Number of worker processes. Values below 1 use all CPUs.
+        stream_output: JSON Lines file (.gz/.zst compressed, or "-" for stdout)
+            that receives one record per taskset. Overrides misc.stream_output.
+        dataset_output: binary dataset file (see utility.load_dataset) that
+            receives every taskset. Overrides misc.dataset_output.
+        profile: time every stage of the pipeline (also set by misc.profile)
+            and print the summary to stderr.
+        profile_output: JSON file that receives the stage timings.
+        trace_output: Chrome trace file (chrome://tracing, Perfetto) that
+            receives every stage call.
+        cprofile_output: cProfile stats file of the main process (open with
+            pstats or snakeviz); with workers, the work done in the worker
+            processes is not included.
+        resume: skip the sets completed by a previous run of the same
+            configuration, as listed in the manifest.json of its run folder.
+            The stream output must be the same uncompressed file, which is
+            appended to; the dataset output is not supported.
+
+    With lists or ranges in the configuration (see expand_sweep), every
+    point of the sweep is generated into its own folder in one run.
     """
     src_path = os.path.abspath(os.path.dirname(__file__))
     base_path = os.path.abspath(os.path.join(src_path, os.pardir))
@@ -57,147 +731,189 @@ def main(config_path=None, data_path=None):
 
     logging.info("Configurations:", config)
 
+    if workers < 1:
+        workers = os.cpu_count() or 1
+
+    if stream_output is not None:
+        config["misc"]["stream_output"] = stream_output
+    if dataset_output is not None:
+        config["misc"]["dataset_output"] = dataset_output
+    if profile or profile_output or trace_output:
+        config["misc"]["profile"] = True
+    if trace_output:
+        config["misc"]["profile_trace"] = True
+
+    if config["dag_config"].get("large_graph", False):
+        # large DAGs are streamed to their own files and return no records
+        if config["misc"]["multi-DAG_on"]:
+            raise ValueError("large_graph is only supported in single-DAG mode")
+        if config["misc"].get("stream_output") or config["misc"].get("dataset_output"):
+            raise ValueError("large_graph writes every DAG to disk and does not support "
+                             "the stream or dataset output")
+
+    if resume:
+        path = config["misc"].get("stream_output")
+        if path and (path == "-" or path.endswith((".gz", ".zst"))):
+            raise ValueError("resume needs an uncompressed stream output file")
+        if config["misc"].get("dataset_output"):
+            raise ValueError("resume does not support the dataset output")
+
+    profiler = job_profiler(config)
+    t_start = time.perf_counter()
+    cprofiler = None
+    if cprofile_output:
+        cprofiler = cProfile.Profile()
+        cprofiler.enable()
+
     ############################################################################
     # load generator basic configuration
     ############################################################################
-    # load and set random seed
-    random.seed(config["misc"]["rnd_seed"])
+    # each set is seeded from config["misc"]["rnd_seed"] and its index
+    # (see taskset_seed), so the output does not depend on the worker count
 
     # single- or multi-dag
     multi_dag = config["misc"]["multi-DAG_on"]
 
-    # utilization algorithm
-    util_algo = config["misc"].get("util_algorithm", "uunifast_discard")
-
-    # DAG config
-    dag_config = config["dag_config"]
-
     ############################################################################
     # I. single DAG generation
     ############################################################################
     if not multi_dag:
-        n = config["single-DAG"]["set_number"]
-        w = config["single-DAG"]["workload"]
-
-        for i in tqdm(range(n)):
-            # create a new DAG
-            G = DAG(i=i, U=-1, T=-1, W=w)
-            G.gen_rnd(parallelism=dag_config["parallelism"],
-                      layer_num_min=dag_config["layer_num_min"],
-                      layer_num_max=dag_config["layer_num_max"],
-                      connect_prob=dag_config["connect_prob"])
-
-            # generate sub-DAG execution times
-            n_nodes = G.get_number_of_nodes()
-            dummy = config["misc"]["dummy_source_and_sink"]
-            c_ = gen_execution_times(n_nodes, w, round_c=True, dummy=dummy)
-            nx.set_node_attributes(G.get_graph(), c_, 'C')
-
-            # set execution times on edges
-            w_e = {}
-            for e in G.get_graph().edges():
-                ccc = c_[e[0]]
-                w_e[e] = ccc
-
-            nx.set_edge_attributes(G.get_graph(), w_e, 'label')
-
-            # print internal data
-            if config["misc"]["print_DAG"]:
-                G.print_data()
-
-            # save graph
-            if config["misc"]["save_to_file"]:
-                G.save(basefolder=data_path)
+        n_set = config["single-DAG"]["set_number"]
+        gen = gen_single_dag
 
     ############################################################################
     # II. multi-DAG generation
     ############################################################################
     else:
-        # set of tasksets
         n_set = config["multi-DAG"]["set_number"]
-
-        # total utilization
-        u_total = config["multi-DAG"]["utilization"]
-
-        # task number
-        n = config["multi-DAG"]["task_number_per_set"]
-
-        # number of cores
-        cores = config["misc"]["cores"]
-
-        # Load DAG period set (in us)
-        period_set = config["multi-DAG"]["periods"]
-        period_set = [(x) for x in period_set]
-
-        # DAG generation main loop
-        for set_index in tqdm(range(n_set)):
-            logging.info(">>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>")
-            # create a new taskset
-            Gamma = DAGTaskset()
-
-            U_p = []
-
-            # DAG taskset utilization
-            if util_algo == "drs":
-                U = drs_gen(n, u=u_total, nsets=n_set, ulimit=cores)
-            else:
-                U = uunifast_discard(n, u=u_total, nsets=n_set, ulimit=cores)
-
-            # generate periods
-            periods = gen_period(period_set, n)
-            logging.info(periods)
-
-            for i in range(n):
-                # calculate workload (in us)
-                w = U[set_index][i] * periods[i]
-
-                # create a new DAG
-                G = DAG(i=i, U=U[set_index][i], T=periods[i], W=w)
-
-                # generate nodes in the DAG
-                # G.gen_nfj()
-                G.gen_rnd(parallelism=dag_config["parallelism"],
-                          layer_num_min=dag_config["layer_num_min"],
-                          layer_num_max=dag_config["layer_num_max"],
-                          connect_prob=dag_config["connect_prob"])
-
-                # generate sub-DAG execution times
-                n_nodes = G.get_number_of_nodes()
-                dummy = config["misc"]["dummy_source_and_sink"]
-                c_ = gen_execution_times(n_nodes, w, round_c=True, dummy=dummy)
-                nx.set_node_attributes(G.get_graph(), c_, 'C')
-
-                # calculate actual workload and utilization
-                w_p = 0
-                for item in c_.items():
-                    w_p = w_p + item[1]
-
-                u_p = w_p / periods[i]
-                U_p.append(u_p)
-
-                # set execution times on edges
-                w_e = {}
-                for e in G.get_graph().edges():
-                    ccc = c_[e[0]]
-                    w_e[e] = ccc
-
-                nx.set_edge_attributes(G.get_graph(), w_e, 'label')
-
-                # print internal data
-                if config["misc"]["print_DAG"]:
-                    G.print_data()
-                    logging.info("")
-
-                # save the graph
-                if config["misc"]["save_to_file"]:
-                    G.save(basefolder=os.path.join(data_path, "data-multi-m{}-u{:.1f}".format(cores, u_total), str(set_index)))
-
-                # (optional) plot the graph
-                # G.plot()
-
-            logging.info("Total U:", sum(U_p), U_p)
-            logging.info("<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<<")
-            logging.info("")
+        gen = gen_multi_dag_taskset
+
+    # the points of a parameter sweep share the process pool
+    points = expand_sweep(config)
+    if len(points) > 1 and config["misc"].get("dataset_output"):
+        raise ValueError("the dataset output does not support parameter sweeps")
+
+    # run manifest of every point, skip the completed sets on resume
+    manifests = [RunManifest(os.path.join(run_folder(point, data_path), "manifest.json"), point,
+                             resume=resume) for point in points]
+    if not resume:
+        # replace the manifests of earlier runs
+        for manifest in manifests:
+            manifest.save()
+    items = [(p, i) for p, manifest in enumerate(manifests) for i in manifest.pending(n_set)]
+    if len(items) < len(points) * n_set:
+        logging.info("Resuming: {} of {} sets completed".format(len(points) * n_set - len(items),
+                                                               len(points) * n_set))
+
+    # streaming output sink (optional), cut back to the completed sets
+    stream = None
+    stream_path = config["misc"].get("stream_output")
+    if stream_path:
+        append = resume and os.path.exists(stream_path)
+        if append:
+            with open(stream_path, "r+b") as f:
+                f.truncate(min(os.path.getsize(stream_path),
+                               max(manifest.stream_bytes for manifest in manifests)))
+        stream = TasksetStreamWriter(stream_path, append=append,
+                                     flush_every=config["misc"].get("stream_flush_every", 100))
+
+    # the manifests are saved in point order at most once per second; the
+    # stream then holds at least the sets marked as completed
+    dirty = set()
+    last_checkpoint = time.monotonic()
+
+    def complete(p, set_index, stream_bytes):
+        manifests[p].add(set_index)
+        if stream_bytes is not None:
+            manifests[p].stream_bytes = stream_bytes
+        dirty.add(p)
+
+    def checkpoint():
+        if stream is not None:
+            stream.flush()
+        for p in sorted(dirty):
+            manifests[p].save()
+        dirty.clear()
+
+    # binary dataset sink (optional)
+    dataset = None
+    if config["misc"].get("dataset_output"):
+        dataset = TasksetDatasetWriter(config["misc"]["dataset_output"])
+
+    # images are rendered in background processes when generating in this
+    # process; worker processes render their own images. The renderer pool
+    # is started last, so it is closed by the finally below whatever fails
+    renderer = None
+    formats = config["misc"].get("output_formats", ["png", "gpickle", "gml"])
+    if config["misc"]["save_to_file"] and "png" in formats and workers == 1:
+        renderer = PNGRenderer(workers=config["misc"].get("render_workers"))
+
+    job = partial(run_job, gen, points, data_path, renderer=renderer,
+                  candidates=[job_candidates(point) for point in points])
+
+    # DAG generation main loop
+    stats = Counter()
+    try:
+        for (p, set_index), (record, set_stats, set_profiler) in zip(items, run_sets(job, items, workers=workers)):
+            stats.update(set_stats)
+            profiler.merge(set_profiler)
+            profiler.count("sets")
+            if record is not None:
+                arrays = record.pop("arrays", None)
+                if stream is not None:
+                    with profiler.stage("write_stream"):
+                        stream.write(record)
+                if dataset is not None:
+                    with profiler.stage("write_dataset"):
+                        dataset.write(record, arrays)
+            done = [(p, set_index, stream.bytes if stream is not None else None)]
+            if renderer is not None:
+                # a set is completed once its images are written
+                renderer.tag(done[0])
+                done = renderer.completed()
+            for item in done:
+                complete(*item)
+            if time.monotonic() - last_checkpoint >= 1.0:
+                checkpoint()
+                last_checkpoint = time.monotonic()
+    finally:
+        if renderer is not None:
+            with profiler.stage("render_png"):
+                for item in renderer.completed(wait=True):
+                    complete(*item)
+        checkpoint()
+        if stream is not None:
+            with profiler.stage("write_stream"):
+                stream.close()
+        if dataset is not None:
+            with profiler.stage("write_dataset"):
+                dataset.close()
+        if renderer is not None:
+            with profiler.stage("render_png"):
+                renderer.close()
+        if cprofiler is not None:
+            cprofiler.disable()
+            cprofiler.dump_stats(cprofile_output)
+
+    # acceptance statistics of the targeted generation
+    if stats["dags"] > 0:
+        print("Targeted DAGs: {}, tries: {} (acceptance rate {:.1%}), adjusted: {}".format(
+              stats["dags"], stats["tries"], stats["dags"] / stats["tries"], stats["adjusted"]),
+              file=sys.stderr)
+
+    # per-stage timings
+    if profiler.enabled:
+        for path in (config["misc"].get("stream_output"), config["misc"].get("dataset_output")):
+            if path and path != "-":
+                profiler.count("bytes_written", os.path.getsize(path))
+        profiler.wall = time.perf_counter() - t_start
+        print(profiler.summary(), file=sys.stderr)
+        if profile_output:
+            profiler.write_json(profile_output)
+        if trace_output:
+            profiler.write_trace(trace_output)
+
+    return stats
 
 
 if __name__ == "__main__":
@@ -208,10 +924,19 @@ if __name__ == "__main__":
     base_path = os.path.abspath(os.path.join(src_path, os.pardir))
 
     config_path = os.path.join(base_path, "config.json")
+    workers = 1
+    stream_output = None
+    dataset_output = None
+    profile = False
+    profile_output = None
+    trace_output = None
+    cprofile_output = None
+    resume = False
 
     try:
-        short_flags = "hc:d:e"
-        long_flags = ["help", "config=", "directory=", "evaluate"]
+        short_flags = "hc:d:ew:s:pr"
+        long_flags = ["help", "config=", "directory=", "evaluate", "workers=", "stream=", "dataset=",
+                      "profile", "profile-output=", "trace=", "cprofile=", "resume"]
         opts, args = getopt.getopt(sys.argv[1:], short_flags, long_flags)
     except getopt.GetoptError as err:
         logging.error(err)
@@ -224,5 +949,23 @@ if __name__ == "__main__":
             sys.exit()
         elif opt in ("-c", "--config"):
             config_path = arg
-
-    main(config_path=config_path)
+        elif opt in ("-w", "--workers"):
+            workers = int(arg)
+        elif opt in ("-s", "--stream"):
+            stream_output = arg
+        elif opt == "--dataset":
+            dataset_output = arg
+        elif opt in ("-p", "--profile"):
+            profile = True
+        elif opt == "--profile-output":
+            profile_output = arg
+        elif opt == "--trace":
+            trace_output = arg
+        elif opt == "--cprofile":
+            cprofile_output = arg
+        elif opt in ("-r", "--resume"):
+            resume = True
+
+    main(config_path=config_path, workers=workers, stream_output=stream_output,
+         dataset_output=dataset_output, profile=profile, profile_output=profile_output,
+         trace_output=trace_output, cprofile_output=cprofile_output, resume=resume)
@@ -0,0 +1,427 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+
+# -------------------------------------------------------------------------------
+# Randomized Multi-DAG Task Generator
+# Xiaotian Dai
+# Real-Time Systems Group
+# University of York, UK
+# -------------------------------------------------------------------------------
+
+# Generation service: keeps the generator loaded in a pool of worker
+# processes and serves tasksets on demand over localhost HTTP or a Unix
+# socket, as JSON Lines or in the binary dataset format.
+#
+#   POST /generate   {"config": {...}, "seed": 1, "sets": 10, "start": 0, "format": "jsonl"}
+#   GET  /metrics    request latency and throughput
+#   GET  /health
+
+import os, sys, logging, getopt, time, json
+import copy
+import importlib
+import socketserver
+import tempfile
+import threading
+from collections import deque
+from itertools import islice
+from concurrent.futures import ProcessPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+# daggen-cli.py has a hyphen, so we need importlib to import it
+_cli = importlib.import_module("daggen-cli")
+
+
+def print_usage_info():
+    logging.info("[Usage] python3 daggen-serve.py [--config config_file] [--host 127.0.0.1] [--port 8080] "
+                 "[--unix /path/to/socket] [--workers N] [--max-sets 10000]")
+
+
+FORMATS = ("jsonl", "binary")
+
+# errors of an invalid request or config (400); anything else is an error
+# of the service (500)
+CLIENT_ERRORS = (ValueError, KeyError, TypeError)
+
+
+def merge_config(base, fragment):
+    """ Function: merge a request config fragment into the base configuration
+    Inputs:
+        base (dict): configuration of the service (config.json)
+        fragment (dict): {section: {key: value}} overriding base
+    Returns:
+        config (dict): the configuration of the request, with file outputs
+            switched off and records returned to the service
+    """
+    config = copy.deepcopy(base)
+    for section, values in fragment.items():
+        if section not in config or not isinstance(values, dict):
+            raise ValueError("unknown config section: {}".format(section))
+        config[section].update(values)
+
+    misc = config["misc"]
+    misc.update(save_to_file=False, print_DAG=False, profile=False, stream_output=None,
+                dataset_output=None, return_records=True)
+    if config["dag_config"].get("large_graph", False):
+        raise ValueError("large_graph writes to disk and is not supported by the service")
+    if len(_cli.expand_sweep(config)) > 1:
+        raise ValueError("parameter sweeps are not supported by the service")
+    return config
+
+
+def parse_request(base, body, max_sets):
+    """ Returns (config, set indices, format) of a /generate request body. """
+    request = json.loads(body.decode() or "{}")
+    if not isinstance(request, dict):
+        raise ValueError("the request must be a JSON object")
+
+    config = merge_config(base, request.get("config", {}))
+    if "seed" in request:
+        config["misc"]["rnd_seed"] = request["seed"]
+
+    n_set = request.get("sets", 1)
+    start = request.get("start", 0)
+    if not isinstance(n_set, int) or not isinstance(start, int) or n_set < 1 or start < 0:
+        raise ValueError("sets must be a positive and start a non-negative integer")
+    if n_set > max_sets:
+        raise ValueError("at most {} sets per request".format(max_sets))
+
+    fmt = request.get("format", "jsonl")
+    if fmt not in FORMATS:
+        raise ValueError("format must be one of {}".format(", ".join(FORMATS)))
+    config["misc"]["return_arrays"] = fmt == "binary"
+    return config, range(start, start + n_set), fmt
+
+
+class ServiceMetrics:
+    """ Request counters and the latencies of the last window requests,
+    shared by the request threads. A request ends "ok", with an "error" of
+    the client (400, an invalid request or config), "failed" on an error of
+    the service (500) or "cancelled" by a client that disconnected.
+    """
+    def __init__(self, window=1000):
+        self.started = time.time()
+        self.requests = 0
+        self.errors = 0
+        self.failures = 0
+        self.cancelled = 0
+        self.in_flight = 0
+        self.sets = 0
+        self.bytes_sent = 0
+        self.latencies = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def begin(self):
+        with self._lock:
+            self.in_flight = self.in_flight + 1
+
+    def end(self, latency, sets=0, bytes_sent=0, outcome="ok"):
+        with self._lock:
+            self.in_flight = self.in_flight - 1
+            self.requests = self.requests + 1
+            self.errors = self.errors + int(outcome == "error")
+            self.failures = self.failures + int(outcome == "failed")
+            self.cancelled = self.cancelled + int(outcome == "cancelled")
+            self.sets = self.sets + sets
+            self.bytes_sent = self.bytes_sent + bytes_sent
+            self.latencies.append(latency)
+
+    def to_dict(self):
+        with self._lock:
+            uptime = time.time() - self.started
+            latencies = np.array(self.latencies) * 1000
+            metrics = {
+                "uptime": uptime,
+                "requests": self.requests,
+                "errors": self.errors,
+                "failures": self.failures,
+                "cancelled": self.cancelled,
+                "in_flight": self.in_flight,
+                "sets": self.sets,
+                "bytes_sent": self.bytes_sent,
+                "requests_per_s": self.requests / uptime,
+                "sets_per_s": self.sets / uptime,
+            }
+        if len(latencies) > 0:
+            p50, p90, p99 = np.percentile(latencies, [50, 90, 99])
+            metrics["latency_ms"] = {"mean": float(latencies.mean()), "p50": float(p50), "p90": float(p90),
+                                     "p99": float(p99), "max": float(latencies.max()),
+                                     "window": len(latencies)}
+        return metrics
+
+
+class GenerateHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def address_string(self):
+        # Unix socket clients have no address
+        return self.client_address[0] if self.client_address else "unix"
+
+    def send_json(self, status, obj):
+        body = json.dumps(obj).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+        return len(body)
+
+    def do_GET(self):
+        if self.path == "/metrics":
+            self.send_json(200, self.server.metrics.to_dict())
+        elif self.path == "/health":
+            self.send_json(200, {"status": "ok"})
+        else:
+            self.send_json(404, {"error": "not found"})
+
+    def do_POST(self):
+        if self.path != "/generate":
+            self.send_json(404, {"error": "not found"})
+            return
+
+        metrics = self.server.metrics
+        metrics.begin()
+        t0 = time.perf_counter()
+        sets, sent, outcome = 0, 0, "error"
+        try:
+            body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            try:
+                config, set_indices, fmt = parse_request(self.server.base_config, body, self.server.max_sets)
+            except CLIENT_ERRORS as err:
+                sent = self.send_json(400, {"error": str(err)})
+                return
+
+            if fmt == "binary":
+                sets, sent, outcome = self.send_binary(config, set_indices)
+            else:
+                sets, sent, outcome = self.send_jsonl(config, set_indices)
+        finally:
+            metrics.end(time.perf_counter() - t0, sets=sets, bytes_sent=sent, outcome=outcome)
+
+    def generate(self, config, set_indices):
+        """ Yields the record of every set, in order, from the worker pool.
+        At most server.window sets of a request are in the pool at once, so
+        a large request neither holds back concurrent ones nor piles up
+        records for a slow client; the next set is submitted as one is taken.
+        """
+        gen = _cli.gen_multi_dag_taskset if config["misc"]["multi-DAG_on"] else _cli.gen_single_dag
+        kwargs = {}
+        candidates = _cli.job_candidates(config)
+        if candidates is not None:
+            kwargs["candidates"] = candidates
+        pool = self.server.pool
+        indices = iter(set_indices)
+        futures = deque(pool.submit(gen, config, "", i, **kwargs) for i in islice(indices, self.server.window))
+        try:
+            while futures:
+                record = futures.popleft().result()[0]
+                for i in islice(indices, 1):
+                    futures.append(pool.submit(gen, config, "", i, **kwargs))
+                yield record
+        finally:
+            for future in futures:
+                future.cancel()
+
+    def send_failure(self, err, sets):
+        """ Answer an error of the generation before the response started:
+        400 for an invalid config, found by the first set, else 500.
+        Returns (sets, bytes sent, outcome).
+        """
+        if sets == 0 and isinstance(err, CLIENT_ERRORS):
+            return 0, self.send_json(400, {"error": str(err)}), "error"
+        self.log_error("generation failed: %r", err)
+        return 0, self.send_json(500, {"error": str(err)}), "failed"
+
+    def send_jsonl(self, config, set_indices):
+        """ Stream one JSON line per taskset as it is generated. Errors before
+        the first taskset are answered as in send_failure, later ones end the
+        stream with an {"error": ...} line.
+        """
+        records = self.generate(config, set_indices)
+        try:
+            first = next(records)
+        except Exception as err:
+            return self.send_failure(err, 0)
+
+        sets, sent, outcome = 0, 0, "ok"
+        try:
+            self.send_response(200)
+            self.send_header("Content-Type", "application/x-ndjson")
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+
+            record = first
+            while record is not None:
+                sent = sent + self.write_chunk(json.dumps(record, separators=(",", ":")) + "\n")
+                sets = sets + 1
+                try:
+                    record = next(records, None)
+                except Exception as err:
+                    self.log_error("generation failed: %r", err)
+                    sent = sent + self.write_chunk(json.dumps({"error": str(err)}) + "\n")
+                    outcome = "failed"
+                    break
+            self.write_chunk("")
+        except ConnectionError:
+            # the client went away: drop the rest of its sets
+            records.close()
+            self.close_connection = True
+            return sets, sent, "cancelled"
+        return sets, sent, outcome
+
+    def write_chunk(self, text):
+        data = text.encode()
+        self.wfile.write("{:x}\r\n".format(len(data)).encode() + data + b"\r\n")
+        return len(data)
+
+    def send_binary(self, config, set_indices):
+        """ Send the tasksets in the binary dataset format (utility.load_dataset),
+        built in a temporary file as the header needs the totals. Errors are
+        answered as in send_failure.
+        """
+        fd, path = tempfile.mkstemp(suffix=".bin")
+        os.close(fd)
+        try:
+            dataset = _cli.TasksetDatasetWriter(path)
+            sets = 0
+            try:
+                for record in self.generate(config, set_indices):
+                    dataset.write(record, record.pop("arrays"))
+                    sets = sets + 1
+            except Exception as err:
+                return self.send_failure(err, sets)
+            finally:
+                dataset.close()
+
+            with open(path, "rb") as f:
+                data = f.read()
+        finally:
+            os.remove(path)
+
+        try:
+            self.send_response(200)
+            self.send_header("Content-Type", "application/octet-stream")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+        except ConnectionError:
+            self.close_connection = True
+            return 0, 0, "cancelled"
+        return len(set_indices), len(data), "ok"
+
+
+class GenerateServer(ThreadingHTTPServer):
+    """ Localhost HTTP server; every request runs in its own thread and
+    generates its sets in the shared worker pool.
+    """
+    daemon_threads = True
+
+    def __init__(self, address, base_config, pool, max_sets=10000, window=8):
+        self.base_config = base_config
+        self.pool = pool
+        self.max_sets = max_sets
+        self.window = window
+        self.metrics = ServiceMetrics()
+        super().__init__(address, GenerateHandler)
+
+
+class UnixGenerateServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """ The same service on a Unix socket. """
+    daemon_threads = True
+
+    def __init__(self, path, base_config, pool, max_sets=10000, window=8):
+        self.base_config = base_config
+        self.pool = pool
+        self.max_sets = max_sets
+        self.window = window
+        self.metrics = ServiceMetrics()
+        if os.path.exists(path):
+            os.remove(path)
+        super().__init__(path, GenerateHandler)
+
+    def server_close(self):
+        super().server_close()
+        if os.path.exists(self.server_address):
+            os.remove(self.server_address)
+
+
+def make_server(config_path=None, host="127.0.0.1", port=8080, unix_socket=None, workers=0, max_sets=10000):
+    """ Create the service (not yet serving) with a pool of workers processes
+    (values below 1 use all CPUs); each request keeps up to 2 * workers
+    sets in the pool. Close it with server.server_close() and
+    server.pool.shutdown().
+    """
+    if config_path is None:
+        src_path = os.path.abspath(os.path.dirname(__file__))
+        config_path = os.path.join(src_path, os.pardir, "config.json")
+    base_config = _cli.parse_configuration(config_path)
+
+    if workers < 1:
+        workers = os.cpu_count() or 1
+    pool = ProcessPoolExecutor(max_workers=workers)
+    try:
+        if unix_socket is not None:
+            return UnixGenerateServer(unix_socket, base_config, pool, max_sets=max_sets, window=2 * workers)
+        return GenerateServer((host, port), base_config, pool, max_sets=max_sets, window=2 * workers)
+    except BaseException:
+        pool.shutdown()
+        raise
+
+
+def main(config_path=None, host="127.0.0.1", port=8080, unix_socket=None, workers=0, max_sets=10000):
+    server = make_server(config_path=config_path, host=host, port=port, unix_socket=unix_socket,
+                         workers=workers, max_sets=max_sets)
+    if unix_socket is not None:
+        print("Serving on unix:{}".format(unix_socket), file=sys.stderr)
+    else:
+        print("Serving on http://{}:{}".format(*server.server_address[:2]), file=sys.stderr)
+
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        server.pool.shutdown()
+
+
+if __name__ == "__main__":
+    ############################################################################
+    # Parse cmd arguments
+    ############################################################################
+    config_path = None
+    host = "127.0.0.1"
+    port = 8080
+    unix_socket = None
+    workers = 0
+    max_sets = 10000
+
+    try:
+        short_flags = "hc:H:p:u:w:"
+        long_flags = ["help", "config=", "host=", "port=", "unix=", "workers=", "max-sets="]
+        opts, args = getopt.getopt(sys.argv[1:], short_flags, long_flags)
+    except getopt.GetoptError as err:
+        logging.error(err)
+        print_usage_info()
+        sys.exit(2)
+
+    for opt, arg in opts:
+        if opt in ("-h", "--help"):
+            print_usage_info()
+            sys.exit()
+        elif opt in ("-c", "--config"):
+            config_path = arg
+        elif opt in ("-H", "--host"):
+            host = arg
+        elif opt in ("-p", "--port"):
+            port = int(arg)
+        elif opt in ("-u", "--unix"):
+            unix_socket = arg
+        elif opt in ("-w", "--workers"):
+            workers = int(arg)
+        elif opt == "--max-sets":
+            max_sets = int(arg)
+
+    main(config_path=config_path, host=host, port=port, unix_socket=unix_socket, workers=workers,
+         max_sets=max_sets)
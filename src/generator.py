@@ -11,6 +11,7 @@
 import numpy as np
 import random
 import math
+from functools import lru_cache
 
 
 def uunifast_discard(n, u, nsets, ulimit=1):
@@ -46,6 +47,78 @@ def uunifast_discard(n, u, nsets, ulimit=1):
 
     return sets
 
+def uunifast_discard_np(n, u, nsets, ulimit=1, rng=None, batch=None, max_batch=65536, max_draws=10000000):
+    """ Function: UUniFast-discard (vectorized NumPy engine)
+    Draws whole (batch, n) blocks of UUniFast vectors and rejects the rows
+    in which a utilization exceeds ulimit. The batch size adapts to the
+    observed acceptance rate until nsets rows are accepted. With u equal to
+    n * ulimit, every task gets ulimit (the only solution).
+    Inputs:
+        n (int): number of tasks
+        u (float): total utilization
+        nsets (int): number of sets
+        ulimit: upper limit of the utlization of a single DAG
+        rng: numpy.random.Generator, seed or None
+        batch (int): size of the first batch (default: nsets)
+        max_batch (int): upper limit of the batch size
+        max_draws (int): number of vectors drawn before giving up, raising
+            a RuntimeError (u is then too close to n * ulimit)
+    Returns:
+        sets (numpy.ndarray): array of shape (nsets, n)
+    """
+    if u > n * ulimit:
+        # no feasible solution
+        raise ValueError("u = {} is not reachable with {} tasks of at most {}".format(u, n, ulimit))
+
+    if abs(n * ulimit - u) < 1e-10:
+        # the only solution, which a draw never hits
+        return np.full((nsets, n), float(ulimit))
+
+    rng = np.random.default_rng(rng)
+
+    # exponents 1 / (n - i) for i = 1, ..., n - 1
+    exponents = 1.0 / np.arange(n - 1, 0, -1)
+
+    sets = np.empty((nsets, n))
+    accepted = 0
+    drawn = 0
+    if batch is None:
+        batch = nsets
+    batch = max(1, min(batch, max_batch))
+
+    while accepted < nsets:
+        if drawn >= max_draws:
+            raise RuntimeError("uunifast_discard_np: {} of {} sets accepted in {} draws, "
+                               "u = {} is too close to {} tasks of at most {}".format(
+                                   accepted, nsets, drawn, u, n, ulimit))
+
+        # Classic UUniFast algorithm on a whole block:
+        # sumU_i = sumU_(i-1) * r_i ^ (1 / (n - i)), u_i = sumU_(i-1) - sumU_i
+        sum_u = np.empty((batch, n))
+        sum_u[:, 0] = u
+        sum_u[:, 1:] = u * np.cumprod(rng.random((batch, n - 1)) ** exponents, axis=1)
+        utilizations = np.empty((batch, n))
+        utilizations[:, :-1] = sum_u[:, :-1] - sum_u[:, 1:]
+        utilizations[:, -1] = sum_u[:, -1]
+
+        # keep the rows in which no task utilization exceeds ulimit
+        valid = utilizations[np.all(utilizations <= ulimit, axis=1)]
+        k = min(len(valid), nsets - accepted)
+        sets[accepted:accepted + k] = valid[:k]
+        accepted = accepted + k
+        drawn = drawn + batch
+
+        # adapt the next batch to the observed acceptance rate
+        remaining = nsets - accepted
+        if accepted == 0:
+            batch = batch * 2
+        else:
+            batch = math.ceil(1.1 * remaining * drawn / accepted)
+        batch = max(1, min(batch, max_batch, max_draws - drawn))
+
+    return sets
+
+
 def drs_gen(n, u, nsets, ulimit=1):
     """ Function: DRS (Dirichlet-Rescale)
     Inputs:
@@ -64,6 +137,104 @@ def drs_gen(n, u, nsets, ulimit=1):
             sets.append(list(vec))
     return sets
 
+@lru_cache(maxsize=128)
+def _drs_setup(n, sumu, upper_bounds):
+    """ Rescale state of DRS that only depends on (n, sumu, upper_bounds):
+    the unit-simplex limits and, if the constraint simplex is smaller than
+    the standard simplex, the matrix that maps results back (see drs.ssr).
+    """
+    from drs import drs_module
+
+    limits = np.asarray([min(1, ub / sumu) for ub in upper_bounds], dtype=drs_module.DTYPE)
+    limits_simplex = drs_module.cts(limits)
+    try:
+        limits_simplex_vol = drs_module.cm_matrix_det_ns(limits_simplex)
+    except (ValueError, FloatingPointError):
+        limits_simplex_vol = 0
+
+    if limits_simplex_vol < drs_module.standard_simplex_vol(n):
+        matrix = drs_module.rmss(limits_simplex)
+        new_limits = drs_module.embed_mult_debed(matrix, np.zeros(n))
+        inv_matrix = drs_module.rmss(drs_module.cts(new_limits))
+        return new_limits, inv_matrix
+    else:
+        return limits, None
+
+
+def _drs_chunk(n, u, ulimit, size, seed):
+    """ Draw size DRS vectors with a generator seeded by seed.
+    """
+    from drs import drs_module
+
+    rng = np.random.default_rng(seed)
+    limits, inv_matrix = _drs_setup(n, u, (ulimit,) * n)
+
+    sets = np.empty((size, n))
+    accepted = 0
+    while accepted < size:
+        # unit Dirichlet initial points
+        coords = -np.log1p(-rng.random((size - accepted, n)))
+        coords = coords / coords.sum(axis=1, keepdims=True)
+
+        # most points are already within the limits, only rescale the others
+        for k in np.nonzero(np.any(coords > limits, axis=1))[0]:
+            _, point = drs_module.rescale(limits, coords[k])
+            coords[k] = np.nan if point is None else point
+
+        if inv_matrix is not None:
+            coords = coords @ inv_matrix[:-1, :-1].T + inv_matrix[:-1, -1]
+
+        # reject diverged and negative vectors
+        valid = coords[np.all(coords >= 0, axis=1)] * u
+        sets[accepted:accepted + len(valid)] = valid
+        accepted = accepted + len(valid)
+
+    return sets
+
+
+def drs_gen_batch(n, u, nsets, ulimit=1, rng=None, workers=1, chunk=1024):
+    """ Function: DRS (Dirichlet-Rescale, batch mode)
+    Draws all vectors as one NumPy array and reuses the rescale state of
+    (n, u, ulimit) across draws. The sets are drawn in chunks with their
+    own seeds, so the result does not depend on the number of workers.
+    Inputs:
+        n (int): number of tasks
+        u (float): total utilization
+        nsets (int): number of sets
+        ulimit: upper limit of the utilization of a single DAG
+        rng: numpy.random.Generator, seed or None
+        workers (int): number of worker processes for large batches
+        chunk (int): number of sets drawn per seed
+    Returns:
+        sets (numpy.ndarray): array of shape (nsets, n)
+    """
+    if u > n * ulimit:
+        # no feasible solution
+        raise ValueError("u = {} is not reachable with {} tasks of at most {}".format(u, n, ulimit))
+
+    rng = np.random.default_rng(rng)
+
+    if n == 1 or abs(n * ulimit - u) < 1e-10:
+        # the only solution
+        return np.full((nsets, n), u / n)
+
+    sizes = [min(chunk, nsets - k) for k in range(0, nsets, chunk)]
+    seeds = rng.integers(2 ** 63, size=len(sizes))
+    args = ([n] * len(sizes), [u] * len(sizes), [ulimit] * len(sizes), sizes, seeds)
+
+    if workers > 1 and len(sizes) > 1:
+        from concurrent.futures import ProcessPoolExecutor
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            chunks = list(executor.map(_drs_chunk, *args))
+    else:
+        chunks = list(map(_drs_chunk, *args))
+
+    if len(chunks) == 0:
+        return np.empty((0, n))
+
+    return np.concatenate(chunks)
+
+
 # random generate periods from a population set
 def gen_period(population, n):
     periods = []
@@ -79,6 +250,97 @@ def gen_period(population, n):
     return periods
 
 
+def gen_period_bounded(population, n, max_hyperperiod, weights=None):
+    """ Function: periods with a bounded hyperperiod
+    Like gen_period, but every choice only considers the candidates that
+    keep the LCM of the periods drawn so far within max_hyperperiod. Once a
+    period is drawn, its divisors (and itself) always remain, so the draw
+    never gets stuck.
+    Inputs:
+        population (list): integer period candidates
+        n (int): number of tasks
+        max_hyperperiod (int): upper bound of the hyperperiod
+        weights (list): relative weight of each candidate (default: equal)
+    Returns:
+        periods (list), hyperperiod (int)
+    """
+    candidates = np.asarray(population, dtype=np.int64)
+    if weights is not None:
+        weights = np.asarray(weights, dtype=float)
+
+    periods = []
+    H = 1
+    for _ in range(n):
+        # LCM(H, c) = H / gcd(H, c) * c; H only grows by multiples, so a
+        # candidate that exceeds the bound once is dropped for good
+        ok = (H // np.gcd(H, candidates)) * candidates <= max_hyperperiod
+        candidates = candidates[ok]
+        if weights is not None:
+            weights = weights[ok]
+        if len(candidates) == 0:
+            raise ValueError("no period is within the hyperperiod bound {}".format(max_hyperperiod))
+
+        if weights is None:
+            period = int(candidates[random.randrange(len(candidates))])
+        else:
+            period = int(random.choices(candidates, weights=weights)[0])
+
+        periods.append(period)
+        H = H // math.gcd(H, period) * period
+
+    return periods, H
+
+
+PERIOD_MODES = ("choice", "uniform", "loguniform", "harmonic")
+
+
+def gen_period_np(n, nsets=1, mode="choice", population=None, low=None, high=None,
+                  granularity=1, ratio=2, rng=None):
+    """ Function: period sampler (NumPy)
+    Inputs:
+        n (int): number of tasks
+        nsets (int): number of sets
+        mode (str):
+            "choice": uniform choice from population (any number of values)
+            "uniform": uniform integers in [low, high]
+            "loguniform": log-uniform in [low, high], rounded down to a
+                multiple of granularity (Emberson et al.)
+            "harmonic": low * ratio^k in [low, high], k uniform, so every
+                period divides the larger ones
+        rng: seed or np.random.Generator
+    Returns:
+        periods (np.ndarray): (nsets, n) period matrix
+    """
+    rng = np.random.default_rng(rng)
+    size = (nsets, n)
+
+    if mode == "choice":
+        return rng.choice(np.asarray(population), size=size)
+
+    if mode not in PERIOD_MODES:
+        raise ValueError("unknown period mode: {}".format(mode))
+    if low is None or high is None or not 0 < low <= high:
+        raise ValueError("mode {} needs 0 < low <= high".format(mode))
+
+    if mode == "uniform":
+        return rng.integers(low, high, size=size, endpoint=True)
+
+    if mode == "loguniform":
+        # log-uniform in [low, high + granularity), so high can be drawn
+        r = rng.uniform(np.log(low), np.log(high + granularity), size=size)
+        periods = np.floor(np.exp(r) / granularity) * granularity
+        periods = np.clip(periods, low, high)
+        if float(granularity).is_integer():
+            periods = periods.astype(np.int64)
+        return periods
+
+    # harmonic: k_max is the largest power with low * ratio^k <= high
+    k_max = 0
+    while low * ratio ** (k_max + 1) <= high:
+        k_max = k_max + 1
+    return low * ratio ** rng.integers(0, k_max, size=size, endpoint=True)
+
+
 # distribute workloads, w, to n nodes
 def gen_execution_times(n, w, round_c=False, dummy=False):
     c_set = []
@@ -133,6 +395,87 @@ def gen_execution_times(n, w, round_c=False, dummy=False):
     return c_dict
 
 
+def gen_execution_times_np(n, w, round_c=False, dummy=False, rng=None,
+                           distribution="dirichlet", alpha=1.0):
+    """ Function: distribute a workload w to n nodes (NumPy)
+    Inputs:
+        n (int): number of nodes
+        w (float): workload
+        round_c (bool): round to integers >= 1 that sum exactly to w
+        dummy (bool): source and sink (nodes 1 and n) get a unit execution time
+        rng: seed or np.random.Generator
+        distribution: "dirichlet" (symmetric, concentration alpha; alpha=1 is
+            a flat split of w), "uniform" (normalised uniform values, as
+            gen_execution_times) or a function (rng, size) -> weights
+    Returns:
+        c (np.ndarray): execution time of node v at [v - 1]
+        With round_c and a workload below the node count, the sum cannot be
+        kept: every value is clamped to >= 1 as in gen_execution_times.
+    """
+    rng = np.random.default_rng(rng)
+
+    # a dummy source / sink node only has unit execution times
+    m = n - 2 if dummy else n
+    w_m = w - 2 if dummy else w
+
+    if distribution == "dirichlet":
+        weights = rng.dirichlet(np.full(m, alpha)) if m > 0 else np.zeros(0)
+    elif distribution == "uniform":
+        weights = rng.random(m)
+    elif callable(distribution):
+        weights = np.asarray(distribution(rng, m), dtype=float)
+    else:
+        raise ValueError("unknown distribution: {}".format(distribution))
+
+    c = w_m * weights / weights.sum() if m > 0 else weights
+    if round_c:
+        if m == 0:
+            c = c.astype(np.int64)
+        elif w_m < m:
+            c = np.maximum(np.round(c), 1).astype(np.int64)
+        else:
+            c = round_to_sum(c, w_m, minimum=1)
+
+    if dummy:
+        c = np.concatenate(([1], c, [1]))
+
+    return c
+
+
+def round_to_sum(c, total, minimum=0):
+    """ Function: largest-remainder rounding
+    Inputs:
+        c (array): non-negative values
+        total (int): sum of the rounded values
+        minimum (int): lower bound of every rounded value
+    Returns:
+        values (np.ndarray of int) that sum to total
+    """
+    c = np.asarray(c, dtype=float)
+    total = int(round(total))
+    n = len(c)
+    if n == 0 or total < minimum * n:
+        raise ValueError("cannot round {} values >= {} to a sum of {}".format(n, minimum, total))
+
+    floor = np.floor(c)
+    frac = c - floor
+    values = np.maximum(floor, minimum)
+    rest = total - int(values.sum())
+
+    if rest > 0:
+        # hand out the missing units by the largest remainders
+        values = values + rest // n
+        values[np.argsort(-frac, kind="stable")[:rest % n]] += 1
+    while rest < 0:
+        # take units back from the values above the minimum, smallest remainders first
+        idx = np.flatnonzero(values > minimum)
+        idx = idx[np.argsort(frac[idx], kind="stable")][:-rest]
+        values[idx] -= 1
+        rest = rest + len(idx)
+
+    return values.astype(np.int64)
+
+
 if __name__ == "__main__":
     number_of_tasks = 10
 
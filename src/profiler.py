@@ -0,0 +1,108 @@
+#!/usr/bin/python3
+# -*- coding: utf-8 -*-
+
+# -------------------------------------------------------------------------------
+# Randomized Multi-DAG Task Generator
+# Xiaotian Dai
+# Real-Time Systems Group
+# University of York, UK
+# -------------------------------------------------------------------------------
+
+import os
+import json
+import time
+from collections import Counter
+from contextlib import contextmanager, nullcontext
+
+
+# Class: StageProfiler (per-stage timings of a generation run)
+class StageProfiler:
+    """ Collects the wall-clock and CPU time and the number of calls of every
+    stage of a run, plus counters (DAGs, nodes, bytes written, ...).
+    Profilers of worker processes are merged into the main one with merge().
+    With trace=True, every stage call is also kept as a Chrome trace event.
+    A disabled profiler costs one function call per stage.
+    """
+    def __init__(self, enabled=True, trace=False):
+        self.enabled = enabled
+        self.stages = {}            # name: [calls, wall, cpu]
+        self.counts = Counter()
+        self.events = [] if (enabled and trace) else None
+        self.wall = None            # wall-clock time of the whole run
+
+    def stage(self, name):
+        """ Context manager that times one call of the stage name. """
+        if not self.enabled:
+            return nullcontext()
+        return self._stage(name)
+
+    @contextmanager
+    def _stage(self, name):
+        t0 = time.perf_counter_ns()
+        c0 = time.process_time()
+        try:
+            yield
+        finally:
+            wall = (time.perf_counter_ns() - t0) / 1e9
+            cpu = time.process_time() - c0
+
+            s = self.stages.setdefault(name, [0, 0.0, 0.0])
+            s[0] = s[0] + 1
+            s[1] = s[1] + wall
+            s[2] = s[2] + cpu
+
+            if self.events is not None:
+                self.events.append({"name": name, "ph": "X", "ts": t0 / 1000, "dur": wall * 1e6,
+                                    "pid": os.getpid(), "tid": 0})
+
+    def count(self, name, k=1):
+        if self.enabled:
+            self.counts[name] += k
+
+    def merge(self, other):
+        """ Add the stages, counters and trace events of another profiler. """
+        if other is None or not self.enabled:
+            return
+        for name, (calls, wall, cpu) in other.stages.items():
+            s = self.stages.setdefault(name, [0, 0.0, 0.0])
+            s[0] = s[0] + calls
+            s[1] = s[1] + wall
+            s[2] = s[2] + cpu
+        self.counts.update(other.counts)
+        if self.events is not None and other.events is not None:
+            self.events.extend(other.events)
+
+    def to_dict(self):
+        return {
+            "wall": self.wall,
+            "stages": {name: {"calls": calls, "wall": wall, "cpu": cpu}
+                       for name, (calls, wall, cpu) in self.stages.items()},
+            "counts": dict(self.counts),
+        }
+
+    def summary(self):
+        """ Returns the stages and counters as a text table. Stage times of
+        worker processes add up, so their sum can exceed the run time.
+        """
+        lines = ["{:<24s} {:>8s} {:>10s} {:>10s} {:>7s} {:>10s}".format(
+                 "stage", "calls", "wall [s]", "cpu [s]", "wall %", "ms/call")]
+        for name, (calls, wall, cpu) in sorted(self.stages.items(), key=lambda s: -s[1][1]):
+            share = 100 * wall / self.wall if self.wall else 0
+            lines.append("{:<24s} {:>8d} {:>10.3f} {:>10.3f} {:>6.1f}% {:>10.3f}".format(
+                         name, calls, wall, cpu, share, 1000 * wall / calls))
+        if self.wall is not None:
+            lines.append("{:<24s} {:>8s} {:>10.3f}".format("run", "", self.wall))
+        for name in sorted(self.counts):
+            lines.append("{:<24s} {:>8d}".format(name, self.counts[name]))
+        return "\n".join(lines)
+
+    def write_json(self, path):
+        with open(path, "w") as f:
+            json.dump(self.to_dict(), f, indent=2)
+
+    def write_trace(self, path):
+        """ Write the stage calls in the Chrome trace event format (open in
+        chrome://tracing or Perfetto), one row per process.
+        """
+        with open(path, "w") as f:
+            json.dump({"traceEvents": self.events or [], "displayTimeUnit": "ms"}, f)
@@ -10,54 +10,452 @@
 
 import os
 import json
+from array import array
+from collections import Counter, deque
+from math import gcd
+import numpy as np
 import networkx as nx
-from networkx.drawing.nx_agraph import graphviz_layout, to_agraph
-import pygraphviz as pgv
 
-from random import seed, randint, random
+from random import seed, randint, random, getrandbits
 
-import matplotlib.pyplot as plt
-import matplotlib.image as mpimg
+# pygraphviz (through nx.nx_agraph) and matplotlib are imported on first use,
+# as they take most of the import time and are only needed for images
+
+from generator import uunifast_discard, gen_period, gen_execution_times, round_to_sum
 
 
 # Class: DAGTaskset
 class DAGTaskset:
+    """ A set of DAG tasks. U, T, W and L of the k-th task in self.tasks are
+    kept in NumPy arrays (self.U[k], ...), taken when the task is added.
+    The total utilization, hyperperiod and maximum L are updated on every
+    add() and remove() without going over all tasks again.
+    """
     def __init__(self):
         self.rnd_seed = randint(1, 1000)
         self.util = 0
         self.task_number = 0
         self.tasks = []
 
-    def gen(self, u, n):
-        # generate tasks
+        # per-task parameters, one row (U, T, W, L) per task
+        self._params = np.empty((16, 4))
+
+        # aggregates: number of tasks with a given period / critical path
+        self._periods = Counter()
+        self._lengths = Counter()
+        self.hyperperiod = 1
+        self.L_max = None
+
+    @property
+    def U(self):
+        return self._params[:self.task_number, 0]
+
+    @property
+    def T(self):
+        return self._params[:self.task_number, 1]
+
+    @property
+    def W(self):
+        return self._params[:self.task_number, 2]
+
+    @property
+    def L(self):
+        return self._params[:self.task_number, 3]
 
+    def __len__(self):
+        return self.task_number
+
+    def __iter__(self):
+        return iter(self.tasks)
+
+    def gen(self, u, n, period_set, ulimit=1, dummy=False, **dag_config):
+        """ Generate n DAG tasks with a total utilization of u and add them.
+        dag_config is passed to DAG.gen_rnd().
+        """
         # generate utilizations
+        U = uunifast_discard(n, u=u, nsets=1, ulimit=ulimit)[0]
 
         # generate periods
+        periods = gen_period(period_set, n)
 
-        # generate execution times
-        pass
+        for i in range(n):
+            # generate tasks
+            tau = DAG(i=self.task_number, U=U[i], T=periods[i], W=U[i] * periods[i])
+            tau.gen_rnd(**dag_config)
+
+            # generate execution times
+            c = gen_execution_times(tau.get_number_of_nodes(), tau.W, round_c=True, dummy=dummy)
+            tau.set_execution_times(c)
+
+            self.add(tau)
 
     def add(self, tau):
         # add a task to taskset
-        pass
+        if self.task_number == len(self._params):
+            self._params = np.concatenate((self._params, np.empty_like(self._params)))
+
+        self._params[self.task_number] = (tau.U, tau.T, tau.W, tau.L)
+        self.tasks.append(tau)
+        self.task_number = self.task_number + 1
+        self.util = self.util + tau.U
+
+        self._periods[tau.T] += 1
+        if self.hyperperiod is not None:
+            self.hyperperiod = _lcm(self.hyperperiod, tau.T)
+
+        self._lengths[tau.L] += 1
+        if self.L_max is None or tau.L > self.L_max:
+            self.L_max = tau.L
 
     def remove(self, tau):
-        # remove a task from taskset
-        pass
+        """ Remove a task from the taskset; tau is a DAG of the taskset or
+        its index in self.tasks. Returns the removed DAG.
+        """
+        k = tau if isinstance(tau, (int, np.integer)) else self.tasks.index(tau)
+        tau = self.tasks.pop(k)
+
+        U, T, W, L = self._params[k]
+        self._params[k:self.task_number - 1] = self._params[k + 1:self.task_number]
+        self.task_number = self.task_number - 1
+        self.util = self.util - U if self.task_number > 0 else 0
+
+        # only the distinct periods / lengths are visited when the last task
+        # with a value goes away
+        self._periods[T] -= 1
+        if self._periods[T] == 0:
+            del self._periods[T]
+            self.hyperperiod = 1
+            for period in self._periods:
+                self.hyperperiod = _lcm(self.hyperperiod, period)
+
+        self._lengths[L] -= 1
+        if self._lengths[L] == 0:
+            del self._lengths[L]
+            if L == self.L_max:
+                self.L_max = max(self._lengths) if self._lengths else None
+
+        return tau
+
+    def to_dict(self):
+        """ Returns the taskset in the taskset.json format:
+        {"util", "hyperperiod", "tasks": [DAG.to_dict(), ...]}
+        util is the sum of the task utilizations U as drawn; the realized
+        utilization of the generated DAGs is the sum of their W / T.
+        """
+        return {"util": self.util, "hyperperiod": self.hyperperiod,
+                "tasks": [tau.to_dict() for tau in self.tasks]}
 
-    def dump(self):
+    def dump(self, path):
         # dump tasksets into a json file
-        pass
+        with open(path, "w") as f:
+            json.dump(self.to_dict(), f, indent=2)
+
+    def load(self, path):
+        # load tasksets from a json file (tasks are added to this taskset)
+        with open(path, "r") as f:
+            taskset = json.load(f)
+
+        for task in taskset["tasks"]:
+            self.add(DAG.from_dict(task))
+
+        return self
+
+
+def _lcm(a, b):
+    """ Least common multiple of two integral periods, None if a period is
+    not integral (the hyperperiod is then undefined).
+    """
+    if a is None or b is None or a != int(a) or b != int(b):
+        return None
+    a, b = int(a), int(b)
+    return a * b // gcd(a, b)
+
+
+def _longest_paths(C, src, dst, graph=None, n_graphs=1):
+    """ Function: C-weighted longest paths of a batch of DAGs in flat arrays
+    Kahn's algorithm run level by level: every step finishes all nodes whose
+    predecessors are finished and relaxes their out-edges, in all DAGs at
+    once, so the number of steps is the depth of the deepest DAG.
+    Inputs:
+        C (array): execution time of node v at [v] (nodes 0..N-1 of all DAGs)
+        src, dst (array): edges (src[e], dst[e])
+        graph (array): the DAG of node v at [v], None for a single DAG
+        n_graphs (int): number of DAGs
+    Returns:
+        L (array): critical path length of every DAG
+    """
+    C = np.asarray(C, dtype=float)
+    n = len(C)
+    src = np.asarray(src, dtype=np.int64)
+    dst = np.asarray(dst, dtype=np.int64)
+
+    # out-edges of node v are dst[offsets[v]:offsets[v + 1]]
+    order = np.argsort(src, kind="stable")
+    dst = dst[order]
+    offsets = np.zeros(n + 1, dtype=np.int64)
+    np.cumsum(np.bincount(src, minlength=n), out=offsets[1:])
+
+    indegree = np.bincount(dst, minlength=n)
+    start = np.zeros(n)
+    finish = np.zeros(n)
+
+    frontier = np.flatnonzero(indegree == 0)
+    n_done = 0
+    while len(frontier) > 0:
+        finish[frontier] = start[frontier] + C[frontier]
+        n_done = n_done + len(frontier)
+
+        # out-edges of the frontier
+        counts = offsets[frontier + 1] - offsets[frontier]
+        total = int(counts.sum())
+        if total == 0:
+            break
+        first = np.repeat(offsets[frontier] - np.cumsum(counts) + counts, counts)
+        edges = first + np.arange(total)
+        children = dst[edges]
+
+        np.maximum.at(start, children, np.repeat(finish[frontier], counts))
+        np.subtract.at(indegree, children, 1)
+        frontier = np.unique(children[indegree[children] == 0])
+
+    if n_done < n:
+        raise ValueError("the graph has a cycle")
+
+    L = np.zeros(n_graphs)
+    if graph is None:
+        L[0] = finish.max() if n > 0 else 0
+    else:
+        np.maximum.at(L, graph, finish)
+    return L
+
+
+def _longest_path(C, src, dst, path=False):
+    """ C-weighted longest path of a single DAG with nodes 0..N-1, by a
+    topological pass over the edges (Kahn's algorithm). Cheaper than
+    _longest_paths() for one small DAG. With path=True, returns the length
+    and the nodes of a longest path.
+    """
+    n = len(C)
+    children = [[] for _ in range(n)]
+    indegree = [0] * n
+    for u, v in zip(src, dst):
+        children[u].append(v)
+        indegree[v] = indegree[v] + 1
+
+    start = [0] * n
+    pred = [-1] * n
+    ready = [v for v in range(n) if indegree[v] == 0]
+    L = 0
+    last = -1
+    n_done = 0
+    while ready:
+        u = ready.pop()
+        n_done = n_done + 1
+        finish = start[u] + C[u]
+        if finish > L or last < 0:
+            L = finish
+            last = u
+        for v in children[u]:
+            if finish > start[v] or pred[v] < 0:
+                start[v] = finish
+                pred[v] = u
+            indegree[v] = indegree[v] - 1
+            if indegree[v] == 0:
+                ready.append(v)
+
+    if n_done < n:
+        raise ValueError("the graph has a cycle")
+
+    if not path:
+        return L
+
+    nodes = []
+    while last >= 0:
+        nodes.append(last)
+        last = pred[last]
+    return L, nodes[::-1]
+
+
+def critical_path_batch(tasks):
+    """ Function: critical path lengths of a batch of DAGs in array form
+    Inputs:
+        tasks (list): DAGs or dicts with "src", "dst" and "C" arrays as
+            returned by DAG.to_arrays() (node v of a DAG has C at [v - 1])
+    Returns:
+        L (array): critical path length of every DAG
+    """
+    tasks = [t.to_arrays() if isinstance(t, DAG) else t for t in tasks]
+    if len(tasks) == 0:
+        return np.zeros(0)
+
+    n_nodes = np.array([len(t["C"]) for t in tasks])
+    n_edges = np.array([len(t["src"]) for t in tasks])
+    node_off = np.concatenate(([0], np.cumsum(n_nodes)[:-1]))
+
+    # node ids of all DAGs are shifted into one range 0..N-1
+    shift = np.repeat(node_off - 1, n_edges)
+    src = np.concatenate([t["src"] for t in tasks]).astype(np.int64) + shift
+    dst = np.concatenate([t["dst"] for t in tasks]).astype(np.int64) + shift
+    C = np.concatenate([t["C"] for t in tasks])
+    graph = np.repeat(np.arange(len(tasks)), n_nodes)
+
+    return _longest_paths(C, src, dst, graph=graph, n_graphs=len(tasks))
+
+
+# output formats supported by DAG.save()
+SAVE_FORMATS = ("png", "gpickle", "gml", "json", "binary")
+
+
+def render_png(G, path):
+    """ Layout the graph G with Graphviz and draw it to a png file.
+    Module level, so it can run in a worker process.
+    """
+    A = nx.nx_agraph.to_agraph(G)
+    A.layout(prog='dot')
+    A.draw(path, format="png")
+
+
+# Class: PNGRenderer (background Graphviz rendering)
+class PNGRenderer:
+    """ Renders DAG images in a pool of background processes, so generation
+    does not wait for Graphviz. At most max_pending images are queued before
+    submit() blocks on the oldest one. tag() marks the images submitted so
+    far (e.g. those of a set); completed() returns the tags whose images are
+    all written.
+    """
+    def __init__(self, workers=None, max_pending=None):
+        from concurrent.futures import ProcessPoolExecutor
+        self.executor = ProcessPoolExecutor(max_workers=workers)
+        if max_pending is None:
+            max_pending = 4 * (workers or os.cpu_count() or 1)
+        self.max_pending = max_pending
+        self.pending = deque()
+        self.submitted = 0
+        self.written = 0
+        self.error = None
+        self._tags = deque()
+
+    def submit(self, G, path):
+        while len(self.pending) >= self.max_pending and self.error is None:
+            self._wait_oldest()
+        if self.error is not None:
+            raise self.error
+        self.pending.append(self.executor.submit(render_png, G, path))
+        self.submitted = self.submitted + 1
+
+    def _wait_oldest(self):
+        try:
+            self.pending[0].result()
+        except Exception as err:
+            # the failed image stays pending, so no later tag completes
+            self.error = err
+        else:
+            self.pending.popleft()
+            self.written = self.written + 1
 
-    def load(self):
-        # load tasksets from a json file
-        pass
+    def tag(self, tag):
+        """ Mark the images submitted since the last tag as those of tag. """
+        self._tags.append((self.submitted, tag))
+
+    def completed(self, wait=False):
+        """ Returns the tags whose images are all written, in tag order, and
+        forgets them. With wait, waits for the pending images first. After
+        an error of a worker, only the tags before the failed image complete.
+        """
+        while self.pending and self.error is None and (wait or self.pending[0].done()):
+            self._wait_oldest()
+        tags = []
+        while self._tags and self._tags[0][0] <= self.written:
+            tags.append(self._tags.popleft()[1])
+        return tags
+
+    def close(self):
+        """ Wait for all images; errors of the workers are raised here. """
+        try:
+            self.completed(wait=True)
+            if self.error is not None:
+                raise self.error
+        finally:
+            self.pending.clear()
+            self.executor.shutdown()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+# Class: GraphArrays (compact DAG storage for the "array" engine)
+class GraphArrays:
+    """ Records a generated DAG in flat integer arrays instead of an
+    nx.DiGraph. It accepts the add_node/add_edge calls made by the DAG
+    generators (nodes are numbered 1, 2, ...) and is converted to an
+    nx.DiGraph only when one is needed.
+    """
+    def __init__(self, **attr):
+        self.graph = attr
+        self.rank = array('i')     # rank of node v at [v - 1], -1 if not set
+        self.src = array('i')      # edge sources
+        self.dst = array('i')      # edge destinations
+        self.edge_attr = {}        # sparse edge attributes {edge index: dict}
+        self.C = None              # execution time of node v at [v - 1]
+
+    def _grow(self, v):
+        if v > len(self.rank):
+            self.rank.extend([-1] * (v - len(self.rank)))
+
+    def add_node(self, v, rank=-1):
+        self._grow(v)
+        self.rank[v - 1] = rank
+
+    def add_edge(self, u, v, **attr):
+        self._grow(max(u, v))
+        if attr:
+            self.edge_attr[len(self.src)] = attr
+        self.src.append(u)
+        self.dst.append(v)
+
+    def add_edges_from(self, edges):
+        for u, v in edges:
+            self.add_edge(u, v)
+
+    def number_of_nodes(self):
+        return len(self.rank)
+
+    def number_of_edges(self):
+        return len(self.src)
+
+    def edges(self):
+        """ Returns the edges as a (2, E) NumPy array of (src, dst). """
+        return np.vstack((np.frombuffer(self.src, dtype=np.int32),
+                          np.frombuffer(self.dst, dtype=np.int32)))
+
+    def to_networkx(self):
+        G = nx.DiGraph(**self.graph)
+
+        C = None if self.C is None else self.C.tolist()
+
+        for v, r in enumerate(self.rank, start=1):
+            attr = {}
+            if r >= 0:
+                attr['rank'] = r
+            if C is not None:
+                attr['C'] = C[v - 1]
+            G.add_node(v, **attr)
+
+        for k, (u, v) in enumerate(zip(self.src, self.dst)):
+            attr = dict(self.edge_attr.get(k, {}))
+            if C is not None:
+                attr['label'] = C[u - 1]
+            G.add_edge(u, v, **attr)
+
+        return G
 
 
 # Class: DAG (Directed Acyclic Graph Task)
 class DAG:
-    def __init__(self, i=0, U=-1, T=-1, W=-1):
+    def __init__(self, i=0, U=-1, T=-1, W=-1, engine="networkx"):
         # parameters (or use default)
         self.task_num = i
         self.name = 'Tau_{:d}'.format(i)
@@ -66,6 +464,12 @@ class DAG:
         self.W = W
         self.L = -1 # needs to be computed later
 
+        # graph storage: "networkx" builds self.G directly, "array" records
+        # the graph in self.arrays and builds self.G on first use
+        self.engine = engine
+        self.G = None
+        self.arrays = None
+
         # configs for gen_rnd_legacy()
         self.parallelism = 8
         self.layer_num_min = 5
@@ -80,18 +484,115 @@ class DAG:
         self.fork_n_max = 4
 
     def __str__(self):
-        A = nx.nx_agraph.to_agraph(self.G)
+        A = nx.nx_agraph.to_agraph(self.get_graph())
         return A.__str__()
 
+    def _new_graph(self):
+        if self.engine == "array":
+            return GraphArrays(Index=self.task_num, U=self.U, T=self.T, W=self.W)
+        else:
+            return nx.DiGraph(Index=self.task_num, U=self.U, T=self.T, W=self.W)
+
+    def _set_graph(self, G):
+        if isinstance(G, GraphArrays):
+            self.G = None
+            self.arrays = G
+        else:
+            self.G = G
+            self.arrays = None
+
     def get_graph(self):
+        # the array engine converts to networkx lazily
+        if self.G is None and self.arrays is not None:
+            self.G = self.arrays.to_networkx()
+            self.arrays = None
         return self.G
 
     def get_number_of_nodes(self):
+        if self.arrays is not None:
+            return self.arrays.number_of_nodes()
         return self.G.number_of_nodes()
 
     def get_number_of_edges(self):
+        if self.arrays is not None:
+            return self.arrays.number_of_edges()
         return self.G.number_of_edges()
 
+    def to_arrays(self):
+        """ Returns the DAG as NumPy arrays: edge sources "src" and
+        destinations "dst", and the "rank" and execution time "C" of node v
+        at [v - 1] (-1 / nan if not set).
+        """
+        if self.arrays is not None:
+            src, dst = self.arrays.edges()
+            rank = np.frombuffer(self.arrays.rank, dtype=np.int32).copy()
+            if self.arrays.C is None:
+                C = np.full(len(rank), np.nan)
+            else:
+                C = np.asarray(self.arrays.C)
+            return {"src": src.copy(), "dst": dst.copy(), "rank": rank, "C": C}
+
+        n = self.G.number_of_nodes()
+        edges = np.asarray(list(self.G.edges()), dtype=np.int32).reshape(-1, 2)
+        rank = np.full(n, -1, dtype=np.int32)
+        C = [np.nan] * n
+        for v, data in self.G.nodes(data=True):
+            rank[v - 1] = data.get('rank', -1)
+            C[v - 1] = data.get('C', np.nan)
+        return {"src": edges[:, 0].copy(), "dst": edges[:, 1].copy(), "rank": rank, "C": np.asarray(C)}
+
+    def set_execution_times(self, c):
+        """ Set the execution time of every node (attribute 'C') and label
+        every edge with the execution time of its source node.
+        c is a dict {node: C} or a sequence with the C of node v at [v - 1].
+        """
+        if isinstance(c, dict):
+            c = [c[v] for v in range(1, len(c) + 1)]
+        elif isinstance(c, np.ndarray):
+            c = c.tolist()
+
+        if self.arrays is not None:
+            self.arrays.C = np.asarray(c)
+        else:
+            nx.set_node_attributes(self.G, {v: c[v - 1] for v in self.G.nodes()}, 'C')
+            nx.set_edge_attributes(self.G, {e: c[e[0] - 1] for e in self.G.edges()}, 'label')
+
+        # volume and critical path length follow from the execution times
+        self.W = sum(c)
+        self.L = self.critical_path()
+
+        graph = self.arrays.graph if self.arrays is not None else self.G.graph
+        graph['W'] = self.W
+        graph['L'] = self.L
+
+    def critical_path(self):
+        """ Returns the length of the longest C-weighted path of the DAG. """
+        a = self.to_arrays()
+        return float(_longest_path(a["C"].tolist(), (a["src"] - 1).tolist(), (a["dst"] - 1).tolist()))
+
+    @classmethod
+    def from_dict(cls, task, i=None):
+        """ Create a DAG from a task record of the taskset.json format (see
+        to_dict). U defaults to W / T; the index is taken from the name.
+        """
+        if i is None:
+            i = int(task["Name"].rsplit("_", 1)[-1])
+        T, W = task["T"], task["W"]
+        U = task.get("U", W / T if T > 0 else -1)
+
+        tau = cls(i=i, U=U, T=T, W=W)
+        tau.L = task.get("L", -1)
+
+        G = tau._new_graph()
+        for v, c in task["Nodes"].items():
+            G.add_node(int(v), C=c)
+        for e in task["Edges"]:
+            u, v = e.split(":")
+            G.add_edge(int(u), int(v), label=task["Nodes"].get(u))
+        tau._set_graph(G)
+
+        return tau
+
     def gen(self, algorithm):
         if algorithm == "nfj":
             self.gen_nfj()
@@ -100,15 +601,39 @@ class DAG:
         else:
             self.gen_rnd_legacy()
 
+    def to_dict(self):
+        """ Returns the DAG as a task record of the taskset.json format:
+        {"Name", "U", "T", "L", "W", "Nodes": {"v": C}, "Edges": ["u:v"]}
+        """
+        if self.arrays is not None:
+            n = self.arrays.number_of_nodes()
+            C = [None] * n if self.arrays.C is None else self.arrays.C.tolist()
+            nodes = {str(v): C[v - 1] for v in range(1, n + 1)}
+            edges = ["{}:{}".format(u, v) for u, v in zip(self.arrays.src, self.arrays.dst)]
+        else:
+            nodes = {str(v): c for v, c in self.G.nodes(data='C')}
+            edges = ["{}:{}".format(u, v) for u, v in self.G.edges()]
+
+        return {
+            "Name": self.name,
+            "U": self.U,
+            "T": self.T,
+            "L": self.L,
+            "W": self.W,
+            "Nodes": nodes,
+            "Edges": edges,
+        }
+
     def gen_rnd_legacy(self):
         # data structures
         nodes = []          # nodes in all layers (in form of shape decomposition)
         nodes_parent = []   # nodes that can be parents
-        nodes_parent_childless = []  # nodes without child
+        nodes_parent_all = []        # nodes that have been parents (in order)
+        nodes_with_child = set()     # parents that got at least one child
         nodes_orphan = []   # nodes without any parent
 
         # initial a new graph
-        G = nx.DiGraph(Index=self.task_num, U=self.U, T=self.T, W=self.W)
+        G = self._new_graph()
 
         # add the root node
         n = 1
@@ -128,14 +653,16 @@ class DAG:
             nodes_t = []
             for _ in range(m):
                 nodes_t.append(n)
-                nodes_orphan.append(n)
                 G.add_node(n, rank=k+1)
                 n = n + 1
 
             nodes.append(nodes_t)
 
             # initially assume all parents are childless
-            nodes_parent_childless[:] = nodes_parent_childless[:] + nodes_parent[:]
+            nodes_parent_all.extend(nodes_parent)
+
+            # nodes of this layer without a parent (so far)
+            nodes_orphan_t = set(nodes_t)
 
             # iterates all nodes in the current layout
             for i in nodes[k+1]:
@@ -143,33 +670,34 @@ class DAG:
                     # add connections
                     if random() < self.connect_prob:
                         G.add_edge(ii, i)
-                        if i in nodes_orphan:
-                            nodes_orphan.remove(i)
-                        if ii in nodes_parent_childless:
-                            nodes_parent_childless.remove(ii)
+                        nodes_orphan_t.discard(i)
+                        nodes_with_child.add(ii)
             
             # add all childs as candidate parents for the next layer
             nodes_parent[:] = nodes[k+1]
 
             # connect all orphan to the root node
-            for i in nodes_orphan:
-                nodes_orphan.remove(i)
+            # (the original implementation removed orphans from the list while
+            # iterating it, so only every other orphan is connected per pass
+            # and the rest is carried over; this behaviour is kept as is)
+            nodes_orphan.extend(i for i in nodes_t if i in nodes_orphan_t)
+            for i in nodes_orphan[0::2]:
                 G.add_edge(1, i)
-                # if i in nodes_parent:
-                #     nodes_parent.remove(i)
+            nodes_orphan[:] = nodes_orphan[1::2]
 
         # Dealing with the final layer
         # connect everything together to a final node
         for i in nodes_parent:
             G.add_edge(i, n)
 
-        for i in nodes_parent_childless:
-            G.add_edge(i, n)
+        for i in nodes_parent_all:
+            if i not in nodes_with_child:
+                G.add_edge(i, n)
 
         # connect all orphan to the root node
-        for i in nodes_orphan:
-            nodes_orphan.remove(i)
+        for i in nodes_orphan[0::2]:
             G.add_edge(1, i)
+        nodes_orphan[:] = nodes_orphan[1::2]
 
         # (optional) mutate a node to be conditional
         # G.add_node('2', style='filled', fillcolor='red', shape='diamond')
@@ -178,17 +706,29 @@ class DAG:
         #print(nodes_orphan)
 
         # return the graph
-        self.G = G
+        self._set_graph(G)
+
+    def gen_rnd(self, parallelism=8, layer_num_min=5, layer_num_max=12, connect_prob=0.5,
+                connect_mode="pairwise", width_min=1):
+        """ Generate a layer-by-layer randomised DAG.
+        connect_mode selects how consecutive layers are connected:
+            "pairwise": draw random() for every (parent, child) pair
+            "bernoulli": draw the whole parent x child adjacency block as one
+                         Bernoulli matrix (same edge distribution, NumPy speed)
+        With width_min > 1, one random layer gets at least width_min nodes.
+        """
+        if connect_mode == "bernoulli":
+            # seeded from the random module to keep seed() reproducibility
+            rng = np.random.default_rng(getrandbits(64))
 
-    def gen_rnd(self, parallelism=8, layer_num_min=5, layer_num_max=12, connect_prob=0.5):
         # data structures
         nodes = []          # nodes in all layers (in form of shape decomposition)
         nodes_parent = []   # nodes that can be parents
-        nodes_parent_childless = []  # nodes without child
-        nodes_orphan = []   # nodes without any parent
+        nodes_parent_all = []        # nodes that have been parents (in order)
+        nodes_with_child = set()     # parents that got at least one child
 
         # initial a new graph
-        G = nx.DiGraph(Index=self.task_num, U=self.U, T=self.T, W=self.W)
+        G = self._new_graph()
 
         # add the root node
         n = 1
@@ -200,56 +740,72 @@ class DAG:
         # random and remove the source and the sink node
         layer_num_this = randint(layer_num_min - 2, layer_num_max - 2)
 
+        # the layer that is widened to width_min nodes
+        wide_layer = -1
+        if width_min > 1:
+            layer_num_this = max(layer_num_this, 1)
+            wide_layer = randint(0, layer_num_this - 1)
+
         # generate layer by layer
         for k in range(layer_num_this):
             # randomised nodes in each layer
-            m = randint(1, parallelism)
+            if k == wide_layer:
+                m = randint(width_min, parallelism)
+            else:
+                m = randint(1, parallelism)
 
             nodes_t = []
             for _ in range(m):
                 nodes_t.append(n)
-                nodes_orphan.append(n)
                 G.add_node(n, rank=k+1)
                 n = n + 1
 
             nodes.append(nodes_t)
 
             # initially assume all parents are childless
-            nodes_parent_childless[:] = nodes_parent_childless[:] + nodes_parent[:]
-
-            # iterates all nodes in the current layout
-            for i in nodes[k+1]:
-                for ii in nodes_parent:
-                    # add connections
-                    if random() < connect_prob:
-                        G.add_edge(ii, i)
-                        if i in nodes_orphan.copy():
-                            nodes_orphan.remove(i)
-                        if ii in nodes_parent_childless.copy():
-                            nodes_parent_childless.remove(ii)
+            nodes_parent_all.extend(nodes_parent)
+
+            if connect_mode == "bernoulli":
+                # adjacency block: row = child, column = parent
+                adj = rng.random((m, len(nodes_parent))) < connect_prob
+                children = np.asarray(nodes_t)
+                parents = np.asarray(nodes_parent)
+
+                i_child, i_parent = np.nonzero(adj)
+                G.add_edges_from(zip(parents[i_parent].tolist(), children[i_child].tolist()))
+
+                # orphans have an empty row, parents with a child a non-empty column
+                nodes_orphan = set(children[~adj.any(axis=1)].tolist())
+                nodes_with_child.update(parents[adj.any(axis=0)].tolist())
+            else:
+                # nodes of this layer without a parent (so far)
+                nodes_orphan = set(nodes_t)
+
+                # iterates all nodes in the current layout
+                for i in nodes[k+1]:
+                    for ii in nodes_parent:
+                        # add connections
+                        if random() < connect_prob:
+                            G.add_edge(ii, i)
+                            nodes_orphan.discard(i)
+                            nodes_with_child.add(ii)
             
             # add all childs as candidate parents for the next layer
             nodes_parent[:] = nodes[k+1]
 
             # connect all orphan to the root node
-            for i in nodes_orphan.copy():
-                G.add_edge(1, i)
-                nodes_orphan.remove(i)
-                # if i in nodes_parent:
-                #     nodes_parent.remove(i)
+            for i in nodes_t:
+                if i in nodes_orphan:
+                    G.add_edge(1, i)
 
         # Dealing with the final layer
         # connect everything together to a final node
         for i in nodes_parent:
             G.add_edge(i, n)
 
-        for i in nodes_parent_childless:
-            G.add_edge(i, n)
-
-        # connect all orphan to the root node
-        for i in nodes_orphan.copy():
-            G.add_edge(1, i)
-            nodes_orphan.remove(i)
+        for i in nodes_parent_all:
+            if i not in nodes_with_child:
+                G.add_edge(i, n)
 
         # (optional) mutate a node to be conditional
         # G.add_node('2', style='filled', fillcolor='red', shape='diamond')
@@ -258,7 +814,282 @@ class DAG:
         #print(nodes_orphan)
         
         # return the graph
-        self.G = G
+        self._set_graph(G)
+
+    def gen_rnd_target(self, L_T=None, W_L=None, width=None, parallelism=8, layer_num_min=5,
+                       layer_num_max=12, connect_prob=0.5, connect_mode="pairwise",
+                       round_c=False, dummy=False, max_tries=100):
+        """ Generate a DAG (as gen_rnd) and its execution times, for a
+        workload W and period T, so that the critical path length L and the
+        width meet the target ranges (lo, hi) given:
+            L_T: L / T
+            W_L: W / L (the average parallelism)
+            width: nodes in the widest layer (default (1, parallelism))
+        Instead of rejecting unsuitable DAGs, one layer is widened so that
+        the W / L target is reachable, and the execution times drawn by
+        gen_execution_times() are blended with work concentrated on the
+        critical path (to raise L) or spread over the widest layer (to lower
+        L) until L is in range. A new DAG is drawn only if rounding the
+        execution times moves L out of range. With round_c and fewer units of
+        W than nodes, every execution time is clamped to 1 (as in
+        gen_execution_times), so W grows to the node count.
+        Returns the acceptance statistics {"tries", "adjusted"}.
+        """
+        W = int(round(self.W)) if round_c else self.W
+
+        # range of L from the targets
+        lo, hi = 0.0, float(W)
+        if L_T is not None:
+            if self.T <= 0:
+                raise ValueError("an L / T target needs the period T")
+            lo, hi = max(lo, L_T[0] * self.T), min(hi, L_T[1] * self.T)
+        if W_L is not None:
+            lo, hi = max(lo, W / W_L[1]), min(hi, W / W_L[0])
+        if lo > hi:
+            raise ValueError("no critical path length meets the targets")
+
+        # the W / L target needs enough nodes that can run in parallel
+        # (dummy source and sink nodes are on every path)
+        fixed = 2 if dummy else 0
+        width_lo, width_hi = width if width is not None else (1, parallelism)
+        width_min = width_lo
+        if hi > fixed:
+            width_min = max(width_min, int(np.ceil((W - fixed) / (hi - fixed))))
+        if width_min > width_hi or hi < fixed:
+            raise ValueError("the width target is too small for the W / L target")
+
+        # aim a bit inside the range, so rounding keeps L in range
+        margin = 0.05 * (hi - lo)
+
+        for tries in range(1, max_tries + 1):
+            self.gen_rnd(parallelism=width_hi, layer_num_min=layer_num_min, layer_num_max=layer_num_max,
+                         connect_prob=connect_prob, connect_mode=connect_mode, width_min=width_min)
+
+            a = self.to_arrays()
+            src, dst = (a["src"] - 1).tolist(), (a["dst"] - 1).tolist()
+            n = len(a["C"])
+
+            c = gen_execution_times(n, W, round_c=False, dummy=dummy)
+            c = np.array([c[v] for v in range(1, n + 1)], dtype=float)
+
+            variable = np.ones(n, dtype=bool)
+            if dummy:
+                variable[[0, n - 1]] = False
+            w_var = c[variable].sum()
+
+            L, path = _longest_path(c.tolist(), src, dst, path=True)
+            adjusted = not (lo <= L <= hi)
+
+            if adjusted:
+                target = lo + margin if L < lo else hi - margin
+                c_x = c.copy()
+                c_x[variable] = 0
+
+                if L < lo:
+                    # all work on the critical path: L = W
+                    on_path = np.zeros(n, dtype=bool)
+                    on_path[path] = True
+                    on_path &= variable
+                    weights = c * on_path
+                    if weights.sum() == 0:
+                        weights = on_path.astype(float)
+                    c_x = c_x + w_var * weights / weights.sum()
+                else:
+                    # all work spread over the widest layer: L = W / width
+                    rank = np.where(variable, a["rank"], -1)
+                    counts = np.bincount(rank[rank >= 0])
+                    wide = variable & (rank == np.argmax(counts))
+                    c_x[wide] = w_var / wide.sum()
+
+                # L of the blend (1 - x) c + x c_x is convex in x and crosses
+                # the target once, so the blending factor is found by bisection
+                raising = L < lo
+                x_lo, x_hi = 0.0, 1.0
+                x = x_hi
+                for _ in range(50):
+                    x = (x_lo + x_hi) / 2
+                    L = _longest_path(((1 - x) * c + x * c_x).tolist(), src, dst)
+                    if abs(L - target) <= margin:
+                        break
+                    if (L < target) == raising:
+                        x_lo = x
+                    else:
+                        x_hi = x
+                else:
+                    x = x_hi
+                c = (1 - x) * c + x * c_x
+                L = _longest_path(c.tolist(), src, dst)
+
+            if round_c:
+                if W < n:
+                    # too small a workload for values >= 1: clamp as gen_execution_times
+                    c = np.maximum(np.round(c), 1)
+                else:
+                    c = round_to_sum(c, W, minimum=1)
+                L = _longest_path(c.tolist(), src, dst)
+
+            if lo <= L <= hi:
+                self.set_execution_times(c.tolist())
+                return {"tries": tries, "adjusted": adjusted}
+
+        raise RuntimeError("no DAG met the targets in {} tries".format(max_tries))
+
+    def gen_rnd_large(self, basefolder=None, parallelism=8, layer_num_min=5, layer_num_max=12,
+                      connect_prob=0.5, fmt="bin", max_block=1 << 22):
+        """ Generate a large layer-by-layer randomised DAG (same model as
+        gen_rnd with connect_mode="bernoulli") and stream it to disk layer by
+        layer, so the memory used depends on the layer size only.
+        No graph object is kept and no image is rendered. Files written:
+            <name>.json      meta data (nodes, edges, layer sizes, critical path L, ...)
+            <name>.edges.bin edges as little-endian int32 (src, dst) pairs, or
+            <name>.edgelist  edges as "src dst" text lines (fmt="edgelist")
+            <name>.C.bin / <name>.C.txt  execution times of nodes 1..n,
+                             if the workload W is set (> 0)
+        Returns the meta data dict.
+        """
+        if basefolder is None:
+            basefolder = os.path.join(".", "data")
+        os.makedirs(basefolder, exist_ok=True)
+
+        if fmt not in ("bin", "edgelist"):
+            raise ValueError("unknown large graph format: {}".format(fmt))
+
+        # seeded from the random module to keep seed() reproducibility
+        rng = np.random.default_rng(getrandbits(64))
+
+        # layer sizes are drawn first, so the sink id is known up-front
+        layer_num_this = randint(layer_num_min - 2, layer_num_max - 2)
+        layer_sizes = rng.integers(1, parallelism, size=layer_num_this, endpoint=True)
+        n_nodes = 1 + int(layer_sizes.sum()) + 1
+        sink = n_nodes
+
+        base = os.path.join(basefolder, self.name)
+        if fmt == "bin":
+            f_edges = open(base + '.edges.bin', 'wb')
+        else:
+            f_edges = open(base + '.edgelist', 'w')
+
+        f_c = None
+        if self.W > 0:
+            f_c = open(base + ('.C.bin' if fmt == "bin" else '.C.txt'),
+                       'wb' if fmt == "bin" else 'w')
+
+        n_edges = 0
+
+        def write_edges(src, dst):
+            nonlocal n_edges
+            if len(src) == 0:
+                return
+            edges = np.empty((len(src), 2), dtype='<i4')
+            edges[:, 0] = src
+            edges[:, 1] = dst
+            if fmt == "bin":
+                f_edges.write(edges.tobytes())
+            else:
+                np.savetxt(f_edges, edges, fmt="%d")
+            n_edges = n_edges + len(src)
+
+        # execution times: flat Dirichlet split of W, drawn sequentially
+        # (stick-breaking, as in UUniFast) so a layer can be written at once
+        c_remaining = float(self.W)
+        c_written = 0
+
+        def write_c(m):
+            nonlocal c_remaining, c_written
+            if f_c is None:
+                return None
+            k = np.arange(c_written + 1, c_written + m + 1)
+            # the last node takes what remains
+            factors = np.zeros(m)
+            inner = k < n_nodes
+            factors[inner] = rng.random(int(inner.sum())) ** (1.0 / (n_nodes - k[inner]))
+            remaining = c_remaining * np.cumprod(factors)
+            c = np.concatenate(([c_remaining], remaining[:-1])) - remaining
+            c_remaining = remaining[-1]
+            c_written = c_written + m
+            if fmt == "bin":
+                f_c.write(c.astype('<f8').tobytes())
+            else:
+                np.savetxt(f_c, np.column_stack((k, c)), fmt=("%d", "%.6f"))
+            return c
+
+        # critical path: finish times of the parent layer, start times of the
+        # current layer and the latest finish of a node connected to the sink
+        with_c = f_c is not None
+        sink_start = 0.0
+
+        try:
+            # the root node
+            root_finish = write_c(1)
+            parent_finish = root_finish
+            parent_start, parent_num = 1, 1
+            start = 2
+
+            for m in layer_sizes.tolist():
+                has_child = np.zeros(parent_num, dtype=bool)
+                if with_c:
+                    layer_start = np.empty(m)
+
+                # connect the layer in blocks of children to bound the memory
+                block = max(1, max_block // parent_num)
+                for c0 in range(0, m, block):
+                    c1 = min(m, c0 + block)
+                    adj = rng.random((c1 - c0, parent_num)) < connect_prob
+
+                    i_child, i_parent = np.nonzero(adj)
+                    write_edges(parent_start + i_parent, start + c0 + i_child)
+
+                    # connect all orphan to the root node
+                    orphans = start + c0 + np.nonzero(~adj.any(axis=1))[0]
+                    write_edges(np.ones(len(orphans), dtype=np.int64), orphans)
+
+                    has_child |= adj.any(axis=0)
+
+                    # a child starts when its last parent (or the root) finishes
+                    if with_c:
+                        layer_start[c0:c1] = np.maximum((adj * parent_finish).max(axis=1), root_finish[0])
+
+                # connect childless parents to the sink
+                childless = parent_start + np.nonzero(~has_child)[0]
+                write_edges(childless, np.full(len(childless), sink))
+
+                c = write_c(m)
+                if with_c:
+                    if not has_child.all():
+                        sink_start = max(sink_start, parent_finish[~has_child].max())
+                    parent_finish = layer_start + c
+                parent_start, parent_num = start, m
+                start = start + m
+
+            # connect the final layer to the sink
+            write_edges(np.arange(parent_start, parent_start + parent_num),
+                        np.full(parent_num, sink))
+            c = write_c(1)
+            if with_c:
+                sink_start = max(sink_start, parent_finish.max())
+                L = float(sink_start + c[0])
+        finally:
+            f_edges.close()
+            if f_c is not None:
+                f_c.close()
+
+        meta = {
+            "Name": self.name,
+            "Index": self.task_num,
+            "U": self.U,
+            "T": self.T,
+            "W": self.W,
+            "nodes": n_nodes,
+            "edges": n_edges,
+            "layers": [1] + layer_sizes.tolist() + [1],
+            "format": fmt,
+        }
+        if with_c:
+            meta["L"] = L
+        with open(base + '.json', 'w') as f:
+            json.dump(meta, f, indent=2)
+
+        return meta
 
     def gen_nfj(self):
         """ Generate Nested Fork-Join DAG
@@ -270,7 +1101,7 @@ class DAG:
         ancestor_dict = {}  # dict stores traces of nodes' all ancestors
 
         # initial a new graph
-        G = nx.DiGraph(Index=self.task_num, U=self.U, T=self.T, W=self.W)
+        G = self._new_graph()
         n = 1
         r = 0
 
@@ -360,42 +1191,80 @@ class DAG:
                 G.add_edge(i, n)
 
         # return the generated graph
-        self.G = G
+        self._set_graph(G)
 
     def config(self):
         pass
 
     def print_data(self):
         #print(self.G.graph)
-        print(self.G.nodes.data())
-        print(self.G.edges.data())
-
-    def save(self, basefolder=None):
+        G = self.get_graph()
+        print(G.nodes.data())
+        print(G.edges.data())
+
+    def save(self, basefolder=None, formats=None, renderer=None):
+        """ Save the DAG to basefolder in the given formats (default: png,
+        gpickle and gml):
+            png     Graphviz drawing (in the background if a PNGRenderer
+                    is given as renderer)
+            gpickle pickled nx.DiGraph
+            gml     GML file
+            json    task record of the taskset.json format (see to_dict)
+            binary  NumPy .npz with the src, dst, rank and C arrays
+        Returns the paths of the files (the png may still be rendering).
+        """
         if basefolder is None:
             basefolder = os.path.join(".", "data")
+        if formats is None:
+            formats = ("png", "gpickle", "gml")
+        paths = []
 
-        # layout graph
-        A = nx.nx_agraph.to_agraph(self.G)
-
-        A.layout(prog='dot')
+        for fmt in formats:
+            if fmt not in SAVE_FORMATS:
+                raise ValueError("unknown output format: {}".format(fmt))
 
         # create basefolder (if not exists)
         os.makedirs(basefolder, exist_ok=True)
 
         # save graph (png)
-        A.draw(os.path.join(basefolder, self.name + '.png'), format="png")
+        if "png" in formats:
+            png_path = os.path.join(basefolder, self.name + '.png')
+
+            if renderer is not None:
+                renderer.submit(self.get_graph(), png_path)
+            else:
+                render_png(self.get_graph(), png_path)
+            paths.append(png_path)
 
         # save graph (gpickle)
-        gpickle_path = os.path.join(basefolder, self.name + '.gpickle')
-        try:
-            nx.write_gpickle(self.G, gpickle_path)
-        except AttributeError:
-            import pickle
-            with open(gpickle_path, 'wb') as f:
-                pickle.dump(self.G, f, pickle.HIGHEST_PROTOCOL)
+        if "gpickle" in formats:
+            G = self.get_graph()
+            gpickle_path = os.path.join(basefolder, self.name + '.gpickle')
+            try:
+                nx.write_gpickle(G, gpickle_path)
+            except AttributeError:
+                import pickle
+                with open(gpickle_path, 'wb') as f:
+                    pickle.dump(G, f, pickle.HIGHEST_PROTOCOL)
+            paths.append(gpickle_path)
 
         # save graph (gml)
-        nx.write_gml(self.G, os.path.join(basefolder, self.name + '.gml'))
+        if "gml" in formats:
+            paths.append(os.path.join(basefolder, self.name + '.gml'))
+            nx.write_gml(self.get_graph(), paths[-1])
+
+        # save graph (json)
+        if "json" in formats:
+            paths.append(os.path.join(basefolder, self.name + '.json'))
+            with open(paths[-1], 'w') as f:
+                json.dump(self.to_dict(), f)
+
+        # save graph (binary)
+        if "binary" in formats:
+            paths.append(os.path.join(basefolder, self.name + '.npz'))
+            np.savez(paths[-1], U=self.U, T=self.T, W=self.W, L=self.L, **self.to_arrays())
+
+        return paths
 
     def load(self, basefolder=None):
         if basefolder is None:
@@ -406,6 +1275,9 @@ class DAG:
         """ The current version of plot draws the generated png file to benefit
         from AGraph (Graphviz) layout functions.
         """
+        import matplotlib.pyplot as plt
+        import matplotlib.image as mpimg
+
         if basefolder is None:
             basefolder = os.path.join(".", "data")
         img = mpimg.imread(os.path.join(basefolder, self.name + '.png'))
@@ -9,28 +9,91 @@
 # -------------------------------------------------------------------------------
 
 import os
+from collections import OrderedDict
+from itertools import chain
+import numpy as np
 import networkx as nx
 
 
-def load_task(task_idx, dag_base_folder=None):
+def _task_file(task_idx, dag_base_folder=None):
     if dag_base_folder is None:
         dag_base_folder = os.path.join(os.path.dirname(__file__), os.pardir, "data")
 
-    # << load DAG task <<
-    dag_task_file = os.path.join(dag_base_folder, "Tau_{:d}.gpickle".format(task_idx))
+    return os.path.join(dag_base_folder, "Tau_{:d}.gpickle".format(task_idx))
+
+
+# in-process LRU cache of loaded graphs: {path: (mtime, size, G)}
+_graph_cache = OrderedDict()
+_graph_cache_size = 0
+_graph_cache_limit = 256 * 1024 * 1024
+
+
+def set_cache_limit(max_bytes):
+    """ Set the memory cap of the graph cache (measured in size of the
+    gpickle files, which approximates the memory used). 0 disables it.
+    """
+    global _graph_cache_limit
+    _graph_cache_limit = max_bytes
+    _evict()
+
+
+def clear_cache():
+    global _graph_cache_size
+    _graph_cache.clear()
+    _graph_cache_size = 0
+
+
+def _evict():
+    global _graph_cache_size
+    while _graph_cache and _graph_cache_size > _graph_cache_limit:
+        _, (_, size, _) = _graph_cache.popitem(last=False)
+        _graph_cache_size = _graph_cache_size - size
+
+
+def _read_graph(dag_task_file):
+    """ Read a gpickle file through the LRU cache. Cached graphs are shared,
+    so callers must not modify them.
+    """
+    global _graph_cache_size
+
+    path = os.path.abspath(dag_task_file)
+    st = os.stat(path)
+
+    entry = _graph_cache.get(path)
+    if entry is not None:
+        if entry[0] == st.st_mtime_ns:
+            _graph_cache.move_to_end(path)
+            return entry[2]
+        # the file has changed on disk
+        del _graph_cache[path]
+        _graph_cache_size = _graph_cache_size - entry[1]
 
     # task is saved as NetworkX gpickle format
     try:
-        G = nx.read_gpickle(dag_task_file)
+        G = nx.read_gpickle(path)
     except AttributeError:
         import pickle
-        with open(dag_task_file, 'rb') as f:
+        with open(path, 'rb') as f:
             G = pickle.load(f)
 
+    if st.st_size <= _graph_cache_limit:
+        _graph_cache[path] = (st.st_mtime_ns, st.st_size, G)
+        _graph_cache_size = _graph_cache_size + st.st_size
+        _evict()
+
+    return G
+
+
+def load_task(task_idx, dag_base_folder=None):
+    # << load DAG task <<
+    dag_task_file = _task_file(task_idx, dag_base_folder)
+
+    G = _read_graph(dag_task_file)
+
     # formulate the graph list
     G_dict = {}
     C_dict = {}
-    V_array = []
+    V_set = set()
     T = G.graph["T"]
 
     max_key = 0
@@ -43,10 +106,8 @@ def load_task(task_idx, dag_base_folder=None):
         if v > max_key:
             max_key = v
 
-        if u not in V_array:
-            V_array.append(u)
-        if v not in V_array:
-            V_array.append(v)
+        V_set.add(u)
+        V_set.add(v)
 
         C_dict[u] = weight
     C_dict[max_key] = 1
@@ -57,7 +118,7 @@ def load_task(task_idx, dag_base_folder=None):
     for key in sorted(C_dict):
         C_array.append(C_dict[key])
 
-    V_array.sort()
+    V_array = sorted(V_set)
     W = sum(C_array)
 
     # read the ET of the sink node
@@ -68,6 +129,136 @@ def load_task(task_idx, dag_base_folder=None):
     return G_dict, V_array, C_dict, C_array, T, W
 
 
+def graph_to_csr(G):
+    """ Flatten a DAG with nodes 1..n into CSR arrays in O(V + E):
+    the successors of node v are indices[offsets[v - 1]:offsets[v]], and
+    C[v - 1] is the execution time of v (nan if not set).
+    """
+    n = G.number_of_nodes()
+    nodes = range(1, n + 1)
+    succ = G.succ
+
+    offsets = np.zeros(n + 1, dtype=np.int64)
+    np.cumsum(np.fromiter((len(succ[v]) for v in nodes), dtype=np.int64, count=n), out=offsets[1:])
+    indices = np.fromiter(chain.from_iterable(succ[v] for v in nodes), dtype=np.int32,
+                          count=G.number_of_edges())
+    C = np.fromiter((G.nodes[v].get('C', np.nan) for v in nodes), dtype=float, count=n)
+
+    return offsets, indices, C
+
+
+def load_task_csr(task_idx, dag_base_folder=None):
+    """ Load a DAG task as CSR arrays (see graph_to_csr), for analyses that
+    do not need NetworkX.
+    Returns:
+        offsets, indices, C, T, W
+    """
+    G = _read_graph(_task_file(task_idx, dag_base_folder))
+
+    offsets, indices, C = graph_to_csr(G)
+    T = G.graph["T"]
+    W = float(np.nansum(C))
+
+    return offsets, indices, C, T, W
+
+
+def load_taskset(dag_base_folder, csr=False):
+    """ Load every task (Tau_{i}.gpickle) of a taskset folder in one call,
+    ordered by task index. Graphs are served from the in-process cache
+    when the files have not changed.
+    Returns:
+        list of load_task() results, or of load_task_csr() results if csr
+    """
+    task_indices = []
+    for f in os.listdir(dag_base_folder):
+        name, ext = os.path.splitext(f)
+        if ext == ".gpickle" and name.startswith("Tau_") and name[4:].isdigit():
+            task_indices.append(int(name[4:]))
+
+    loader = load_task_csr if csr else load_task
+    return [loader(i, dag_base_folder) for i in sorted(task_indices)]
+
+
+# binary dataset format (written by daggen-cli.py --dataset), little-endian:
+#   header   DATASET_HEADER_DTYPE, 64 bytes
+#   tasks    DATASET_TASK_DTYPE[n_tasks]  one row per DAG task
+#   C        float64[n_nodes]             node execution times, C of node v
+#                                         of a task at [node_off + v - 1]
+#   edges    int32[n_edges, 2]            (u, v) node ids of every task,
+#                                         from [edge_off] to [edge_off + n_edges]
+DATASET_MAGIC = b"DAGGENDS"
+DATASET_VERSION = 1
+
+DATASET_HEADER_DTYPE = np.dtype([
+    ("magic", "S8"), ("version", "<u4"), ("reserved", "<u4"),
+    ("n_tasks", "<u8"), ("n_nodes", "<u8"), ("n_edges", "<u8"),
+    ("task_offset", "<u8"), ("node_offset", "<u8"), ("edge_offset", "<u8"),
+])
+
+DATASET_TASK_DTYPE = np.dtype([
+    ("set", "<i8"), ("index", "<i8"),
+    ("U", "<f8"), ("T", "<f8"), ("W", "<f8"), ("L", "<f8"),
+    ("node_off", "<i8"), ("n_nodes", "<i8"),
+    ("edge_off", "<i8"), ("n_edges", "<i8"),
+])
+
+
+def _memmap(path, dtype, offset, shape):
+    # mmap cannot map an empty section
+    if shape[0] == 0:
+        return np.empty(shape, dtype=dtype)
+    return np.memmap(path, dtype=dtype, mode="r", offset=offset, shape=shape)
+
+
+class TaskDataset:
+    """ Read-only view of a binary dataset file. The task table, node and
+    edge arrays are memory-mapped, so opening the file reads only the header
+    and dataset[k] returns views of task k without copying.
+    """
+    def __init__(self, path):
+        self.path = path
+
+        header = np.fromfile(path, dtype=DATASET_HEADER_DTYPE, count=1)
+        if len(header) == 0 or header["magic"][0] != DATASET_MAGIC:
+            raise ValueError("%s is not a DAG dataset file" % (path))
+        header = header[0]
+        if header["version"] != DATASET_VERSION:
+            raise ValueError("unsupported dataset version %d" % (header["version"]))
+
+        self.tasks = _memmap(path, DATASET_TASK_DTYPE, int(header["task_offset"]), (int(header["n_tasks"]),))
+        self.C = _memmap(path, np.float64, int(header["node_offset"]), (int(header["n_nodes"]),))
+        self.edges = _memmap(path, np.int32, int(header["edge_offset"]), (int(header["n_edges"]), 2))
+
+    def __len__(self):
+        return len(self.tasks)
+
+    def __getitem__(self, k):
+        """ Returns task k as a dict of "set", "index", "U", "T", "W", "L",
+        "C" (C of node v at [v - 1]) and "edges" (an (E, 2) array of node ids).
+        """
+        t = self.tasks[k]
+        node_off, edge_off = int(t["node_off"]), int(t["edge_off"])
+        return {
+            "set": int(t["set"]),
+            "index": int(t["index"]),
+            "U": float(t["U"]),
+            "T": float(t["T"]),
+            "W": float(t["W"]),
+            "L": float(t["L"]),
+            "C": self.C[node_off:node_off + int(t["n_nodes"])],
+            "edges": self.edges[edge_off:edge_off + int(t["n_edges"])],
+        }
+
+    def __iter__(self):
+        for k in range(len(self)):
+            yield self[k]
+
+
+def load_dataset(path):
+    """ Open a binary dataset file written by daggen-cli.py --dataset. """
+    return TaskDataset(path)
+
+
 # below is an example of how to use the load function:
 if __name__ == "__main__":
     G, V, C, _, T, W = load_task(task_idx=0, dag_base_folder="data-multi-m4-u0.8/0/")
@@ -77,3 +268,18 @@ if __name__ == "__main__":
     print("T: ", T)
     print("C: ", C)
     print("W: ", W)
+
+    offsets, indices, C, T, W = load_task_csr(task_idx=0, dag_base_folder="data-multi-m4-u0.8/0/")
+
+    print("offsets: ", offsets)
+    print("indices: ", indices)
+
+    taskset = load_taskset(dag_base_folder="data-multi-m4-u0.8/0/")
+
+    print("tasks: ", len(taskset))
+
+    dataset = load_dataset("data/tasksets.bin")
+    task = dataset[0]
+
+    print("C: ", task["C"])
+    print("edges: ", task["edges"])
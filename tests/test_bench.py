@@ -0,0 +1,60 @@
+import pytest
+import json
+import importlib
+
+# daggen-bench.py has a hyphen, so we need importlib to import it
+_bench = importlib.import_module("daggen-bench")
+
+
+def _results(medians):
+    return {"meta": {}, "results": {case: {"median": t, "min": t} for case, t in medians.items()}}
+
+
+class TestGrid:
+    def test_case_names_unique(self, tmp_path):
+        names = [_bench.case_name(name, params) for name, params, _ in _bench.benchmark_grid(str(tmp_path))]
+        assert len(names) == len(set(names))
+        for name in ("gen_rnd", "gen_rnd_legacy", "gen_nfj", "uunifast_discard",
+                     "gen_execution_times", "save", "cli", "startup"):
+            assert any(n.startswith(name + "[") for n in names)
+
+    def test_case_name(self):
+        assert _bench.case_name("gen_nfj", {"depth": 3}) == "gen_nfj[depth=3]"
+
+
+class TestTimeCase:
+    def test_calibrates(self):
+        calls = []
+        timing = _bench.time_case(lambda: calls.append(1), min_time=0.01, repeat=3)
+        assert timing["repeat"] == 3
+        assert len(calls) >= timing["number"] * 4
+        assert 0 < timing["min"] <= timing["median"]
+
+
+class TestCompare:
+    def test_flags(self):
+        baseline = _results({"a": 1.0, "b": 1.0, "c": 1.0, "d": 1.0})
+        results = _results({"a": 1.1, "b": 1.5, "c": 0.5, "e": 9.0})
+        rows = {row[0]: row for row in _bench.compare(results, baseline, threshold=0.25)}
+        assert set(rows) == {"a", "b", "c"}
+        assert rows["a"][4] == ""
+        assert rows["b"][4] == "regression"
+        assert rows["b"][3] == pytest.approx(1.5)
+        assert rows["c"][4] == "improvement"
+
+
+class TestMain:
+    def test_baseline_round_trip(self, tmp_path):
+        output = str(tmp_path / "results.json")
+        assert _bench.main(output=output, name_filter="gen_nfj[depth=3]", quick=True) == 0
+
+        results = json.loads(open(output).read())
+        assert list(results["results"]) == ["gen_nfj[depth=3]"]
+        assert "python" in results["meta"]
+
+        # a baseline 1000x faster turns the same run into a regression
+        results["results"]["gen_nfj[depth=3]"]["median"] /= 1000
+        baseline = str(tmp_path / "baseline.json")
+        with open(baseline, "w") as f:
+            json.dump(results, f)
+        assert _bench.main(baseline=baseline, name_filter="gen_nfj[depth=3]", quick=True) == 1
@@ -7,6 +7,7 @@ import importlib
 _cli = importlib.import_module("daggen-cli")
 parse_configuration = _cli.parse_configuration
 main = _cli.main
+taskset_seed = _cli.taskset_seed
 
 
 class TestParseConfiguration:
@@ -75,3 +76,704 @@ class TestMainMultiDag:
         main(config_path=str(config_path), data_path=str(data_dir))
 
         assert data_dir.exists()
+
+
+class TestTasksetSeed:
+    def test_deterministic(self):
+        assert taskset_seed(42, 3) == taskset_seed(42, 3)
+
+    def test_depends_on_index_and_seed(self):
+        assert taskset_seed(42, 0) != taskset_seed(42, 1)
+        assert taskset_seed(42, 0) != taskset_seed(43, 0)
+
+
+class TestWorkers:
+    @pytest.fixture(autouse=True)
+    def _skip_if_no_pygraphviz(self):
+        pytest.importorskip("pygraphviz")
+
+    def _read_outputs(self, data_dir):
+        outputs = {}
+        for root, _, files in os.walk(data_dir):
+            for f in files:
+                if f.endswith(".gml"):
+                    path = os.path.join(root, f)
+                    with open(path) as fp:
+                        outputs[os.path.relpath(path, data_dir)] = fp.read()
+        return outputs
+
+    def test_multi_dag_output_independent_of_workers(self, tmp_path, sample_config):
+        """The generated tasksets must be identical for any number of workers."""
+        sample_config["misc"]["multi-DAG_on"] = True
+        sample_config["misc"]["save_to_file"] = True
+        sample_config["multi-DAG"]["set_number"] = 4
+        sample_config["multi-DAG"]["task_number_per_set"] = 2
+
+        config_path = tmp_path / "config.json"
+        config_path.write_text(json.dumps(sample_config))
+
+        main(config_path=str(config_path), data_path=str(tmp_path / "serial"), workers=1)
+        main(config_path=str(config_path), data_path=str(tmp_path / "parallel"), workers=2)
+
+        serial = self._read_outputs(str(tmp_path / "serial"))
+        parallel = self._read_outputs(str(tmp_path / "parallel"))
+        assert len(serial) == 4 * 2
+        assert serial == parallel
+
+
+class TestUtilizationSampling:
+    @pytest.mark.parametrize("util_algo, sampler", [
+        ("uunifast_discard", "uunifast_discard"),
+        ("uunifast_discard_np", "uunifast_discard_np"),
+        ("drs", "drs_gen"),
+    ])
+    def test_one_vector_per_taskset(self, tmp_path, sample_config, monkeypatch, util_algo, sampler):
+        """The number of sampled utilization vectors must grow linearly with set_number."""
+        if util_algo == "drs":
+            pytest.importorskip("drs")
+
+        drawn = []
+        original = getattr(_cli, sampler)
+
+        def counting_sampler(n, u, nsets, ulimit=1, **kwargs):
+            drawn.append(nsets)
+            return original(n, u=u, nsets=nsets, ulimit=ulimit, **kwargs)
+
+        monkeypatch.setattr(_cli, sampler, counting_sampler)
+
+        sample_config["misc"]["multi-DAG_on"] = True
+        sample_config["misc"]["util_algorithm"] = util_algo
+        sample_config["multi-DAG"]["set_number"] = 20
+
+        config_path = tmp_path / "config.json"
+        config_path.write_text(json.dumps(sample_config))
+
+        main(config_path=str(config_path), data_path=str(tmp_path / "data"))
+
+        assert sum(drawn) == 20
+
+
+class TestLargeGraph:
+    def test_single_dag_large_graph(self, tmp_path, sample_config):
+        sample_config["misc"]["multi-DAG_on"] = False
+        sample_config["single-DAG"]["set_number"] = 2
+        sample_config["dag_config"]["large_graph"] = True
+        sample_config["dag_config"]["large_graph_format"] = "edgelist"
+
+        config_path = tmp_path / "config.json"
+        config_path.write_text(json.dumps(sample_config))
+        data_dir = tmp_path / "data"
+
+        main(config_path=str(config_path), data_path=str(data_dir))
+
+        for i in range(2):
+            assert (data_dir / "Tau_{}.json".format(i)).exists()
+            assert (data_dir / "Tau_{}.edgelist".format(i)).exists()
+            assert (data_dir / "Tau_{}.C.txt".format(i)).exists()
+            assert not (data_dir / "Tau_{}.png".format(i)).exists()
+
+    @pytest.mark.parametrize("multi,outputs", [
+        (True, {}),
+        (False, {"stream_output": "tasksets.jsonl"}),
+        (False, {"dataset_output": "tasksets.bin"}),
+    ])
+    def test_unsupported(self, tmp_path, sample_config, multi, outputs):
+        sample_config["misc"]["multi-DAG_on"] = multi
+        sample_config["dag_config"]["large_graph"] = True
+
+        config_path = tmp_path / "config.json"
+        config_path.write_text(json.dumps(sample_config))
+        with pytest.raises(ValueError):
+            main(config_path=str(config_path), data_path=str(tmp_path / "data"),
+                 **{k: str(tmp_path / v) for k, v in outputs.items()})
+        assert not (tmp_path / "data" / "data-multi-m4-u0.8").exists()
+
+
+class TestStreamOutput:
+    def _run(self, tmp_path, sample_config, stream_output, multi=True):
+        sample_config["misc"]["multi-DAG_on"] = multi
+        sample_config["multi-DAG"]["set_number"] = 3
+        sample_config["single-DAG"]["set_number"] = 3
+
+        config_path = tmp_path / "config.json"
+        config_path.write_text(json.dumps(sample_config))
+        main(config_path=str(config_path), data_path=str(tmp_path / "data"),
+             stream_output=stream_output)
+
+    def test_jsonl(self, tmp_path, sample_config):
+        path = tmp_path / "tasksets.jsonl"
+        self._run(tmp_path, sample_config, str(path))
+
+        records = [json.loads(line) for line in path.read_text().splitlines()]
+        assert [r["set"] for r in records] == [0, 1, 2]
+        for r in records:
+            assert len(r["tasks"]) == 3
+            assert r["util"] == pytest.approx(sum(t["U"] for t in r["tasks"]))
+            for t in r["tasks"]:
+                assert {"Name", "U", "T", "L", "W", "Nodes", "Edges"} <= set(t)
+
+    def test_matches_taskset_json(self, tmp_path, sample_config):
+        sample_config["misc"]["multi-DAG_on"] = True
+        sample_config["misc"]["save_to_file"] = True
+        sample_config["misc"]["output_formats"] = ["json"]
+        sample_config["multi-DAG"]["set_number"] = 2
+        config_path = tmp_path / "config.json"
+        config_path.write_text(json.dumps(sample_config))
+        main(config_path=str(config_path), data_path=str(tmp_path / "data"),
+             stream_output=str(tmp_path / "tasksets.jsonl"))
+
+        for line in (tmp_path / "tasksets.jsonl").read_text().splitlines():
+            record = json.loads(line)
+            set_dir = tmp_path / "data" / "data-multi-m4-u0.8" / str(record.pop("set"))
+            assert record == json.loads((set_dir / "taskset.json").read_text())
+
+    def test_gzip(self, tmp_path, sample_config):
+        import gzip
+        path = tmp_path / "tasksets.jsonl.gz"
+        self._run(tmp_path, sample_config, str(path), multi=False)
+
+        with gzip.open(str(path), "rt") as f:
+            records = [json.loads(line) for line in f]
+        assert [r["set"] for r in records] == [0, 1, 2]
+        assert len(records[0]["tasks"]) == 1
+
+    def test_zstd(self, tmp_path, sample_config):
+        zstandard = pytest.importorskip("zstandard")
+        path = tmp_path / "tasksets.jsonl.zst"
+        self._run(tmp_path, sample_config, str(path))
+
+        with open(str(path), "rb") as f:
+            data = zstandard.ZstdDecompressor().stream_reader(f).read()
+        assert len(data.decode().splitlines()) == 3
+
+    def test_stdout(self, tmp_path, sample_config, capsys):
+        self._run(tmp_path, sample_config, "-")
+        lines = capsys.readouterr().out.splitlines()
+        assert len(lines) == 3
+        assert json.loads(lines[0])["set"] == 0
+
+    def test_same_records_for_any_workers(self, tmp_path, sample_config):
+        sample_config["misc"]["multi-DAG_on"] = True
+        sample_config["multi-DAG"]["set_number"] = 4
+        config_path = tmp_path / "config.json"
+        config_path.write_text(json.dumps(sample_config))
+
+        for workers in (1, 2):
+            main(config_path=str(config_path), data_path=str(tmp_path / "data"), workers=workers,
+                 stream_output=str(tmp_path / "w{}.jsonl".format(workers)))
+        assert (tmp_path / "w1.jsonl").read_text() == (tmp_path / "w2.jsonl").read_text()
+
+
+class TestOutputFormats:
+    def test_output_formats(self, tmp_path, sample_config):
+        sample_config["misc"]["multi-DAG_on"] = True
+        sample_config["misc"]["save_to_file"] = True
+        sample_config["misc"]["output_formats"] = ["json", "binary"]
+        sample_config["multi-DAG"]["set_number"] = 2
+
+        config_path = tmp_path / "config.json"
+        config_path.write_text(json.dumps(sample_config))
+        data_dir = tmp_path / "data"
+
+        main(config_path=str(config_path), data_path=str(data_dir))
+
+        set_dir = data_dir / "data-multi-m4-u0.8" / "0"
+        assert sorted(p.name for p in set_dir.iterdir()) == [
+            "Tau_0.json", "Tau_0.npz", "Tau_1.json", "Tau_1.npz", "Tau_2.json", "Tau_2.npz", "taskset.json"]
+
+        taskset = json.loads((set_dir / "taskset.json").read_text())
+        assert [t["Name"] for t in taskset["tasks"]] == ["Tau_0", "Tau_1", "Tau_2"]
+        assert taskset["tasks"][0] == json.loads((set_dir / "Tau_0.json").read_text())
+
+    def test_png_rendered_in_background(self, tmp_path, sample_config):
+        pytest.importorskip("pygraphviz")
+        sample_config["misc"]["multi-DAG_on"] = False
+        sample_config["misc"]["save_to_file"] = True
+        sample_config["misc"]["output_formats"] = ["png"]
+        sample_config["misc"]["render_workers"] = 2
+        sample_config["single-DAG"]["set_number"] = 3
+
+        config_path = tmp_path / "config.json"
+        config_path.write_text(json.dumps(sample_config))
+        data_dir = tmp_path / "data"
+
+        main(config_path=str(config_path), data_path=str(data_dir))
+
+        assert sorted(p.name for p in data_dir.iterdir()) == ["Tau_0.png", "Tau_1.png", "Tau_2.png",
+                                                              "manifest.json"]
+
+    def test_renderer_closed_on_setup_error(self, tmp_path, sample_config, monkeypatch):
+        renderers = []
+
+        class Renderer:
+            def __init__(self, workers=None):
+                self.closed = False
+                renderers.append(self)
+
+            def close(self):
+                self.closed = True
+
+        def fail(path):
+            raise OSError("cannot write the dataset")
+
+        monkeypatch.setattr(_cli, "PNGRenderer", Renderer)
+        monkeypatch.setattr(_cli, "TasksetDatasetWriter", fail)
+        sample_config["misc"]["save_to_file"] = True
+        sample_config["misc"]["output_formats"] = ["png"]
+
+        config_path = tmp_path / "config.json"
+        config_path.write_text(json.dumps(sample_config))
+        with pytest.raises(OSError):
+            main(config_path=str(config_path), data_path=str(tmp_path / "data"),
+                 dataset_output=str(tmp_path / "tasksets.bin"))
+        assert all(r.closed for r in renderers)
+
+
+class TestDatasetOutput:
+    def test_matches_stream(self, tmp_path, sample_config):
+        from utility import load_dataset
+
+        sample_config["misc"]["multi-DAG_on"] = True
+        sample_config["multi-DAG"]["set_number"] = 3
+        config_path = tmp_path / "config.json"
+        config_path.write_text(json.dumps(sample_config))
+
+        main(config_path=str(config_path), data_path=str(tmp_path / "data"),
+             stream_output=str(tmp_path / "tasksets.jsonl"),
+             dataset_output=str(tmp_path / "tasksets.bin"))
+
+        records = [json.loads(line) for line in (tmp_path / "tasksets.jsonl").read_text().splitlines()]
+        tasks = [(r["set"], k, t) for r in records for k, t in enumerate(r["tasks"])]
+
+        dataset = load_dataset(str(tmp_path / "tasksets.bin"))
+        assert len(dataset) == len(tasks) == 9
+        for (set_index, k, t), d in zip(tasks, dataset):
+            assert (d["set"], d["index"]) == (set_index, k)
+            assert (d["U"], d["T"], d["W"]) == (t["U"], t["T"], t["W"])
+            assert d["C"].tolist() == [t["Nodes"][str(v)] for v in range(1, len(t["Nodes"]) + 1)]
+            assert ["{}:{}".format(u, v) for u, v in d["edges"]] == t["Edges"]
+
+    def test_without_stream(self, tmp_path, sample_config):
+        from utility import load_dataset
+
+        sample_config["misc"]["multi-DAG_on"] = True
+        sample_config["multi-DAG"]["set_number"] = 2
+        config_path = tmp_path / "config.json"
+        config_path.write_text(json.dumps(sample_config))
+        main(config_path=str(config_path), data_path=str(tmp_path / "data"),
+             dataset_output=str(tmp_path / "tasksets.bin"))
+
+        sample_config["misc"].update(save_to_file=False, dataset_output="unused.bin")
+        record, _, _ = _cli.gen_multi_dag_taskset(sample_config, "", 1)
+        assert len(record["arrays"]) == len(record["tasks"]) == 3
+
+        dataset = load_dataset(str(tmp_path / "tasksets.bin"))
+        assert len(dataset) == 6
+        for k, t in enumerate(record["tasks"]):
+            d = dataset[3 + k]
+            assert d["C"].tolist() == [t["Nodes"][str(v)] for v in range(1, len(t["Nodes"]) + 1)]
+            assert ["{}:{}".format(u, v) for u, v in d["edges"]] == t["Edges"]
+
+    def test_empty(self, tmp_path):
+        from utility import load_dataset
+        path = str(tmp_path / "empty.bin")
+        _cli.TasksetDatasetWriter(path).close()
+        assert len(load_dataset(path)) == 0
+
+
+class TestTargets:
+    @pytest.mark.parametrize("multi", [False, True])
+    def test_targets(self, tmp_path, sample_config, multi):
+        sample_config["misc"]["multi-DAG_on"] = multi
+        sample_config["dag_config"]["targets"] = {"W_L": [2, 3]}
+        config_path = tmp_path / "config.json"
+        config_path.write_text(json.dumps(sample_config))
+
+        stats = main(config_path=str(config_path), data_path=str(tmp_path / "data"),
+                     stream_output=str(tmp_path / "tasksets.jsonl"))
+
+        tasks = [t for line in (tmp_path / "tasksets.jsonl").read_text().splitlines()
+                 for t in json.loads(line)["tasks"]]
+        assert stats["dags"] == len(tasks) > 0
+        assert stats["tries"] >= stats["dags"]
+        for t in tasks:
+            assert 2 <= t["W"] / t["L"] <= 3
+
+
+class TestExecTimeAlgorithm:
+    def test_dirichlet_exact_workload(self, tmp_path, sample_config):
+        sample_config["misc"]["multi-DAG_on"] = True
+        sample_config["misc"]["exec_time_algorithm"] = "dirichlet"
+        config_path = tmp_path / "config.json"
+        config_path.write_text(json.dumps(sample_config))
+
+        main(config_path=str(config_path), data_path=str(tmp_path / "data"),
+             stream_output=str(tmp_path / "tasksets.jsonl"))
+
+        for line in (tmp_path / "tasksets.jsonl").read_text().splitlines():
+            for t in json.loads(line)["tasks"]:
+                assert sum(t["Nodes"].values()) == t["W"] == round(t["U"] * t["T"])
+
+
+class TestPeriodMode:
+    @pytest.mark.parametrize("mode,periods", [
+        ("choice", [1000, 5000]),
+        ("uniform", [1000, 5000]),
+        ("loguniform", [1000, 100000]),
+        ("harmonic", [1000, 8000]),
+    ])
+    def test_period_mode(self, tmp_path, sample_config, mode, periods):
+        sample_config["misc"]["multi-DAG_on"] = True
+        sample_config["multi-DAG"]["period_mode"] = mode
+        sample_config["multi-DAG"]["periods"] = periods
+        config_path = tmp_path / "config.json"
+        config_path.write_text(json.dumps(sample_config))
+
+        main(config_path=str(config_path), data_path=str(tmp_path / "data"),
+             stream_output=str(tmp_path / "tasksets.jsonl"))
+
+        for line in (tmp_path / "tasksets.jsonl").read_text().splitlines():
+            for t in json.loads(line)["tasks"]:
+                assert periods[0] <= t["T"] <= periods[1]
+                if mode == "choice":
+                    assert t["T"] in periods
+                if mode == "harmonic":
+                    assert t["T"] in (1000, 2000, 4000, 8000)
+
+
+class TestMaxHyperperiod:
+    @pytest.mark.parametrize("mode,periods", [
+        (None, [1000, 1500, 2000, 3000, 7000]),
+        (None, [1000, 9000]),
+        ("loguniform", [1000, 100000]),
+        ("harmonic", [1000, 64000]),
+    ])
+    def test_bounded(self, tmp_path, sample_config, mode, periods):
+        import math
+        sample_config["misc"]["multi-DAG_on"] = True
+        sample_config["multi-DAG"]["set_number"] = 5
+        sample_config["multi-DAG"]["periods"] = periods
+        sample_config["multi-DAG"]["max_hyperperiod"] = 12000
+        if mode is not None:
+            sample_config["multi-DAG"]["period_mode"] = mode
+            sample_config["multi-DAG"]["period_granularity"] = 1000
+        config_path = tmp_path / "config.json"
+        config_path.write_text(json.dumps(sample_config))
+
+        main(config_path=str(config_path), data_path=str(tmp_path / "data"),
+             stream_output=str(tmp_path / "tasksets.jsonl"))
+
+        for line in (tmp_path / "tasksets.jsonl").read_text().splitlines():
+            record = json.loads(line)
+            H = 1
+            for t in record["tasks"]:
+                assert periods[0] <= t["T"] <= periods[-1]
+                H = H * t["T"] // math.gcd(H, t["T"])
+            assert record["hyperperiod"] == H <= 12000
+
+    def test_period_candidates(self):
+        population, weights = _cli.period_candidates({"periods": [10, 40], "period_mode": "loguniform",
+                                                      "period_granularity": 10})
+        assert list(population) == [10, 20, 30, 40]
+        assert list(weights) == sorted(weights, reverse=True)
+        assert _cli.period_candidates({"periods": [10, 80], "period_mode": "harmonic"})[0] == [10, 20, 40, 80]
+        assert _cli.period_candidates({"periods": [10, 13]})[0] == [10, 11, 12, 13]
+
+    def test_candidates_once_per_run(self, tmp_path, sample_config, monkeypatch):
+        calls = []
+        period_candidates = _cli.period_candidates
+
+        def count(multi_config):
+            calls.append(multi_config["periods"])
+            return period_candidates(multi_config)
+
+        monkeypatch.setattr(_cli, "period_candidates", count)
+        sample_config["misc"]["multi-DAG_on"] = True
+        sample_config["multi-DAG"]["set_number"] = 5
+        sample_config["multi-DAG"]["periods"] = [1000, 9000]
+        sample_config["multi-DAG"]["max_hyperperiod"] = 12000
+        config_path = tmp_path / "config.json"
+        config_path.write_text(json.dumps(sample_config))
+
+        main(config_path=str(config_path), data_path=str(tmp_path / "data"))
+        assert calls == [[1000, 9000]]
+
+
+class TestProfile:
+    @pytest.mark.parametrize("workers", [1, 2])
+    def test_profile(self, tmp_path, sample_config, capsys, workers):
+        import pstats
+        sample_config["misc"]["multi-DAG_on"] = True
+        sample_config["misc"]["save_to_file"] = True
+        sample_config["misc"]["output_formats"] = ["json"]
+        sample_config["multi-DAG"]["set_number"] = 4
+        config_path = tmp_path / "config.json"
+        config_path.write_text(json.dumps(sample_config))
+
+        main(config_path=str(config_path), data_path=str(tmp_path / "data"), workers=workers,
+             stream_output=str(tmp_path / "tasksets.jsonl"),
+             profile_output=str(tmp_path / "profile.json"), trace_output=str(tmp_path / "trace.json"),
+             cprofile_output=str(tmp_path / "main.prof"))
+
+        assert "gen_rnd" in capsys.readouterr().err
+        profile = json.loads((tmp_path / "profile.json").read_text())
+        n_tasks = 4 * sample_config["multi-DAG"]["task_number_per_set"]
+        assert profile["counts"]["sets"] == 4
+        assert profile["counts"]["dags"] == n_tasks
+        for stage in ("utilization", "periods", "gen_rnd", "gen_execution_times", "save", "write_stream"):
+            assert profile["stages"][stage]["calls"] > 0
+        assert profile["stages"]["gen_rnd"]["calls"] == n_tasks
+
+        records = [json.loads(line) for line in (tmp_path / "tasksets.jsonl").read_text().splitlines()]
+        assert profile["counts"]["nodes"] == sum(len(t["Nodes"]) for r in records for t in r["tasks"])
+        assert profile["counts"]["bytes_written"] > (tmp_path / "tasksets.jsonl").stat().st_size
+
+        trace = json.loads((tmp_path / "trace.json").read_text())
+        assert len(trace["traceEvents"]) == sum(s["calls"] for s in profile["stages"].values())
+        pstats.Stats(str(tmp_path / "main.prof"))
+
+    def test_disabled_by_default(self, tmp_path, sample_config, capsys):
+        sample_config["misc"]["multi-DAG_on"] = True
+        config_path = tmp_path / "config.json"
+        config_path.write_text(json.dumps(sample_config))
+
+        main(config_path=str(config_path), data_path=str(tmp_path / "data"))
+        assert "wall [s]" not in capsys.readouterr().err
+
+
+class TestResume:
+    def _config(self, tmp_path, sample_config, n_set=6):
+        sample_config["misc"]["multi-DAG_on"] = True
+        sample_config["misc"]["save_to_file"] = True
+        sample_config["misc"]["output_formats"] = ["json"]
+        sample_config["multi-DAG"]["set_number"] = n_set
+        config_path = tmp_path / "config.json"
+        config_path.write_text(json.dumps(sample_config))
+        return str(config_path)
+
+    def test_resume_after_crash(self, tmp_path, sample_config, monkeypatch):
+        config_path = self._config(tmp_path, sample_config)
+        main(config_path=config_path, data_path=str(tmp_path / "full"),
+             stream_output=str(tmp_path / "full.jsonl"))
+
+        # crash at set 4, leaving a partial record behind
+        gen_multi_dag_taskset = _cli.gen_multi_dag_taskset
+        calls = []
+
+        def crash(config, data_path, set_index, renderer=None):
+            if set_index == 4:
+                with open(str(tmp_path / "part.jsonl"), "a") as f:
+                    f.write('{"set":4,"tas')
+                raise RuntimeError("crash")
+            return gen_multi_dag_taskset(config, data_path, set_index, renderer=renderer)
+
+        monkeypatch.setattr(_cli, "gen_multi_dag_taskset", crash)
+        with pytest.raises(RuntimeError):
+            main(config_path=config_path, data_path=str(tmp_path / "part"),
+                 stream_output=str(tmp_path / "part.jsonl"))
+
+        def count(config, data_path, set_index, renderer=None):
+            calls.append(set_index)
+            return gen_multi_dag_taskset(config, data_path, set_index, renderer=renderer)
+
+        monkeypatch.setattr(_cli, "gen_multi_dag_taskset", count)
+        main(config_path=config_path, data_path=str(tmp_path / "part"),
+             stream_output=str(tmp_path / "part.jsonl"), resume=True)
+
+        assert calls == [4, 5]
+        assert (tmp_path / "part.jsonl").read_text() == (tmp_path / "full.jsonl").read_text()
+        for i in range(6):
+            folder = "data-multi-m4-u0.8/{}/taskset.json".format(i)
+            assert (tmp_path / "part" / folder).read_text() == (tmp_path / "full" / folder).read_text()
+
+    def test_extend(self, tmp_path, sample_config):
+        main(config_path=self._config(tmp_path, sample_config, n_set=3), data_path=str(tmp_path / "data"),
+             stream_output=str(tmp_path / "part.jsonl"))
+        main(config_path=self._config(tmp_path, sample_config, n_set=5), data_path=str(tmp_path / "data"),
+             stream_output=str(tmp_path / "part.jsonl"), resume=True)
+        main(config_path=self._config(tmp_path, sample_config, n_set=5), data_path=str(tmp_path / "full"),
+             stream_output=str(tmp_path / "full.jsonl"))
+
+        assert (tmp_path / "part.jsonl").read_text() == (tmp_path / "full.jsonl").read_text()
+        manifest = json.loads((tmp_path / "data" / "data-multi-m4-u0.8" / "manifest.json").read_text())
+        assert manifest["completed"] == [[0, 5]]
+        assert manifest["rnd_seed"] == sample_config["misc"]["rnd_seed"]
+
+    def test_config_changed(self, tmp_path, sample_config):
+        config_path = self._config(tmp_path, sample_config)
+        main(config_path=config_path, data_path=str(tmp_path / "data"))
+
+        sample_config["dag_config"]["parallelism"] = 3
+        config_path = self._config(tmp_path, sample_config)
+        with pytest.raises(ValueError):
+            main(config_path=config_path, data_path=str(tmp_path / "data"), resume=True)
+        # a new run replaces the manifest
+        main(config_path=config_path, data_path=str(tmp_path / "data"))
+
+    def test_compressed_stream(self, tmp_path, sample_config):
+        with pytest.raises(ValueError):
+            main(config_path=self._config(tmp_path, sample_config), data_path=str(tmp_path / "data"),
+                 stream_output=str(tmp_path / "tasksets.jsonl.gz"), resume=True)
+
+
+    def test_failed_render_not_completed(self, tmp_path, sample_config, monkeypatch):
+        import rnddag
+        from concurrent.futures import ThreadPoolExecutor
+
+        class Renderer(rnddag.PNGRenderer):
+            def __init__(self, workers=None):
+                super().__init__(workers=1)
+                self.executor.shutdown()
+                self.executor = ThreadPoolExecutor(max_workers=2)
+
+        failing = ["{0}1{0}".format(os.sep)]
+
+        def render(G, path):
+            if any(f in path for f in failing):
+                raise OSError("render failed")
+            open(path, "wb").close()
+
+        monkeypatch.setattr(_cli, "PNGRenderer", Renderer)
+        monkeypatch.setattr(rnddag, "render_png", render)
+        config_path = self._config(tmp_path, sample_config, n_set=4)
+        sample_config["misc"]["output_formats"] = ["png"]
+        (tmp_path / "config.json").write_text(json.dumps(sample_config))
+
+        # the images of set 1 fail: sets 1 to 3 are not completed
+        with pytest.raises(OSError):
+            main(config_path=config_path, data_path=str(tmp_path / "part"),
+                 stream_output=str(tmp_path / "part.jsonl"))
+        manifest = json.loads((tmp_path / "part" / "data-multi-m4-u0.8" / "manifest.json").read_text())
+        assert manifest["completed"] == [[0, 1]]
+
+        failing.clear()
+        main(config_path=config_path, data_path=str(tmp_path / "part"),
+             stream_output=str(tmp_path / "part.jsonl"), resume=True)
+        main(config_path=config_path, data_path=str(tmp_path / "full"),
+             stream_output=str(tmp_path / "full.jsonl"))
+        assert (tmp_path / "part.jsonl").read_text() == (tmp_path / "full.jsonl").read_text()
+
+
+class TestRunManifest:
+    def test_ranges(self, tmp_path, sample_config):
+        m = _cli.RunManifest(str(tmp_path / "manifest.json"), sample_config)
+        for i in (0, 1, 2, 5, 7, 6, 3, 3):
+            m.add(i)
+        assert m.completed == [[0, 4], [5, 8]]
+        assert m.pending(10) == [4, 8, 9]
+        assert m.n_completed() == 7
+        assert not m.is_done(4) and m.is_done(7)
+
+    def test_save_load(self, tmp_path, sample_config):
+        path = str(tmp_path / "manifest.json")
+        m = _cli.RunManifest(path, sample_config)
+        m.add(0)
+        m.add(2)
+        m.save()
+        assert os.listdir(str(tmp_path)) == ["manifest.json"]
+
+        assert _cli.RunManifest(path, sample_config, resume=True).completed == [[0, 1], [2, 3]]
+        assert _cli.RunManifest(path, sample_config).completed == []
+
+    def test_config_hash(self, sample_config):
+        import copy
+        h = _cli.config_hash(sample_config)
+        other = copy.deepcopy(sample_config)
+        other["multi-DAG"]["set_number"] = 1000
+        other["misc"]["print_DAG"] = not other["misc"]["print_DAG"]
+        assert _cli.config_hash(other) == h
+        other["misc"]["rnd_seed"] = 7
+        assert _cli.config_hash(other) != h
+
+
+class TestSweep:
+    def test_expand(self, sample_config):
+        sample_config["misc"]["multi-DAG_on"] = True
+        sample_config["misc"]["cores"] = [2, 4]
+        sample_config["multi-DAG"]["utilization"] = {"start": 0.5, "stop": "cores", "step": 0.5}
+        sample_config["dag_config"]["parallelism"] = [3, 5]
+
+        points = _cli.expand_sweep(sample_config)
+        assert len(points) == (4 + 8) * 2
+        assert points[0]["sweep_point"] == {"cores": 2, "utilization": 0.5, "parallelism": 3}
+        assert points[-1]["sweep_point"] == {"cores": 4, "utilization": 4.0, "parallelism": 5}
+        assert [p["multi-DAG"]["utilization"] for p in points[::2]][:4] == [0.5, 1.0, 1.5, 2.0]
+        assert _cli.run_folder(points[1], "data") == os.path.join("data", "data-multi-m2-u0.5-parallelism5")
+        # the configuration itself is left untouched
+        assert sample_config["misc"]["cores"] == [2, 4]
+
+    def test_no_sweep(self, sample_config):
+        assert _cli.expand_sweep(sample_config) == [sample_config]
+        assert _cli.sweep_values({"start": 1, "stop": 10, "step": 3}, sample_config) == [1, 4, 7, 10]
+        assert _cli.sweep_values({"start": 0.1, "stop": 0.3, "step": 0.1}, sample_config) == [0.1, 0.2, 0.3]
+
+    def test_invalid(self, sample_config):
+        sample_config["multi-DAG"]["utilization"] = [0.81, 0.82]
+        sample_config["misc"]["multi-DAG_on"] = True
+        with pytest.raises(ValueError):
+            _cli.expand_sweep(sample_config)
+        sample_config["multi-DAG"]["utilization"] = [0.8, 1.6]
+        sample_config["misc"]["multi-DAG_on"] = False
+        with pytest.raises(ValueError):
+            _cli.expand_sweep(sample_config)
+
+    def test_sweep(self, tmp_path, sample_config):
+        sample_config["misc"]["multi-DAG_on"] = True
+        sample_config["misc"]["save_to_file"] = True
+        sample_config["misc"]["output_formats"] = ["json"]
+        sample_config["misc"]["cores"] = [2, 4]
+        sample_config["multi-DAG"]["utilization"] = [0.8, 1.6]
+        sample_config["multi-DAG"]["set_number"] = 2
+        config_path = tmp_path / "config.json"
+        config_path.write_text(json.dumps(sample_config))
+
+        for workers in (1, 2):
+            main(config_path=str(config_path), data_path=str(tmp_path / "data"), workers=workers,
+                 stream_output=str(tmp_path / "w{}.jsonl".format(workers)))
+        assert (tmp_path / "w1.jsonl").read_text() == (tmp_path / "w2.jsonl").read_text()
+
+        records = [json.loads(line) for line in (tmp_path / "w1.jsonl").read_text().splitlines()]
+        assert [(r["point"]["cores"], r["point"]["utilization"], r["set"]) for r in records] == [
+            (m, u, i) for m in (2, 4) for u in (0.8, 1.6) for i in range(2)]
+        for m in (2, 4):
+            for u in (0.8, 1.6):
+                assert (tmp_path / "data" / "data-multi-m{}-u{:.1f}".format(m, u) / "1" / "taskset.json").exists()
+
+        # a point comes out as in a run of its own
+        sample_config["misc"]["cores"] = 4
+        sample_config["multi-DAG"]["utilization"] = 0.8
+        config_path.write_text(json.dumps(sample_config))
+        main(config_path=str(config_path), data_path=str(tmp_path / "single"),
+             stream_output=str(tmp_path / "single.jsonl"))
+        single = [json.loads(line) for line in (tmp_path / "single.jsonl").read_text().splitlines()]
+        for r in records[4:6]:
+            del r["point"]
+        assert records[4:6] == single
+
+    def test_resume(self, tmp_path, sample_config, monkeypatch):
+        sample_config["misc"]["multi-DAG_on"] = True
+        sample_config["misc"]["cores"] = [2, 4]
+        config_path = tmp_path / "config.json"
+        config_path.write_text(json.dumps(sample_config))
+        main(config_path=str(config_path), data_path=str(tmp_path / "data"),
+             stream_output=str(tmp_path / "tasksets.jsonl"))
+        stream = (tmp_path / "tasksets.jsonl").read_text()
+
+        calls = []
+        monkeypatch.setattr(_cli, "gen_multi_dag_taskset", lambda *args, **kwargs: calls.append(args))
+        main(config_path=str(config_path), data_path=str(tmp_path / "data"),
+             stream_output=str(tmp_path / "tasksets.jsonl"), resume=True)
+        assert calls == []
+        assert (tmp_path / "tasksets.jsonl").read_text() == stream
+
+
+class TestLazyImports:
+    def test_no_plotting_imports(self):
+        import subprocess
+        import sys
+        code = ("import importlib, sys; importlib.import_module('daggen-cli'); "
+                "print([m for m in ('matplotlib', 'pygraphviz', 'tqdm') if m in sys.modules])")
+        src = os.path.join(os.path.dirname(__file__), os.pardir, "src")
+        out = subprocess.run([sys.executable, "-c", code], cwd=src, check=True,
+                             capture_output=True, text=True).stdout
+        assert out.strip() == "[]"
@@ -1,7 +1,9 @@
 import pytest
 import random
+import numpy as np
 
-from generator import uunifast_discard, drs_gen, gen_period, gen_execution_times
+from generator import uunifast_discard, uunifast_discard_np, drs_gen, drs_gen_batch
+from generator import gen_period, gen_period_np, gen_period_bounded, gen_execution_times, gen_execution_times_np, round_to_sum
 
 
 # ---- uunifast_discard ----
@@ -34,6 +36,65 @@ class TestUunifastDiscard:
         assert len(sets) == 10
 
 
+# ---- uunifast_discard_np ----
+
+class TestUunifastDiscardNp:
+    def test_shape(self):
+        sets = uunifast_discard_np(n=5, u=1.0, nsets=3, ulimit=1, rng=1)
+        assert sets.shape == (3, 5)
+
+    def test_respects_ulimit(self):
+        sets = uunifast_discard_np(n=5, u=2.0, nsets=50, ulimit=1, rng=1)
+        assert np.all(sets <= 1.0)
+        assert np.all(sets >= 0)
+
+    def test_each_set_sums_to_u(self):
+        sets = uunifast_discard_np(n=5, u=1.5, nsets=20, ulimit=2, rng=1)
+        assert np.allclose(sets.sum(axis=1), 1.5)
+
+    def test_reproducible_with_seed(self):
+        s1 = uunifast_discard_np(n=6, u=3.0, nsets=10, ulimit=1, rng=7)
+        s2 = uunifast_discard_np(n=6, u=3.0, nsets=10, ulimit=1, rng=np.random.default_rng(7))
+        assert np.array_equal(s1, s2)
+
+    def test_low_acceptance_rate(self):
+        """At high u / ulimit most vectors are rejected; the batch must adapt."""
+        sets = uunifast_discard_np(n=5, u=3.5, nsets=100, ulimit=1, rng=3, batch=1)
+        assert sets.shape == (100, 5)
+        assert np.all(sets <= 1.0)
+
+    def test_infeasible_raises(self):
+        with pytest.raises(ValueError):
+            uunifast_discard_np(n=3, u=4.0, nsets=1, ulimit=1)
+
+    def test_boundary_utilization(self):
+        """u == n * ulimit has the single solution of every task at ulimit."""
+        assert np.array_equal(uunifast_discard_np(4, 4.0, 2), np.ones((2, 4)))
+        assert np.array_equal(uunifast_discard_np(n=4, u=8.0, nsets=3, ulimit=2), np.full((3, 4), 2.0))
+
+    def test_near_infeasible_raises(self):
+        with pytest.raises(RuntimeError):
+            uunifast_discard_np(n=20, u=19.9, nsets=1, ulimit=1, rng=1, max_draws=10000)
+
+    @pytest.mark.parametrize("n,u,ulimit", [(4, 2.0, 1), (5, 3.5, 1), (8, 2.0, 0.5)])
+    def test_same_distribution_as_uunifast_discard(self, n, u, ulimit):
+        """The marginal distribution of every task matches the pure-Python
+        version: equal quantiles and a two-sample Kolmogorov-Smirnov
+        statistic below its critical value (alpha = 0.001)."""
+        random.seed(5)
+        ref = np.array(uunifast_discard(n=n, u=u, nsets=2000, ulimit=ulimit))
+        sets = uunifast_discard_np(n=n, u=u, nsets=2000, ulimit=ulimit, rng=5)
+
+        q = [0.1, 0.25, 0.5, 0.75, 0.9]
+        assert np.allclose(np.quantile(sets, q, axis=0), np.quantile(ref, q, axis=0), atol=0.05 * ulimit)
+        for k in range(n):
+            a, b = np.sort(sets[:, k]), np.sort(ref[:, k])
+            x = np.concatenate([a, b])
+            d = np.max(np.abs(np.searchsorted(a, x, side="right") / len(a) -
+                              np.searchsorted(b, x, side="right") / len(b)))
+            assert d < 1.95 * np.sqrt(2 / 2000)
+
+
 # ---- gen_period ----
 
 class TestGenPeriod:
@@ -64,6 +125,82 @@ class TestGenPeriod:
 
 # ---- gen_execution_times ----
 
+class TestGenPeriodBounded:
+    def test_bound(self):
+        import math
+        random.seed(0)
+        population = list(range(1000, 10001, 500))
+        for _ in range(200):
+            periods, H = gen_period_bounded(population, 10, 100000)
+            assert len(periods) == 10
+            assert set(periods) <= set(population)
+            lcm = 1
+            for p in periods:
+                lcm = lcm * p // math.gcd(lcm, p)
+            assert H == lcm <= 100000
+
+    def test_two_values_are_a_set(self):
+        random.seed(1)
+        periods, _ = gen_period_bounded([100, 300], 50, 300)
+        assert set(periods) == {100, 300}
+
+    def test_weights(self):
+        random.seed(2)
+        periods, _ = gen_period_bounded([10, 20], 1000, 20, weights=[0, 1])
+        assert set(periods) == {20}
+
+    def test_infeasible(self):
+        with pytest.raises(ValueError):
+            gen_period_bounded([1000, 2000], 3, 500)
+
+
+class TestGenPeriodNp:
+    def test_shape(self):
+        rng = np.random.default_rng(0)
+        periods = gen_period_np(5, nsets=7, population=[10, 20, 50], rng=rng)
+        assert periods.shape == (7, 5)
+
+    def test_int_seed(self):
+        periods = gen_period_np(5, population=[10, 20, 50], rng=3)
+        assert periods.tolist() == gen_period_np(5, population=[10, 20, 50], rng=np.random.default_rng(3)).tolist()
+
+    def test_choice_two_values(self):
+        # two values are a period set, not a range
+        rng = np.random.default_rng(1)
+        periods = gen_period_np(1000, population=[100, 1000], rng=rng)
+        assert set(np.unique(periods).tolist()) == {100, 1000}
+
+    def test_uniform(self):
+        rng = np.random.default_rng(2)
+        periods = gen_period_np(10000, mode="uniform", low=10, high=20, rng=rng)
+        assert periods.min() == 10
+        assert periods.max() == 20
+
+    def test_loguniform(self):
+        rng = np.random.default_rng(3)
+        periods = gen_period_np(100000, mode="loguniform", low=10, high=10000, granularity=10, rng=rng)
+        assert periods.dtype.kind == "i"
+        assert periods.min() >= 10
+        assert periods.max() <= 10000
+        assert np.all(periods % 10 == 0)
+        # equal numbers of periods per decade
+        counts = np.histogram(np.log10(periods), bins=[1, 2, 3, 4.01])[0]
+        assert counts / counts.sum() == pytest.approx([1 / 3] * 3, abs=0.02)
+
+    def test_harmonic(self):
+        rng = np.random.default_rng(4)
+        periods = gen_period_np(1000, mode="harmonic", low=100, high=1000, rng=rng)
+        assert set(np.unique(periods).tolist()) == {100, 200, 400, 800}
+        periods = gen_period_np(1000, mode="harmonic", low=10, high=1000, ratio=10, rng=rng)
+        assert set(np.unique(periods).tolist()) == {10, 100, 1000}
+
+    def test_invalid(self):
+        with pytest.raises(ValueError):
+            gen_period_np(3, mode="exponential", low=1, high=2)
+        with pytest.raises(ValueError):
+            gen_period_np(3, mode="uniform", low=5, high=2)
+
+
 class TestGenExecutionTimes:
     def test_length(self):
         c = gen_execution_times(n=10, w=1000)
@@ -100,6 +237,62 @@ class TestGenExecutionTimes:
         assert sum(c.values()) == pytest.approx(1000, rel=0.01)
 
 
+class TestGenExecutionTimesNp:
+    def test_length_and_sum(self):
+        rng = np.random.default_rng(0)
+        c = gen_execution_times_np(n=10, w=1000, rng=rng)
+        assert isinstance(c, np.ndarray)
+        assert len(c) == 10
+        assert c.sum() == pytest.approx(1000)
+
+    @pytest.mark.parametrize("distribution", ["dirichlet", "uniform"])
+    def test_rounded_exact_sum(self, distribution):
+        rng = np.random.default_rng(1)
+        for n in (1, 5, 30):
+            c = gen_execution_times_np(n=n, w=997.6, round_c=True, rng=rng, distribution=distribution)
+            assert c.dtype.kind == "i"
+            assert c.sum() == 998
+            assert c.min() >= 1
+
+    def test_dummy_source_sink(self):
+        rng = np.random.default_rng(2)
+        c = gen_execution_times_np(n=8, w=500, round_c=True, dummy=True, rng=rng)
+        assert c[0] == 1
+        assert c[-1] == 1
+        assert c.sum() == 500
+
+    def test_workload_below_node_count(self):
+        # the sum cannot be kept, every value is clamped to 1 as in gen_execution_times
+        c = gen_execution_times_np(23, 3, round_c=True, rng=np.random.default_rng(0))
+        assert c.tolist() == [1] * 23
+        c = gen_execution_times_np(10, 5, round_c=True, dummy=True, rng=np.random.default_rng(0))
+        assert c.tolist() == [1] * 10
+
+    def test_int_seed(self):
+        c = gen_execution_times_np(10, 1000, round_c=True, rng=7)
+        assert c.tolist() == gen_execution_times_np(10, 1000, round_c=True, rng=np.random.default_rng(7)).tolist()
+
+    def test_custom_distribution(self):
+        rng = np.random.default_rng(3)
+        c = gen_execution_times_np(n=4, w=100, rng=rng, distribution=lambda rng, size: np.arange(1, size + 1))
+        assert c.tolist() == pytest.approx([10, 20, 30, 40])
+
+    def test_alpha(self):
+        # a large concentration gives a near-even split
+        rng = np.random.default_rng(4)
+        c = gen_execution_times_np(n=10, w=1000, rng=rng, alpha=1e6)
+        assert c == pytest.approx(np.full(10, 100), rel=0.01)
+
+    def test_seeded(self):
+        c1 = gen_execution_times_np(n=10, w=100, round_c=True, rng=np.random.default_rng(5))
+        c2 = gen_execution_times_np(n=10, w=100, round_c=True, rng=np.random.default_rng(5))
+        assert c1.tolist() == c2.tolist()
+
+    def test_unknown_distribution(self):
+        with pytest.raises(ValueError):
+            gen_execution_times_np(n=3, w=10, distribution="normal")
+
+
 # ---- drs_gen ----
 
 drs_mod = pytest.importorskip("drs")
@@ -130,3 +323,70 @@ class TestDrsGen:
         for s in sets:
             for v in s:
                 assert v >= 0
+
+
+# ---- drs_gen_batch ----
+
+class TestDrsGenBatch:
+    def test_shape(self):
+        sets = drs_gen_batch(n=5, u=1.0, nsets=3, ulimit=1, rng=1)
+        assert sets.shape == (3, 5)
+
+    def test_each_set_sums_to_u(self):
+        sets = drs_gen_batch(n=5, u=2.0, nsets=50, ulimit=2, rng=1)
+        assert np.allclose(sets.sum(axis=1), 2.0)
+
+    def test_respects_bounds(self):
+        sets = drs_gen_batch(n=6, u=3.5, nsets=50, ulimit=1, rng=1)
+        assert np.all(sets <= 1.0 + 1e-9)
+        assert np.all(sets >= 0)
+
+    def test_tight_bounds(self):
+        sets = drs_gen_batch(n=4, u=1.9, nsets=50, ulimit=0.5, rng=1)
+        assert np.allclose(sets.sum(axis=1), 1.9)
+        assert np.all(sets <= 0.5 + 1e-9)
+
+    def test_reproducible_with_seed(self):
+        s1 = drs_gen_batch(n=5, u=3.0, nsets=10, ulimit=1, rng=7)
+        s2 = drs_gen_batch(n=5, u=3.0, nsets=10, ulimit=1, rng=7)
+        assert np.array_equal(s1, s2)
+
+    def test_independent_of_workers(self):
+        s1 = drs_gen_batch(n=5, u=3.0, nsets=40, ulimit=1, rng=7, chunk=10)
+        s2 = drs_gen_batch(n=5, u=3.0, nsets=40, ulimit=1, rng=7, chunk=10, workers=2)
+        assert np.array_equal(s1, s2)
+
+    def test_infeasible_raises(self):
+        with pytest.raises(ValueError):
+            drs_gen_batch(n=3, u=4.0, nsets=1, ulimit=1)
+
+    def test_same_distribution_as_drs_gen(self):
+        random.seed(5)
+        ref = np.array(drs_gen(n=4, u=2.0, nsets=500, ulimit=1))
+        sets = drs_gen_batch(n=4, u=2.0, nsets=500, ulimit=1, rng=5)
+        assert np.allclose(sets.mean(axis=0), ref.mean(axis=0), atol=0.05)
+
+
+# ---- round_to_sum ----
+
+class TestRoundToSum:
+    def test_exact_sum(self):
+        rng = np.random.default_rng(0)
+        for _ in range(200):
+            c = rng.random(rng.integers(1, 20)) * 50
+            total = int(rng.integers(len(c), 500))
+            r = round_to_sum(c, total)
+            assert r.sum() == total
+            assert np.all(r >= 0)
+
+    def test_largest_remainder(self):
+        assert round_to_sum([1.2, 2.5, 3.3], 7).tolist() == [1, 3, 3]
+        assert round_to_sum([0.5, 0.5, 1.0], 2).tolist() == [1, 0, 1]
+
+    def test_minimum(self):
+        r = round_to_sum([0.01, 0.01, 9.98], 10, minimum=1)
+        assert r.tolist() == [1, 1, 8]
+
+    def test_infeasible(self):
+        with pytest.raises(ValueError):
+            round_to_sum([1, 1, 1], 2, minimum=1)
@@ -0,0 +1,70 @@
+import pytest
+import json
+import time
+
+from profiler import StageProfiler
+
+
+class TestStageProfiler:
+    def test_stage_timing(self):
+        p = StageProfiler()
+        for _ in range(3):
+            with p.stage("sleep"):
+                time.sleep(0.01)
+        calls, wall, cpu = p.stages["sleep"]
+        assert calls == 3
+        assert wall >= 0.03
+        assert cpu < wall
+
+    def test_stage_timed_on_exception(self):
+        p = StageProfiler()
+        with pytest.raises(ValueError):
+            with p.stage("fail"):
+                raise ValueError()
+        assert p.stages["fail"][0] == 1
+
+    def test_disabled(self):
+        p = StageProfiler(enabled=False)
+        with p.stage("a"):
+            pass
+        p.count("dags")
+        assert p.stages == {}
+        assert p.counts == {}
+
+    def test_merge(self):
+        a, b = StageProfiler(trace=True), StageProfiler(trace=True)
+        for p in (a, b):
+            with p.stage("gen_rnd"):
+                pass
+            p.count("dags", 2)
+        with b.stage("save"):
+            pass
+        a.merge(b)
+        assert a.stages["gen_rnd"][0] == 2
+        assert a.stages["save"][0] == 1
+        assert a.counts["dags"] == 4
+        assert len(a.events) == 3
+
+    def test_summary(self):
+        p = StageProfiler()
+        with p.stage("gen_rnd"):
+            pass
+        p.count("nodes", 10)
+        p.wall = 1.0
+        lines = p.summary().splitlines()
+        assert lines[0].split()[0] == "stage"
+        assert lines[1].split()[:2] == ["gen_rnd", "1"]
+        assert lines[-1].split() == ["nodes", "10"]
+
+    def test_write(self, tmp_path):
+        p = StageProfiler(trace=True)
+        with p.stage("gen_rnd"):
+            pass
+        p.write_json(str(tmp_path / "profile.json"))
+        p.write_trace(str(tmp_path / "trace.json"))
+
+        data = json.loads((tmp_path / "profile.json").read_text())
+        assert data["stages"]["gen_rnd"]["calls"] == 1
+        trace = json.loads((tmp_path / "trace.json").read_text())
+        assert trace["traceEvents"][0]["name"] == "gen_rnd"
+        assert trace["traceEvents"][0]["ph"] == "X"
@@ -1,8 +1,11 @@
 import pytest
 import random
+import numpy as np
 import networkx as nx
+import os
+import json
 
-from rnddag import DAG, DAGTaskset
+from rnddag import DAG, DAGTaskset, GraphArrays, PNGRenderer, critical_path_batch
 
 
 # ---- DAG.__init__ ----
@@ -80,6 +83,157 @@ class TestGenRnd:
         assert self.G.graph['U'] == -1
 
 
+# ---- gen_rnd (bernoulli) ----
+
+class TestGenRndBernoulli:
+    def _gen(self, seed, connect_mode, parallelism=6, connect_prob=0.3):
+        random.seed(seed)
+        d = DAG()
+        d.gen_rnd(parallelism=parallelism, layer_num_min=3, layer_num_max=8,
+                  connect_prob=connect_prob, connect_mode=connect_mode)
+        return d.get_graph()
+
+    @pytest.mark.parametrize("seed", range(10))
+    def test_structure(self, seed):
+        G = self._gen(seed, "bernoulli")
+        assert nx.is_directed_acyclic_graph(G)
+        assert nx.is_weakly_connected(G)
+        assert len([n for n in G.nodes() if G.in_degree(n) == 0]) == 1
+        assert len([n for n in G.nodes() if G.out_degree(n) == 0]) == 1
+
+    def test_deterministic_with_seed(self):
+        G1 = self._gen(42, "bernoulli")
+        G2 = self._gen(42, "bernoulli")
+        assert list(G1.edges()) == list(G2.edges())
+
+    def test_same_edge_density_distribution(self):
+        """Two-sample Kolmogorov-Smirnov test on the edge density (edges per
+        node) of pairwise and bernoulli DAGs, at the 0.1% level."""
+        n_samples = 400
+
+        def densities(connect_mode, seed):
+            d = []
+            for k in range(n_samples):
+                G = self._gen(seed + k, connect_mode)
+                d.append(G.number_of_edges() / G.number_of_nodes())
+            return np.sort(d)
+
+        a = densities("pairwise", 0)
+        b = densities("bernoulli", 100000)
+
+        x = np.concatenate((a, b))
+        cdf_a = np.searchsorted(a, x, side='right') / n_samples
+        cdf_b = np.searchsorted(b, x, side='right') / n_samples
+        ks = np.max(np.abs(cdf_a - cdf_b))
+
+        assert ks < 1.95 * np.sqrt(2.0 / n_samples)
+        assert np.mean(a) == pytest.approx(np.mean(b), rel=0.05)
+
+
+# ---- seeded snapshots ----
+
+# sorted edge lists of the generators before the set-based bookkeeping, for
+# (generator, seed, parallelism, connect_prob) with 3 to 5 layers; the legacy
+# cases connect several orphans per pass (every other one, see gen_rnd_legacy)
+RND_SNAPSHOTS = [
+    ('legacy', 21, 4, 0.1, 6, [(1, 2), (1, 3), (1, 4), (1, 6), (2, 6), (3, 6), (4, 6), (5, 6)]),
+    ('legacy', 47, 4, 0.2, 7, [
+        (1, 2), (1, 3), (1, 4), (1, 5), (1, 7), (2, 7), (3, 7), (4, 7), (5, 7), (6, 7)
+    ]),
+    ('legacy', 11, 3, 0.1, 8, [
+        (1, 2), (1, 3), (1, 4), (1, 5), (1, 6), (1, 8), (2, 8), (3, 8), (4, 8), (5, 8), (6, 8), (7, 8)
+    ]),
+    ('pairwise', 1, 3, 0.5, 5, [(1, 2), (1, 3), (1, 4), (2, 5), (3, 5), (4, 5)]),
+    ('bernoulli', 1, 3, 0.5, 4, [(1, 2), (1, 3), (2, 4), (3, 4)]),
+    ('pairwise', 7, 4, 0.2, 5, [(1, 2), (1, 3), (2, 5), (3, 4), (4, 5)]),
+    ('bernoulli', 7, 4, 0.2, 6, [(1, 2), (1, 3), (1, 4), (1, 5), (2, 6), (3, 6), (4, 6), (5, 6)]),
+    ('pairwise', 42, 5, 0.8, 11, [
+        (1, 2), (2, 3), (2, 4), (2, 5), (3, 6), (3, 7), (3, 8), (3, 9), (3, 10), (4, 6), (4, 7), (4, 8),
+        (4, 9), (5, 6), (5, 7), (5, 8), (5, 10), (6, 11), (7, 11), (8, 11), (9, 11), (10, 11)
+    ]),
+    ('bernoulli', 42, 5, 0.8, 5, [(1, 2), (1, 3), (1, 4), (2, 5), (3, 5), (4, 5)]),
+]
+
+
+class TestGenRndSnapshot:
+    @pytest.mark.parametrize("engine", ["networkx", "array"])
+    @pytest.mark.parametrize("kind,seed,parallelism,prob,n,edges", RND_SNAPSHOTS)
+    def test_snapshot(self, engine, kind, seed, parallelism, prob, n, edges):
+        random.seed(seed)
+        d = DAG(engine=engine)
+        if kind == "legacy":
+            d.parallelism = parallelism
+            d.layer_num_min, d.layer_num_max = 3, 5
+            d.connect_prob = prob
+            d.gen_rnd_legacy()
+        else:
+            d.gen_rnd(parallelism=parallelism, layer_num_min=3, layer_num_max=5,
+                      connect_prob=prob, connect_mode=kind)
+        assert d.get_number_of_nodes() == n
+        assert sorted(d.get_graph().edges()) == edges
+
+
+# ---- gen_rnd_large ----
+
+class TestGenRndLarge:
+    def _load(self, folder, fmt):
+        if fmt == "bin":
+            edges = np.fromfile(str(folder / "Tau_0.edges.bin"), dtype='<i4').reshape(-1, 2)
+            c = np.fromfile(str(folder / "Tau_0.C.bin"), dtype='<f8')
+        else:
+            edges = np.loadtxt(str(folder / "Tau_0.edgelist"), dtype=int).reshape(-1, 2)
+            c = np.loadtxt(str(folder / "Tau_0.C.txt"))[:, 1]
+        return edges, c
+
+    @pytest.mark.parametrize("fmt", ["bin", "edgelist"])
+    @pytest.mark.parametrize("max_block", [3, 1 << 22])
+    def test_streamed_graph(self, tmp_path, fmt, max_block):
+        random.seed(42)
+        d = DAG(i=0, W=1000)
+        meta = d.gen_rnd_large(basefolder=str(tmp_path), parallelism=6, layer_num_min=3,
+                               layer_num_max=8, connect_prob=0.3, fmt=fmt, max_block=max_block)
+        edges, c = self._load(tmp_path, fmt)
+
+        G = nx.DiGraph()
+        G.add_nodes_from(range(1, meta["nodes"] + 1))
+        G.add_edges_from(map(tuple, edges.tolist()))
+
+        assert meta["nodes"] == sum(meta["layers"])
+        assert meta["edges"] == len(edges) == G.number_of_edges()
+        assert nx.is_directed_acyclic_graph(G)
+        assert nx.is_weakly_connected(G)
+        assert [n for n in G.nodes() if G.in_degree(n) == 0] == [1]
+        assert [n for n in G.nodes() if G.out_degree(n) == 0] == [meta["nodes"]]
+
+        assert len(c) == meta["nodes"]
+        assert np.all(c >= 0)
+        assert c.sum() == pytest.approx(1000)
+
+        for v in nx.topological_sort(G):
+            G.nodes[v]["f"] = c[v - 1] + max((G.nodes[u]["f"] for u in G.predecessors(v)), default=0)
+        assert meta["L"] == pytest.approx(G.nodes[meta["nodes"]]["f"])
+
+    def test_block_size_does_not_change_graph(self, tmp_path):
+        for max_block in (2, 1 << 22):
+            random.seed(7)
+            DAG(i=0).gen_rnd_large(basefolder=str(tmp_path / str(max_block)), parallelism=5,
+                                   layer_num_min=4, layer_num_max=6, max_block=max_block)
+        e1 = np.fromfile(str(tmp_path / "2" / "Tau_0.edges.bin"), dtype='<i4').reshape(-1, 2)
+        e2 = np.fromfile(str(tmp_path / str(1 << 22) / "Tau_0.edges.bin"), dtype='<i4').reshape(-1, 2)
+        assert sorted(map(tuple, e1.tolist())) == sorted(map(tuple, e2.tolist()))
+
+    def test_no_workload_no_c_file(self, tmp_path):
+        random.seed(42)
+        DAG(i=0).gen_rnd_large(basefolder=str(tmp_path), parallelism=3)
+        assert (tmp_path / "Tau_0.edges.bin").exists()
+        assert not (tmp_path / "Tau_0.C.bin").exists()
+        assert not (tmp_path / "Tau_0.png").exists()
+
+    def test_unknown_format(self, tmp_path):
+        with pytest.raises(ValueError):
+            DAG(i=0).gen_rnd_large(basefolder=str(tmp_path), fmt="png")
+
+
 # ---- gen_nfj ----
 
 class TestGenNfj:
@@ -127,6 +281,208 @@ class TestGenDispatch:
         assert nx.is_directed_acyclic_graph(d.get_graph())
 
 
+# ---- array engine ----
+
+class TestArrayEngine:
+    def _gen(self, engine, algorithm, seed=42):
+        random.seed(seed)
+        d = DAG(i=3, U=0.5, T=1000, W=500, engine=engine)
+        if algorithm == "rnd":
+            d.gen_rnd(parallelism=5, layer_num_min=3, layer_num_max=8, connect_prob=0.5)
+        else:
+            d.gen(algorithm)
+        return d
+
+    def test_graph_is_built_lazily(self):
+        d = self._gen("array", "rnd")
+        assert d.G is None
+        assert isinstance(d.arrays, GraphArrays)
+        assert d.get_number_of_nodes() == d.arrays.number_of_nodes()
+        assert d.G is None
+
+        G = d.get_graph()
+        assert isinstance(G, nx.DiGraph)
+        assert d.get_graph() is G
+
+    def test_edge_arrays(self):
+        d = self._gen("array", "rnd")
+        edges = d.arrays.edges()
+        assert edges.shape == (2, d.get_number_of_edges())
+        assert sorted(map(tuple, edges.T.tolist())) == sorted(d.get_graph().edges())
+
+    @pytest.mark.parametrize("algorithm", ["rnd", "nfj", "legacy"])
+    @pytest.mark.parametrize("seed", [1, 2, 3, 42])
+    def test_same_graph_as_networkx_engine(self, algorithm, seed):
+        d_nx = self._gen("networkx", algorithm, seed)
+        d_arr = self._gen("array", algorithm, seed)
+
+        c = list(range(1, d_nx.get_number_of_nodes() + 1))
+        d_nx.set_execution_times(c)
+        d_arr.set_execution_times(c)
+
+        G_nx, G_arr = d_nx.get_graph(), d_arr.get_graph()
+        assert G_nx.graph == G_arr.graph
+        assert list(G_nx.nodes(data=True)) == list(G_arr.nodes(data=True))
+        assert list(G_nx.edges(data=True)) == list(G_arr.edges(data=True))
+
+
+class TestToDict:
+    @pytest.mark.parametrize("engine", ["networkx", "array"])
+    def test_taskset_json_format(self, engine):
+        random.seed(42)
+        d = DAG(i=2, U=0.5, T=1000, W=500, engine=engine)
+        d.gen_rnd(parallelism=3, layer_num_min=3, layer_num_max=5)
+        d.set_execution_times(list(range(1, d.get_number_of_nodes() + 1)))
+
+        task = d.to_dict()
+        assert task["Name"] == "Tau_2"
+        assert task["T"] == 1000
+        assert task["Nodes"] == {str(v): v for v in range(1, d.get_number_of_nodes() + 1)}
+        assert sorted(task["Edges"]) == sorted("{}:{}".format(u, v) for u, v in d.get_graph().edges())
+
+    def test_same_for_both_engines(self):
+        tasks = []
+        for engine in ("networkx", "array"):
+            random.seed(7)
+            d = DAG(engine=engine)
+            d.gen_rnd()
+            d.set_execution_times([2] * d.get_number_of_nodes())
+            tasks.append(d.to_dict())
+        assert tasks[0]["Nodes"] == tasks[1]["Nodes"]
+        assert sorted(tasks[0]["Edges"]) == sorted(tasks[1]["Edges"])
+
+
+class TestSetExecutionTimes:
+    def test_node_and_edge_labels(self):
+        random.seed(42)
+        d = DAG()
+        d.gen_rnd(parallelism=3, layer_num_min=3, layer_num_max=5)
+        c = {v: 10 * v for v in range(1, d.get_number_of_nodes() + 1)}
+        d.set_execution_times(c)
+
+        G = d.get_graph()
+        for v, C in G.nodes(data='C'):
+            assert C == 10 * v
+        for u, v, label in G.edges(data='label'):
+            assert label == 10 * u
+
+
+class TestCriticalPath:
+    def _dag(self, engine="networkx"):
+        # 1 -> 2 -> 4, 1 -> 3 -> 4
+        d = DAG(engine=engine)
+        G = d._new_graph()
+        for v in range(1, 5):
+            G.add_node(v)
+        G.add_edges_from([(1, 2), (1, 3), (2, 4), (3, 4)])
+        d._set_graph(G)
+        return d
+
+    @pytest.mark.parametrize("engine", ["networkx", "array"])
+    def test_set_execution_times(self, engine):
+        d = self._dag(engine)
+        d.set_execution_times([1, 5, 2, 3])
+        assert d.L == 9
+        assert d.W == 11
+        assert d.to_dict()["L"] == 9
+        assert d.get_graph().graph["L"] == 9
+        assert d.get_graph().graph["W"] == 11
+
+    def test_matches_networkx(self):
+        random.seed(5)
+        for _ in range(20):
+            d = DAG()
+            d.gen_rnd(parallelism=random.randint(1, 10), connect_prob=random.random())
+            d.set_execution_times([random.randint(0, 9) for _ in range(d.get_number_of_nodes())])
+            G = d.get_graph()
+            for u, v in G.edges():
+                G.edges[u, v]["w"] = G.nodes[v]["C"]
+            assert d.L == nx.dag_longest_path_length(G, weight="w") + G.nodes[1]["C"]
+
+    def test_batch(self):
+        random.seed(6)
+        dags = []
+        for i in range(10):
+            d = DAG(i=i, engine="array" if i % 2 else "networkx")
+            d.gen_rnd(parallelism=4)
+            d.set_execution_times([random.random() for _ in range(d.get_number_of_nodes())])
+            dags.append(d)
+        L = critical_path_batch(dags)
+        assert L.tolist() == pytest.approx([d.L for d in dags])
+        assert critical_path_batch([d.to_arrays() for d in dags]).tolist() == L.tolist()
+        assert len(critical_path_batch([])) == 0
+
+    def test_cycle(self):
+        from rnddag import _longest_paths, _longest_path
+        with pytest.raises(ValueError):
+            _longest_paths([1, 1], [0, 1], [1, 0])
+        with pytest.raises(ValueError):
+            _longest_path([1, 1], [0, 1], [1, 0])
+
+
+class TestGenRndTarget:
+    @pytest.mark.parametrize("targets", [
+        {"L_T": (0.1, 0.3)},
+        {"W_L": (3, 4)},
+        {"W_L": (1, 1.2)},
+        {"L_T": (0.2, 0.3), "W_L": (2, 6)},
+        {"W_L": (6, 8), "width": (1, 10)},
+    ])
+    @pytest.mark.parametrize("round_c", [False, True])
+    @pytest.mark.parametrize("dummy", [False, True])
+    def test_targets_met(self, targets, round_c, dummy):
+        random.seed(1)
+        for i in range(20):
+            d = DAG(i=i, U=0.5, T=1000, W=500)
+            stats = d.gen_rnd_target(round_c=round_c, dummy=dummy, **targets)
+            assert stats["tries"] >= 1
+            assert d.W == pytest.approx(500)
+            assert d.L == d.critical_path()
+            if "L_T" in targets:
+                assert targets["L_T"][0] <= d.L / d.T <= targets["L_T"][1]
+            if "W_L" in targets:
+                assert targets["W_L"][0] <= d.W / d.L <= targets["W_L"][1]
+            if round_c:
+                assert all(float(c).is_integer() for _, c in d.get_graph().nodes(data='C'))
+
+    def test_small_workload(self):
+        # fewer units of W than nodes: execution times are clamped to 1
+        for s in range(50):
+            random.seed(s)
+            d = DAG(W=10)
+            d.gen_rnd_target(W_L=(1, 4), round_c=True)
+            cs = [c for _, c in d.get_graph().nodes(data='C')]
+            assert min(cs) >= 1
+            assert d.W == sum(cs) >= 10
+            assert 10 / 4 <= d.L <= 10
+
+    def test_width(self):
+        random.seed(2)
+        for i in range(20):
+            d = DAG(i=i, T=1000, W=500)
+            d.gen_rnd_target(width=(5, 7), parallelism=8)
+            ranks = [r for _, r in d.get_graph().nodes(data='rank')]
+            widest = max(ranks.count(r) for r in set(ranks))
+            assert 5 <= widest <= 7
+
+    def test_infeasible(self):
+        d = DAG(T=1000, W=500)
+        with pytest.raises(ValueError):
+            d.gen_rnd_target(L_T=(0.8, 0.9))
+        with pytest.raises(ValueError):
+            d.gen_rnd_target(W_L=(10, 12), width=(1, 4))
+        with pytest.raises(ValueError):
+            DAG(W=500).gen_rnd_target(L_T=(0.1, 0.2))
+
+    def test_width_min(self):
+        random.seed(3)
+        for _ in range(20):
+            d = DAG()
+            d.gen_rnd(parallelism=8, layer_num_min=3, layer_num_max=3, width_min=6)
+            ranks = [r for _, r in d.get_graph().nodes(data='rank')]
+            assert ranks.count(1) >= 6
+
+
 # ---- save() ----
 
 class TestSave:
@@ -165,6 +521,77 @@ class TestSave:
         assert G_loaded.number_of_edges() == d.get_number_of_edges()
 
 
+class TestSaveFormats:
+    def _dag(self, engine="networkx"):
+        random.seed(42)
+        d = DAG(i=0, U=0.5, T=1000, W=500, engine=engine)
+        d.gen_rnd(parallelism=3, layer_num_min=3, layer_num_max=5)
+        d.set_execution_times(list(range(1, d.get_number_of_nodes() + 1)))
+        return d
+
+    def test_selected_formats_only(self, tmp_path):
+        d = self._dag()
+        d.save(basefolder=str(tmp_path), formats=["gml", "json"])
+        assert sorted(p.name for p in tmp_path.iterdir()) == ["Tau_0.gml", "Tau_0.json"]
+
+    def test_json(self, tmp_path):
+        import json
+        d = self._dag()
+        d.save(basefolder=str(tmp_path), formats=["json"])
+        with open(str(tmp_path / "Tau_0.json")) as f:
+            assert json.load(f) == d.to_dict()
+
+    @pytest.mark.parametrize("engine", ["networkx", "array"])
+    def test_binary(self, tmp_path, engine):
+        d = self._dag(engine)
+        d.save(basefolder=str(tmp_path), formats=["binary"])
+        data = np.load(str(tmp_path / "Tau_0.npz"))
+        assert data["T"] == 1000
+        assert len(data["src"]) == len(data["dst"]) == d.get_number_of_edges()
+        assert data["C"].tolist() == list(range(1, d.get_number_of_nodes() + 1))
+        assert data["rank"][0] == 0
+
+    def test_array_engine_not_materialized(self, tmp_path):
+        d = self._dag("array")
+        d.save(basefolder=str(tmp_path), formats=["json", "binary"])
+        assert d.G is None
+
+    def test_unknown_format(self, tmp_path):
+        with pytest.raises(ValueError):
+            self._dag().save(basefolder=str(tmp_path), formats=["svg"])
+
+    def test_background_rendering(self, tmp_path):
+        pytest.importorskip("pygraphviz")
+        d = self._dag()
+        d.save(basefolder=str(tmp_path / "sync"), formats=["png"])
+        with PNGRenderer(workers=2) as renderer:
+            d.save(basefolder=str(tmp_path / "async"), formats=["png"], renderer=renderer)
+
+        sync_png = (tmp_path / "sync" / "Tau_0.png").read_bytes()
+        async_png = (tmp_path / "async" / "Tau_0.png").read_bytes()
+        assert sync_png == async_png
+
+
+class TestPNGRendererTags:
+    def test_completed_stops_at_failure(self, tmp_path):
+        pytest.importorskip("pygraphviz")
+        from rnddag import PNGRenderer
+
+        random.seed(1)
+        d = DAG()
+        d.gen_rnd(parallelism=2, layer_num_min=2, layer_num_max=3)
+        renderer = PNGRenderer(workers=2)
+        try:
+            for tag, folder in (("a", tmp_path), ("b", tmp_path / "missing"), ("c", tmp_path)):
+                renderer.submit(d.get_graph(), str(folder / "Tau_{}.png".format(tag)))
+                renderer.tag(tag)
+            assert renderer.completed(wait=True) == ["a"]
+            assert renderer.completed() == []
+        finally:
+            with pytest.raises(Exception):
+                renderer.close()
+
+
 # ---- DAGTaskset ----
 
 class TestDAGTaskset:
@@ -173,3 +600,91 @@ class TestDAGTaskset:
         assert ts.util == 0
         assert ts.task_number == 0
         assert ts.tasks == []
+        assert ts.hyperperiod == 1
+        assert ts.L_max is None
+
+    def _dag(self, i, U, T, L):
+        d = DAG(i=i, U=U, T=T, W=U * T)
+        d.gen_rnd(parallelism=2, layer_num_min=2, layer_num_max=3)
+        d.set_execution_times([1] * d.get_number_of_nodes())
+        d.L = L
+        return d
+
+    def test_add(self):
+        ts = DAGTaskset()
+        for i, (T, L) in enumerate([(100, 10), (150, 30), (100, 20)]):
+            ts.add(self._dag(i, 0.1 * (i + 1), T, L))
+
+        assert len(ts) == 3
+        assert ts.util == pytest.approx(0.6)
+        assert ts.hyperperiod == 300
+        assert ts.L_max == 30
+        assert ts.U.tolist() == pytest.approx([0.1, 0.2, 0.3])
+        assert ts.T.tolist() == [100, 150, 100]
+        assert ts.L.tolist() == [10, 30, 20]
+
+    def test_grows(self):
+        ts = DAGTaskset()
+        for i in range(40):
+            ts.add(self._dag(i, 0.01, 10 * (i % 4 + 1), i))
+        assert ts.T.tolist() == [10 * (i % 4 + 1) for i in range(40)]
+        assert ts.hyperperiod == 120
+        assert ts.L_max == 39
+
+    def test_remove(self):
+        ts = DAGTaskset()
+        tasks = [self._dag(i, 0.1, T, L) for i, (T, L) in enumerate([(100, 10), (150, 30), (100, 20)])]
+        for tau in tasks:
+            ts.add(tau)
+
+        assert ts.remove(tasks[1]) is tasks[1]
+        assert ts.tasks == [tasks[0], tasks[2]]
+        assert ts.T.tolist() == [100, 100]
+        assert ts.util == pytest.approx(0.2)
+        assert ts.hyperperiod == 100
+        assert ts.L_max == 20
+
+        ts.remove(0)
+        assert ts.hyperperiod == 100
+        assert ts.L_max == 20
+        ts.remove(0)
+        assert len(ts) == 0
+        assert ts.util == 0
+        assert ts.hyperperiod == 1
+        assert ts.L_max is None
+
+    def test_non_integral_period(self):
+        ts = DAGTaskset()
+        ts.add(self._dag(0, 0.1, 100, 1))
+        ts.add(self._dag(1, 0.1, 12.5, 1))
+        assert ts.hyperperiod is None
+        ts.remove(1)
+        assert ts.hyperperiod == 100
+
+    def test_gen(self):
+        random.seed(3)
+        ts = DAGTaskset()
+        ts.gen(0.8, 4, [100, 200, 400], parallelism=3, layer_num_min=3, layer_num_max=4)
+        assert len(ts) == 4
+        assert ts.util == pytest.approx(0.8)
+        assert set(ts.T.tolist()) <= {100, 200, 400}
+        assert 400 % ts.hyperperiod == 0
+
+    def test_dump_load(self, tmp_path):
+        random.seed(4)
+        ts = DAGTaskset()
+        ts.gen(0.5, 3, [100, 200], parallelism=3, layer_num_min=3, layer_num_max=4)
+        path = str(tmp_path / "taskset.json")
+        ts.dump(path)
+
+        loaded = DAGTaskset().load(path)
+        assert loaded.to_dict() == ts.to_dict()
+        assert loaded.hyperperiod == ts.hyperperiod
+        assert loaded.util == pytest.approx(ts.util)
+
+    def test_load_shipped_taskset(self):
+        path = os.path.join(os.path.dirname(__file__), os.pardir, "taskset.json")
+        ts = DAGTaskset().load(path)
+        assert len(ts) > 0
+        assert [tau.name for tau in ts.tasks][0] == "Tau_1"
+        assert ts.L_max == max(t["L"] for t in json.load(open(path))["tasks"])
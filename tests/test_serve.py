@@ -0,0 +1,278 @@
+import pytest
+import os
+import json
+import socket
+import time
+import threading
+import importlib
+import http.client
+
+# daggen-serve.py has a hyphen, so we need importlib to import it
+_serve = importlib.import_module("daggen-serve")
+_cli = importlib.import_module("daggen-cli")
+
+from utility import load_dataset
+
+
+class UnixHTTPConnection(http.client.HTTPConnection):
+    def __init__(self, path):
+        super().__init__("localhost")
+        self.unix_path = path
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.connect(self.unix_path)
+
+
+def _start(**kwargs):
+    server = _serve.make_server(workers=2, **kwargs)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server
+
+
+def _stop(server):
+    server.shutdown()
+    server.server_close()
+    server.pool.shutdown()
+
+
+@pytest.fixture
+def server(config_file):
+    server = _start(config_path=config_file, port=0, max_sets=50)
+    yield server
+    _stop(server)
+
+
+def _request(conn, method, path, body=None):
+    conn.request(method, path, body=json.dumps(body) if body is not None else None)
+    response = conn.getresponse()
+    return response.status, response.read()
+
+
+def _connect(server):
+    return http.client.HTTPConnection(*server.server_address[:2])
+
+
+def _metrics(server, requests):
+    # a request is recorded just after its response is sent
+    for _ in range(100):
+        metrics = json.loads(_request(_connect(server), "GET", "/metrics")[1])
+        if metrics["requests"] == requests:
+            return metrics
+        time.sleep(0.02)
+    return metrics
+
+
+class TestGenerate:
+    def test_matches_cli(self, server, tmp_path, sample_config):
+        fragment = {"misc": {"multi-DAG_on": True}, "multi-DAG": {"task_number_per_set": 2}}
+        status, body = _request(_connect(server), "POST", "/generate",
+                                {"config": fragment, "seed": 7, "sets": 3})
+        assert status == 200
+
+        sample_config["misc"].update(fragment["misc"], rnd_seed=7)
+        sample_config["multi-DAG"].update(fragment["multi-DAG"], set_number=3)
+        config_path = tmp_path / "cli.json"
+        config_path.write_text(json.dumps(sample_config))
+        _cli.main(config_path=str(config_path), data_path=str(tmp_path / "data"),
+                  stream_output=str(tmp_path / "cli.jsonl"))
+        assert body.decode() == (tmp_path / "cli.jsonl").read_text()
+
+    def test_start(self, server):
+        conn = _connect(server)
+        _, body = _request(conn, "POST", "/generate", {"sets": 4})
+        _, tail = _request(conn, "POST", "/generate", {"sets": 2, "start": 2})
+        assert body.decode().splitlines()[2:] == tail.decode().splitlines()
+        assert [json.loads(line)["set"] for line in tail.decode().splitlines()] == [2, 3]
+
+    def test_binary(self, server, tmp_path):
+        status, body = _request(_connect(server), "POST", "/generate",
+                                {"sets": 3, "format": "binary", "config": {"misc": {"multi-DAG_on": True}}})
+        assert status == 200
+        (tmp_path / "tasksets.bin").write_bytes(body)
+        dataset = load_dataset(str(tmp_path / "tasksets.bin"))
+        assert len(dataset) == 3 * 3
+        assert [dataset[k]["set"] for k in range(len(dataset))] == [0, 0, 0, 1, 1, 1, 2, 2, 2]
+
+    @pytest.mark.parametrize("body", [
+        {"config": {"unknown": {}}},
+        {"format": "xml"},
+        {"sets": 51},
+        {"sets": 0},
+        {"config": {"misc": {"cores": [2, 4], "multi-DAG_on": True}}},
+        {"config": {"misc": {"multi-DAG_on": True}, "dag_config": {"targets": {"L_T": [0, 0.0001]}}}},
+    ])
+    def test_bad_request(self, server, body):
+        status, response = _request(_connect(server), "POST", "/generate", body)
+        assert status == 400
+        assert "error" in json.loads(response)
+
+    def test_not_found(self, server):
+        assert _request(_connect(server), "GET", "/nothing")[0] == 404
+
+
+class TestFailures:
+    @pytest.fixture
+    def failing(self, server, monkeypatch):
+        """ The generation of the sets >= first fails with error, in a
+        thread pool so the patched generator is used. """
+        from concurrent.futures import ThreadPoolExecutor
+
+        def patch(error, first=0):
+            gen = _cli.gen_single_dag
+
+            def fail(config, data_path, i, renderer=None):
+                if i >= first:
+                    raise error("generation failed")
+                return gen(config, data_path, i, renderer=renderer)
+
+            monkeypatch.setattr(_cli, "gen_single_dag", fail)
+
+        server.pool.shutdown()
+        server.pool = ThreadPoolExecutor(max_workers=2)
+        return patch
+
+    @pytest.mark.parametrize("fmt", ["jsonl", "binary"])
+    def test_internal_error(self, server, failing, fmt):
+        failing(RuntimeError)
+        status, body = _request(_connect(server), "POST", "/generate", {"sets": 2, "format": fmt})
+        assert status == 500
+        assert "error" in json.loads(body)
+        metrics = _metrics(server, 1)
+        assert (metrics["errors"], metrics["failures"]) == (0, 1)
+
+    def test_later_set_binary(self, server, failing):
+        failing(ValueError, first=1)
+        status, _ = _request(_connect(server), "POST", "/generate", {"sets": 3, "format": "binary"})
+        assert status == 500
+        assert _metrics(server, 1)["failures"] == 1
+
+    def test_later_set_jsonl(self, server, failing):
+        failing(RuntimeError, first=1)
+        status, body = _request(_connect(server), "POST", "/generate", {"sets": 3})
+        assert status == 200
+        lines = [json.loads(line) for line in body.decode().splitlines()]
+        assert lines[0]["set"] == 0 and "error" in lines[1]
+        assert _metrics(server, 1)["failures"] == 1
+
+    def test_invalid_config(self, server, failing):
+        failing(ValueError)
+        status, _ = _request(_connect(server), "POST", "/generate", {"sets": 2, "format": "binary"})
+        assert status == 400
+        metrics = _metrics(server, 1)
+        assert (metrics["errors"], metrics["failures"]) == (1, 0)
+
+
+class TestMetrics:
+    def test_metrics(self, server):
+        conn = _connect(server)
+        assert _request(conn, "GET", "/health")[0] == 200
+        _request(conn, "POST", "/generate", {"sets": 2})
+        _request(conn, "POST", "/generate", {"format": "xml"})
+
+        metrics = _metrics(server, 2)
+        assert metrics["requests"] == 2
+        assert metrics["errors"] == 1
+        assert metrics["failures"] == 0
+        assert metrics["sets"] == 2
+        assert metrics["in_flight"] == 0
+        assert metrics["latency_ms"]["window"] == 2
+        assert 0 < metrics["latency_ms"]["p50"] <= metrics["latency_ms"]["max"]
+
+    def test_concurrent(self, server):
+        results = []
+
+        def client():
+            results.append(_request(_connect(server), "POST", "/generate", {"sets": 3}))
+
+        threads = [threading.Thread(target=client) for _ in range(4)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        assert [status for status, _ in results] == [200] * 4
+        assert len(set(body for _, body in results)) == 1
+        assert _metrics(server, 4)["sets"] == 12
+
+
+class TestWindow:
+    def test_bounded_in_flight(self, sample_config):
+        from concurrent.futures import Future
+        from types import SimpleNamespace
+
+        class Pool:
+            def __init__(self):
+                self.submitted = []
+                self.pending = 0
+                self.max_pending = 0
+
+            def submit(self, fn, config, data_path, i):
+                pool = self
+                self.submitted.append(i)
+                self.pending = self.pending + 1
+                self.max_pending = max(self.max_pending, self.pending)
+
+                class Done(Future):
+                    def result(self, timeout=None):
+                        pool.pending = pool.pending - 1
+                        return super().result(timeout)
+
+                future = Done()
+                future.set_result(({"set": i}, None, None))
+                return future
+
+        pool = Pool()
+        handler = SimpleNamespace(server=SimpleNamespace(pool=pool, window=4))
+        config = _serve.merge_config(sample_config, {})
+        records = _serve.GenerateHandler.generate(handler, config, range(20))
+        for k, record in enumerate(records):
+            assert record["set"] == k
+            assert len(pool.submitted) <= k + 5
+        assert pool.submitted == list(range(20))
+        assert pool.max_pending == 4
+
+    def test_client_disconnect(self, server):
+        # start the forked workers first, or they inherit the client socket and keep it open
+        server.pool.submit(int).result()
+        sock = socket.create_connection(server.server_address[:2])
+        # large sets, so the response does not fit in the socket buffers
+        fragment = {"misc": {"multi-DAG_on": True}, "multi-DAG": {"task_number_per_set": 40},
+                    "dag_config": {"parallelism": 16, "layer_num_min": 10, "layer_num_max": 12}}
+        body = json.dumps({"sets": 50, "config": fragment}).encode()
+        sock.sendall(b"POST /generate HTTP/1.1\r\nHost: localhost\r\nContent-Length: " +
+                     str(len(body)).encode() + b"\r\n\r\n" + body)
+        assert sock.recv(12) == b"HTTP/1.1 200"
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_LINGER, b"\x01\x00\x00\x00\x00\x00\x00\x00")
+        sock.close()
+
+        metrics = _metrics(server, 1)
+        assert metrics["cancelled"] == 1
+        assert metrics["errors"] == 0
+        assert metrics["sets"] < 50
+
+
+class TestUnixSocket:
+    def test_unix_socket(self, config_file, tmp_path):
+        path = str(tmp_path / "daggen.sock")
+        server = _start(config_path=config_file, unix_socket=path)
+        try:
+            status, body = _request(UnixHTTPConnection(path), "POST", "/generate", {"sets": 2})
+            assert status == 200
+            assert len(body.decode().splitlines()) == 2
+        finally:
+            _stop(server)
+        assert not os.path.exists(path)
+
+
+class TestMergeConfig:
+    def test_merge(self, sample_config):
+        config = _serve.merge_config(sample_config, {"dag_config": {"parallelism": 8}})
+        assert config["dag_config"]["parallelism"] == 8
+        assert config["dag_config"]["layer_num_min"] == sample_config["dag_config"]["layer_num_min"]
+        assert config["misc"]["return_records"] and not config["misc"]["save_to_file"]
+        assert sample_config["dag_config"]["parallelism"] == 4
+
+    def test_large_graph(self, sample_config):
+        with pytest.raises(ValueError):
+            _serve.merge_config(sample_config, {"dag_config": {"large_graph": True}})
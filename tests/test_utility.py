@@ -68,3 +68,107 @@ class TestLoadTask:
         from utility import load_task
         with pytest.raises(Exception):
             load_task(task_idx=999, dag_base_folder=str(tmp_path))
+
+
+class TestLoadTaskCsr:
+    def test_matches_graph(self, saved_dag):
+        from utility import load_task_csr
+        folder, dag = saved_dag
+        offsets, indices, C, T, W = load_task_csr(task_idx=0, dag_base_folder=folder)
+        G = dag.get_graph()
+
+        n = G.number_of_nodes()
+        assert len(offsets) == n + 1
+        assert offsets[-1] == len(indices) == G.number_of_edges()
+        for v in range(1, n + 1):
+            assert sorted(indices[offsets[v - 1]:offsets[v]].tolist()) == sorted(G.successors(v))
+            assert C[v - 1] == G.nodes[v]['C']
+        assert T == 1000
+        assert W == sum(c for _, c in G.nodes(data='C'))
+
+    def test_consistent_with_load_task(self, saved_dag):
+        from utility import load_task, load_task_csr
+        folder, _ = saved_dag
+        G_dict, V_array, _, _, _, _ = load_task(task_idx=0, dag_base_folder=folder)
+        offsets, indices, _, _, _ = load_task_csr(task_idx=0, dag_base_folder=folder)
+
+        assert V_array == list(range(1, len(offsets)))
+        for v in V_array:
+            assert sorted(G_dict.get(v, [])) == sorted(indices[offsets[v - 1]:offsets[v]].tolist())
+
+    def test_graph_to_csr_without_c(self):
+        from utility import graph_to_csr
+        G = nx.DiGraph()
+        G.add_edges_from([(1, 2), (1, 3), (2, 4), (3, 4)])
+        offsets, indices, C = graph_to_csr(G)
+        assert offsets.tolist() == [0, 2, 3, 4, 4]
+        assert indices.tolist() == [2, 3, 4, 4]
+        assert all(c != c for c in C)  # nan
+
+
+@pytest.fixture
+def saved_taskset(tmp_path):
+    """Save 12 small DAGs (gpickle only) to a temp directory."""
+    from rnddag import DAG
+
+    random.seed(42)
+    for i in range(12):
+        d = DAG(i=i, U=0.1, T=100 * (i + 1), W=10)
+        d.gen_rnd(parallelism=3, layer_num_min=3, layer_num_max=5)
+        d.set_execution_times([1] * d.get_number_of_nodes())
+        d.save(basefolder=str(tmp_path), formats=["gpickle"])
+    return str(tmp_path)
+
+
+class TestLoadTaskset:
+    def setup_method(self):
+        from utility import clear_cache, set_cache_limit
+        clear_cache()
+        set_cache_limit(256 * 1024 * 1024)
+
+    def test_ordered_by_task_index(self, saved_taskset):
+        from utility import load_taskset
+        taskset = load_taskset(saved_taskset)
+        assert len(taskset) == 12
+        assert [T for _, _, _, _, T, _ in taskset] == [100 * (i + 1) for i in range(12)]
+
+    def test_csr(self, saved_taskset):
+        from utility import load_taskset
+        taskset = load_taskset(saved_taskset, csr=True)
+        assert len(taskset) == 12
+        assert [T for _, _, _, T, _ in taskset] == [100 * (i + 1) for i in range(12)]
+
+    def test_cached(self, saved_taskset):
+        import utility
+        path = os.path.join(saved_taskset, "Tau_0.gpickle")
+        assert utility._read_graph(path) is utility._read_graph(path)
+
+    def test_reload_on_change(self, saved_taskset):
+        import utility
+        path = os.path.join(saved_taskset, "Tau_0.gpickle")
+        G = utility._read_graph(path)
+        st = os.stat(path)
+        os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 10 ** 9))
+        assert utility._read_graph(path) is not G
+
+    def test_memory_cap(self, saved_taskset):
+        import utility
+        size = os.path.getsize(os.path.join(saved_taskset, "Tau_0.gpickle"))
+        utility.set_cache_limit(3 * size)
+        utility.load_taskset(saved_taskset)
+        assert 0 < len(utility._graph_cache) <= 3
+        assert utility._graph_cache_size <= 3 * size
+
+        utility.set_cache_limit(0)
+        assert len(utility._graph_cache) == 0
+        utility.load_taskset(saved_taskset)
+        assert len(utility._graph_cache) == 0
+
+
+class TestLoadDataset:
+    def test_not_a_dataset(self, tmp_path):
+        from utility import load_dataset
+        path = tmp_path / "x.bin"
+        path.write_bytes(b"\0" * 128)
+        with pytest.raises(ValueError):
+            load_dataset(str(path))